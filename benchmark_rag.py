@@ -0,0 +1,820 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the CJ-Mentor retrieval stack.
+
+Every measurement that involves load time or memory runs in a fresh child
+process so results are not skewed by what the parent already imported.
+
+Usage:
+    python benchmark_rag.py docstore [--vectorstore PATH] [--repeat N]
+    python benchmark_rag.py embedding [--backends torch,onnx] [--queries FILE]
+    python benchmark_rag.py context [--vectorstore PATH] [--queries FILE]
+    python benchmark_rag.py hybrid [--vectorstore PATH] [--queries FILE] [--keyword-queries FILE]
+    python benchmark_rag.py ann [--types flat,hnsw,ivfpq] [--k 5] [--corpus-sample N]
+    python benchmark_rag.py compact [--types flat,fp16,sq8,sq8_pca128] [--k 5] [--corpus-sample N]
+    python benchmark_rag.py batcher [--concurrency 1,4,8,16] [--rounds 3] [--queries FILE]
+    python benchmark_rag.py compress [--budget 250] [--queries FILE] [--llm]
+    python benchmark_rag.py boilerplate [--html-root DIR] [--min-pages 2] [--queries FILE]
+    python benchmark_rag.py intent [--confidence 0.5] [--queries FILE] [--llm]
+    python benchmark_rag.py stream [--limit 5] [--queries FILE]
+    python benchmark_rag.py prompt [--queries FILE] [--llm]
+    python benchmark_rag.py schema [--limit 20] [--queries FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+from memory_stats import process_memory
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_VECTORSTORE_PATH = os.path.join(BASE_DIR, "faiss_index_cybersecurity_navigator")
+DEFAULT_QUERIES_PATH = os.path.join(BASE_DIR, "benchmark_queries.jsonl")
+DEFAULT_KEYWORD_QUERIES_PATH = os.path.join(BASE_DIR, "benchmark_keyword_queries.jsonl")
+
+
+def run_child(*args) -> dict:
+    """Run `python benchmark_rag.py <args>` in a fresh process and parse its JSON output"""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *args],
+        capture_output=True, text=True, cwd=BASE_DIR
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Child benchmark failed: {result.stderr.strip()[-500:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def load_queries(path: str = DEFAULT_QUERIES_PATH):
+    """Recorded query set: one JSON object per line with at least a "query" field"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[position]
+
+
+def print_table(rows, columns):
+    widths = [max(len(str(col)), *(len(str(row.get(col, ''))) for row in rows)) for col in columns]
+    print("  ".join(str(col).ljust(width) for col, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(col, '')).ljust(width) for col, width in zip(columns, widths)))
+
+
+# --- docstore: pickled InMemoryDocstore vs memory-mapped chunk store ---
+
+def child_docstore(args):
+    from vector_index import load_docstore
+
+    rss_before = process_memory().get('rss_mb', 0)
+    start_time = time.perf_counter()
+    docstore, index_to_docstore_id = load_docstore(args.vectorstore, args.mode)
+    load_seconds = time.perf_counter() - start_time
+
+    # Fetch the chunks a typical turn needs
+    start_time = time.perf_counter()
+    for position in range(3):
+        docstore.search(index_to_docstore_id[position])
+    fetch_seconds = time.perf_counter() - start_time
+
+    print(json.dumps({
+        'load_ms': round(load_seconds * 1000, 2),
+        'fetch3_ms': round(fetch_seconds * 1000, 3),
+        'rss_delta_mb': round(process_memory().get('rss_mb', 0) - rss_before, 1)
+    }))
+
+
+def bench_docstore(args):
+    print(f"📚 Docstore load benchmark ({args.repeat} runs per mode) on {args.vectorstore}")
+    rows = []
+    for mode in ('pickle', 'chunks'):
+        runs = [run_child('docstore-child', mode, '--vectorstore', args.vectorstore) for _ in range(args.repeat)]
+        rows.append({
+            'mode': mode,
+            'load_ms (median)': statistics.median(r['load_ms'] for r in runs),
+            'fetch 3 chunks ms': statistics.median(r['fetch3_ms'] for r in runs),
+            'RSS delta MB': statistics.median(r['rss_delta_mb'] for r in runs)
+        })
+    print_table(rows, ['mode', 'load_ms (median)', 'fetch 3 chunks ms', 'RSS delta MB'])
+
+
+# --- embedding: torch vs int8 ONNX query encoder ---
+
+def child_embedding(args):
+    rss_before = process_memory().get('rss_mb', 0)
+    start_time = time.perf_counter()
+    from tutor_embeddings import create_embeddings
+    embeddings = create_embeddings(use_sidecar=False, backend=args.backend, use_cache=False)
+    embeddings.embed_query("warm up")
+    load_seconds = time.perf_counter() - start_time
+
+    latencies = []
+    for item in load_queries(args.queries):
+        query_start = time.perf_counter()
+        embeddings.embed_query(item['query'])
+        latencies.append((time.perf_counter() - query_start) * 1000)
+
+    print(json.dumps({
+        'backend': type(embeddings).__name__,
+        'import_load_s': round(load_seconds, 2),
+        'rss_mb': round(process_memory().get('rss_mb', 0) - rss_before, 1),
+        'torch_imported': 'torch' in sys.modules,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2)
+    }))
+
+
+def bench_embedding(args):
+    print(f"🧠 Query encoder benchmark on {args.queries}")
+    rows = []
+    for backend in args.backends.split(','):
+        row = run_child('embedding-child', backend, '--queries', args.queries)
+        row['requested'] = backend
+        rows.append(row)
+    print_table(rows, ['requested', 'backend', 'import_load_s', 'rss_mb', 'torch_imported', 'p50_ms', 'p95_ms'])
+
+
+# --- context: top-3 chunks vs cutoff + MMR + character budget ---
+
+def bench_context(args):
+    from tutor_embeddings import create_embeddings
+    from vector_index import load_vectorstore
+    from retrieval import NavigatorRetriever, build_course_content, estimate_tokens
+
+    vectorstore = load_vectorstore(args.vectorstore, create_embeddings(use_sidecar=False))
+    retriever = NavigatorRetriever(vectorstore, args.vectorstore, k=5, use_result_cache=False)
+    queries = [item['query'] for item in load_queries(args.queries)]
+    print(f"✂️ Prompt context benchmark on {len(queries)} queries")
+
+    baseline = {'chunks': [], 'tokens': [], 'ms': []}
+    selected = {'chunks': [], 'tokens': [], 'ms': []}
+    for query in queries:
+        start_time = time.perf_counter()
+        docs = retriever.invoke(query)[:3]
+        content = "\n\n".join(doc.page_content for doc in docs)
+        baseline['ms'].append((time.perf_counter() - start_time) * 1000)
+        baseline['chunks'].append(len({doc.page_content for doc in docs}))
+        baseline['tokens'].append(estimate_tokens(content))
+
+        start_time = time.perf_counter()
+        docs = retriever.retrieve(query)
+        content = build_course_content(docs)
+        selected['ms'].append((time.perf_counter() - start_time) * 1000)
+        selected['chunks'].append(len({doc.page_content for doc in docs}))
+        selected['tokens'].append(estimate_tokens(content))
+
+    rows = []
+    for name, values in (('top-3', baseline), ('cutoff+mmr+budget', selected)):
+        rows.append({
+            'strategy': name,
+            'distinct chunks': round(statistics.mean(values['chunks']), 2),
+            'avg context tokens': round(statistics.mean(values['tokens']), 1),
+            'max context tokens': max(values['tokens']),
+            'p50 ms': round(percentile(values['ms'], 50), 2),
+            'p95 ms': round(percentile(values['ms'], 95), 2)
+        })
+    print_table(rows, ['strategy', 'distinct chunks', 'avg context tokens', 'max context tokens', 'p50 ms', 'p95 ms'])
+
+
+# --- hybrid: dense-only vs BM25 + dense (RRF) with the lexical fast path ---
+
+def bench_hybrid(args):
+    from tutor_embeddings import create_embeddings
+    from vector_index import load_vectorstore
+    from retrieval import NavigatorRetriever
+
+    vectorstore = load_vectorstore(args.vectorstore, create_embeddings(use_sidecar=False, use_cache=False))
+    dense = NavigatorRetriever(vectorstore, args.vectorstore, use_result_cache=False)
+    dense.lexical = None
+    hybrid = NavigatorRetriever(vectorstore, args.vectorstore, use_result_cache=False)
+    if hybrid.lexical is None:
+        print("❌ No BM25 index found, run: python bm25_index.py build")
+        return
+
+    keyword_items = load_queries(args.keyword_queries)
+    query_sets = (('keyword', keyword_items), ('natural', load_queries(args.queries)))
+    print(f"🔤 Hybrid retrieval benchmark ({len(keyword_items)} keyword queries, hit = an expected term in the top 3)")
+
+    rows = []
+    for name, retriever in (('dense', dense), ('hybrid', hybrid)):
+        retriever.retrieve("warm up")
+        for set_name, items in query_sets:
+            latencies, hits = [], []
+            fast_paths_before = retriever.lexical_fast_paths
+            for item in items:
+                start_time = time.perf_counter()
+                docs = retriever.retrieve(item['query'], keyword_query=item['query'])
+                latencies.append((time.perf_counter() - start_time) * 1000)
+                if 'expect' in item:
+                    texts = [doc.page_content.lower() for doc in docs[:3]]
+                    hits.append(any(term in text for term in item['expect'] for text in texts))
+            rows.append({
+                'retriever': name,
+                'queries': set_name,
+                'hit rate': f"{sum(hits) / len(hits) * 100:.0f}%" if hits else '-',
+                'fast path': retriever.lexical_fast_paths - fast_paths_before,
+                'p50 ms': round(percentile(latencies, 50), 2),
+                'p95 ms': round(percentile(latencies, 95), 2)
+            })
+    print_table(rows, ['retriever', 'queries', 'hit rate', 'fast path', 'p50 ms', 'p95 ms'])
+
+
+# --- ann / compact: recall@k, top-3 agreement, latency and size per index variant ---
+
+def tie_aware_hits(corpus_vectors, query_vector, approx, truth, depth: int) -> int:
+    """
+    Approximate hits in the top `depth` that are as close as the exact depth-th
+    neighbour (the corpus contains duplicate chunks, so comparing ids alone would undercount)
+    """
+    kth_distance = max(float(((corpus_vectors[i] - query_vector) ** 2).sum()) for i in truth[:depth] if i >= 0)
+    return sum(1 for i in approx[:depth]
+               if i >= 0 and float(((corpus_vectors[i] - query_vector) ** 2).sum()) <= kth_distance + 1e-4)
+
+
+def child_ann(args):
+    import numpy as np
+    from vector_index import read_navigator_index
+
+    query_vectors = np.load(args.vectors)
+    rss_before = process_memory().get('rss_mb', 0)
+    index = read_navigator_index(args.vectorstore, args.index_type, mmap=False)
+    rss_delta = process_memory().get('rss_mb', 0) - rss_before
+
+    latencies, results = [], []
+    for query_vector in query_vectors:
+        start_time = time.perf_counter()
+        _, ids = index.search(query_vector[None, :], args.k)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        results.append([int(chunk_id) for chunk_id in ids[0]])
+
+    print(json.dumps({
+        'rss_mb': round(rss_delta, 2),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'results': results
+    }))
+
+
+def bench_ann(args):
+    import numpy as np
+    from build_index import index_file_name, read_chunk_vectors, read_flat_vectors
+
+    if args.corpus_sample:
+        vectors = read_flat_vectors(args.vectorstore)
+        rng = np.random.default_rng(0)
+        query_vectors = vectors[rng.choice(len(vectors), min(args.corpus_sample, len(vectors)), replace=False)]
+        source = f"{len(query_vectors)} sampled corpus vectors"
+    else:
+        from tutor_embeddings import create_embeddings
+        embeddings = create_embeddings(use_sidecar=False, use_cache=False)
+        queries = [item['query'] for item in load_queries(args.queries)]
+        query_vectors = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+        source = f"{len(queries)} queries from {os.path.basename(args.queries)}"
+
+    with tempfile.NamedTemporaryFile(suffix='.npy', delete=False) as f:
+        vectors_path = f.name
+    np.save(vectors_path, query_vectors.astype(np.float32))
+    title = "Compact storage" if args.command == 'compact' else "ANN"
+    print(f"📈 {title} benchmark: recall@{args.k} and top-3 agreement vs flat on {source}")
+
+    try:
+        rows, exact = [], None
+        for index_type in args.types.split(','):
+            index_path = os.path.join(args.vectorstore, index_file_name(index_type))
+            if not os.path.exists(index_path):
+                print(f"⚠️ Skipping {index_type}: {index_path} not built")
+                continue
+            result = run_child('ann-child', index_type, '--vectors', vectors_path, '--k', str(args.k),
+                               '--vectorstore', args.vectorstore)
+            if index_type == 'flat':
+                exact = result['results']
+            rows.append({
+                'type': index_type,
+                'results': result['results'],
+                f'recall@{args.k}': '',
+                'p50 ms': result['p50_ms'],
+                'p95 ms': result['p95_ms'],
+                'p99 ms': result['p99_ms'],
+                'disk MB': round(os.path.getsize(index_path) / (1024 * 1024), 2),
+                'RSS MB': result['rss_mb']
+            })
+    finally:
+        os.remove(vectors_path)
+
+    corpus_vectors = dict(zip(*read_chunk_vectors(args.vectorstore)))
+    for row in rows:
+        if exact is None:
+            row[f'recall@{args.k}'] = row['top-3 agree'] = 'n/a'
+            continue
+        pairs = list(zip(query_vectors, row['results'], exact))
+        found = sum(tie_aware_hits(corpus_vectors, q, approx, truth, args.k) for q, approx, truth in pairs)
+        agree = sum(tie_aware_hits(corpus_vectors, q, approx, truth, 3) == min(3, args.k) for q, approx, truth in pairs)
+        row[f'recall@{args.k}'] = round(found / (len(exact) * args.k), 3)
+        row['top-3 agree'] = f"{agree / len(exact) * 100:.0f}%"
+    print_table(rows, ['type', f'recall@{args.k}', 'top-3 agree', 'p50 ms', 'p95 ms', 'p99 ms', 'disk MB', 'RSS MB'])
+
+
+# --- batcher: per-request retrieval vs cross-request micro-batching under concurrent load ---
+
+def bench_batcher(args):
+    from concurrent.futures import ThreadPoolExecutor
+    from tutor_embeddings import create_embeddings
+    from vector_index import load_vectorstore
+    from retrieval import FETCH_K, NavigatorRetriever
+    from retrieval_batcher import RetrievalBatcher
+
+    vectorstore = load_vectorstore(args.vectorstore, create_embeddings(use_sidecar=False, use_cache=False))
+    # Dense path only: no result cache, no BM25 fast path
+    retriever = NavigatorRetriever(vectorstore, args.vectorstore, use_result_cache=False)
+    retriever.lexical = None
+    batcher = RetrievalBatcher(retriever)
+    queries = [item['query'] for item in load_queries(args.queries)] * args.rounds
+    print(f"🚦 Retrieval batching benchmark: {len(queries)} searches per run "
+          f"(batch <= {batcher.max_batch_size}, delay {batcher.max_delay * 1000:g} ms)")
+
+    def timed_search(query):
+        start_time = time.perf_counter()
+        retriever.search_ranked(query, FETCH_K)
+        return (time.perf_counter() - start_time) * 1000
+
+    rows = []
+    for concurrency in (int(value) for value in args.concurrency.split(',')):
+        for mode in ('per-request', 'batched'):
+            retriever.batcher = batcher if mode == 'batched' else None
+            batches_before, queries_before = batcher.batches, batcher.queries
+            timed_search("warm up")
+            start_time = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(timed_search, queries))
+            elapsed = time.perf_counter() - start_time
+            batches = batcher.batches - batches_before
+            rows.append({
+                'threads': concurrency,
+                'mode': mode,
+                'queries/s': round(len(queries) / elapsed, 1),
+                'p50 ms': round(percentile(latencies, 50), 2),
+                'p99 ms': round(percentile(latencies, 99), 2),
+                'avg batch': round((batcher.queries - queries_before) / batches, 2) if batches else '-'
+            })
+    print_table(rows, ['threads', 'mode', 'queries/s', 'p50 ms', 'p99 ms', 'avg batch'])
+
+
+# --- compress: raw chunks vs sentence-level compression, prompt tokens and LLM latency ---
+
+COMPRESS_PROMPT = """You are CJ-Mentor, a cybersecurity tutor. Using only the knowledge base below,
+answer the student's question in at most three sentences.
+
+Knowledge Base:
+{course_content}
+
+Student: {query}"""
+
+
+def bench_compress(args):
+    from tutor_embeddings import create_embeddings
+    from vector_index import load_vectorstore
+    from retrieval import NavigatorRetriever, build_course_content, estimate_tokens
+    from context_compression import ContextCompressor
+
+    vectorstore = load_vectorstore(args.vectorstore, create_embeddings(use_sidecar=False))
+    retriever = NavigatorRetriever(vectorstore, args.vectorstore, use_result_cache=False)
+    compressor = ContextCompressor(vectorstore.embeddings, token_budget=args.budget)
+    llm = None
+    if args.llm:
+        from langchain_groq import ChatGroq
+        llm = ChatGroq(model="openai/gpt-oss-120b", groq_api_key=os.environ["GROQ_API_KEY"], temperature=0.4)
+    queries = [item['query'] for item in load_queries(args.queries)]
+    print(f"🗜️ Context compression benchmark on {len(queries)} queries (budget {args.budget} tokens)"
+          f"{', with LLM calls' if llm else ''}")
+
+    results = {name: {'tokens': [], 'ms': [], 'prompt tokens': [], 'llm ms': []} for name in ('raw', 'compressed')}
+    for query in queries:
+        docs = retriever.retrieve(query)
+        for name in ('raw', 'compressed'):
+            start_time = time.perf_counter()
+            if name == 'raw':
+                content = build_course_content(docs)
+            else:
+                content = compressor.compress(docs, retriever.embed_queries([query]))
+            results[name]['ms'].append((time.perf_counter() - start_time) * 1000)
+            results[name]['tokens'].append(estimate_tokens(content))
+            if llm is not None:
+                start_time = time.perf_counter()
+                response = llm.invoke(COMPRESS_PROMPT.format(course_content=content, query=query))
+                results[name]['llm ms'].append((time.perf_counter() - start_time) * 1000)
+                usage = getattr(response, 'usage_metadata', None) or {}
+                if usage.get('input_tokens'):
+                    results[name]['prompt tokens'].append(usage['input_tokens'])
+
+    rows = []
+    for name, values in results.items():
+        row = {
+            'context': name,
+            'avg context tokens': round(statistics.mean(values['tokens']), 1),
+            'max context tokens': max(values['tokens']),
+            'p50 build ms': round(percentile(values['ms'], 50), 2),
+            'p95 build ms': round(percentile(values['ms'], 95), 2)
+        }
+        if values['prompt tokens']:
+            row['avg prompt tokens'] = round(statistics.mean(values['prompt tokens']), 1)
+        if values['llm ms']:
+            row['p50 llm ms'] = round(percentile(values['llm ms'], 50), 1)
+            row['p95 llm ms'] = round(percentile(values['llm ms'], 95), 1)
+        rows.append(row)
+    print_table(rows, ['context', 'avg context tokens', 'max context tokens', 'p50 build ms', 'p95 build ms',
+                       'avg prompt tokens', 'p50 llm ms', 'p95 llm ms'])
+    raw_tokens = statistics.mean(results['raw']['tokens'])
+    compressed_tokens = statistics.mean(results['compressed']['tokens'])
+    print(f"📉 Context tokens reduced by {100 * (1 - compressed_tokens / raw_tokens):.1f}%")
+
+
+# --- boilerplate: index size and prompt context with / without cross-page boilerplate removal ---
+
+def directory_size_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / (1024 * 1024)
+
+
+def bench_boilerplate(args):
+    from tutor_embeddings import create_embeddings
+    from vector_index import load_vectorstore
+    from retrieval import NavigatorRetriever, build_course_content, estimate_tokens
+    from chunk_store import ChunkStore, chunk_store_path
+    from ingest import ingest
+
+    embeddings = create_embeddings(use_sidecar=False)
+    source_folders = [os.path.join(args.html_root, folder) for folder in args.folders.split(',')]
+    queries = [item['query'] for item in load_queries(args.queries)]
+    print(f"🧹 Boilerplate benchmark: ingesting {args.html_root} twice, then {len(queries)} recorded queries")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, min_pages in (('kept', 0), (f'removed (>= {args.min_pages} pages)', args.min_pages)):
+            vectorstore_path = os.path.join(work_dir, f"min_pages_{min_pages}")
+            os.makedirs(vectorstore_path)
+            ingest(vectorstore_path, source_folders, args.html_root, embeddings, min_pages=min_pages)
+
+            store = ChunkStore(chunk_store_path(vectorstore_path))
+            chunk_chars = [len(store.text_at(row)) for row in range(len(store))]
+            vectorstore = load_vectorstore(vectorstore_path, embeddings)
+            retriever = NavigatorRetriever(vectorstore, vectorstore_path, use_result_cache=False)
+            context_tokens = [estimate_tokens(build_course_content(retriever.retrieve(query))) for query in queries]
+            rows.append({
+                'boilerplate': name,
+                'chunks': len(store),
+                'corpus chars': sum(chunk_chars),
+                'index MB': round(directory_size_mb(vectorstore_path), 2),
+                'avg context tokens': round(statistics.mean(context_tokens), 1),
+                'max context tokens': max(context_tokens)
+            })
+    print_table(rows, ['boilerplate', 'chunks', 'corpus chars', 'index MB', 'avg context tokens', 'max context tokens'])
+    before, after = rows
+    print(f"📉 Index {100 * (1 - after['chunks'] / before['chunks']):.1f}% fewer chunks, average prompt context "
+          f"{100 * (1 - after['avg context tokens'] / before['avg context tokens']):.1f}% smaller")
+
+
+# --- intent: local classifier vs heuristic vs LLM intent analysis ---
+
+def bench_intent(args):
+    from tutor_embeddings import create_embeddings
+    from intent_classifier import IntentClassifier
+    from multi_agent_tutor import analyze_input_intent
+
+    turns = [item for item in load_queries(args.queries) if item.get('intent')]
+    classifier = IntentClassifier(create_embeddings(use_sidecar=False), confidence_threshold=args.confidence)
+    classifier.fit()
+    llm = None
+    if args.llm:
+        from langchain_groq import ChatGroq
+        llm = ChatGroq(model="openai/gpt-oss-120b", groq_api_key=os.environ["GROQ_API_KEY"], temperature=0.4)
+    print(f"🎯 Intent benchmark on {len(turns)} labelled turns{', with LLM calls' if llm else ''}")
+
+    results = {name: {'intents': [], 'ms': []} for name in ('heuristic', 'classifier', 'llm', 'classifier + llm')}
+    fallbacks = 0
+    for turn in turns:
+        query, previous_question = turn['query'], turn.get('previous_question', '')
+        start_time = time.perf_counter()
+        results['heuristic']['intents'].append(analyze_input_intent(query, previous_question))
+        results['heuristic']['ms'].append((time.perf_counter() - start_time) * 1000)
+
+        start_time = time.perf_counter()
+        intent, confidence = classifier.classify(query, previous_question)
+        results['classifier']['intents'].append(intent)
+        results['classifier']['ms'].append((time.perf_counter() - start_time) * 1000)
+        confident = classifier.is_confident(confidence)
+        fallbacks += not confident
+
+        if llm is not None:
+            start_time = time.perf_counter()
+            llm_intent = analyze_input_intent(query, previous_question, llm)
+            llm_ms = (time.perf_counter() - start_time) * 1000
+            results['llm']['intents'].append(llm_intent)
+            results['llm']['ms'].append(llm_ms)
+            results['classifier + llm']['intents'].append(intent if confident else llm_intent)
+            results['classifier + llm']['ms'].append(results['classifier']['ms'][-1] + (0 if confident else llm_ms))
+
+    labels = [turn['intent'] for turn in turns]
+    rows = []
+    for name, values in results.items():
+        if not values['intents']:
+            continue
+        row = {
+            'method': name,
+            'accuracy': round(sum(a == b for a, b in zip(values['intents'], labels)) / len(labels), 3),
+            'p50 ms': round(percentile(values['ms'], 50), 3),
+            'p95 ms': round(percentile(values['ms'], 95), 3)
+        }
+        if results['llm']['intents']:
+            row['llm agreement'] = round(sum(a == b for a, b in zip(values['intents'], results['llm']['intents'])) / len(labels), 3)
+        rows.append(row)
+    print_table(rows, ['method', 'accuracy', 'llm agreement', 'p50 ms', 'p95 ms'])
+    print(f"🔁 LLM fallback on {fallbacks}/{len(turns)} turns (confidence < {args.confidence})")
+
+
+# --- stream: time to first visible token (/ask_stream) vs full response (/ask) ---
+
+def bench_stream(args):
+    from multi_agent_tutor import create_tutor_system
+
+    tutor = create_tutor_system()
+    queries = [item['query'] for item in load_queries(args.queries) if not item.get('previous_question')][:args.limit]
+    print(f"📡 Streaming benchmark on {len(queries)} first turns (one LLM call each per mode)")
+
+    first_token_ms, stream_ms, blocking_ms = [], [], []
+    for position, query in enumerate(queries):
+        start_time = time.perf_counter()
+        tutor.chat(query, session_id=f"bench-blocking-{position}")
+        blocking_ms.append((time.perf_counter() - start_time) * 1000)
+
+        start_time = time.perf_counter()
+        first = None
+        for kind, _ in tutor.stream_chat(query, session_id=f"bench-stream-{position}"):
+            if kind == 'delta' and first is None:
+                first = (time.perf_counter() - start_time) * 1000
+        stream_ms.append((time.perf_counter() - start_time) * 1000)
+        if first is not None:
+            first_token_ms.append(first)
+
+    rows = [
+        {'mode': '/ask', 'p50 visible ms': round(percentile(blocking_ms, 50), 1),
+         'p95 visible ms': round(percentile(blocking_ms, 95), 1), 'p50 complete ms': round(percentile(blocking_ms, 50), 1)},
+        {'mode': '/ask_stream', 'p50 visible ms': round(percentile(first_token_ms, 50), 1) if first_token_ms else '',
+         'p95 visible ms': round(percentile(first_token_ms, 95), 1) if first_token_ms else '',
+         'p50 complete ms': round(percentile(stream_ms, 50), 1)}
+    ]
+    print_table(rows, ['mode', 'p50 visible ms', 'p95 visible ms', 'p50 complete ms'])
+    print(f"📝 {len(first_token_ms)}/{len(queries)} streamed responses produced visible text before completion")
+
+
+# --- prompt: input tokens per turn, legacy single-string prompt vs static prefix + dynamic message ---
+
+PROMPT_BENCH_PLAN = ["Basic definition and recognition", "Analyze real examples",
+                     "Understand consequences for investigations", "Learn prevention strategies"]
+
+
+def bench_turn_context(turn):
+    """Session state for a recorded turn: follow-up turns carry a plan and the tutor question they answer"""
+    from types import SimpleNamespace
+    from multi_agent_tutor import UserProfile, ScaffoldingLevel
+
+    follow_up = bool(turn.get('previous_question'))
+    return SimpleNamespace(
+        user_profile=UserProfile.CJ_STUDENT, scaffolding_level=ScaffoldingLevel.GUIDED_SUPPORT,
+        current_topic="", learning_objective="", last_question=turn.get('previous_question', ''),
+        learning_plan=PROMPT_BENCH_PLAN if follow_up else None, current_plan_step=1 if follow_up else 0,
+        plan_just_completed=False)
+
+
+def bench_prompt(args):
+    from tutor_embeddings import create_embeddings
+    from vector_index import load_vectorstore
+    from retrieval import NavigatorRetriever, build_course_content, estimate_tokens
+    from multi_agent_tutor import UnifiedTutorAgent
+
+    vectorstore = load_vectorstore(args.vectorstore, create_embeddings(use_sidecar=False))
+    retriever = NavigatorRetriever(vectorstore, args.vectorstore, use_result_cache=False)
+    builder = UnifiedTutorAgent(None, retriever).prompt_builder
+    llm = None
+    if args.llm:
+        from langchain_groq import ChatGroq
+        llm = ChatGroq(model="openai/gpt-oss-120b", groq_api_key=os.environ["GROQ_API_KEY"], temperature=0.4)
+    turns = load_queries(args.queries)
+    print(f"🧾 Prompt benchmark on {len(turns)} turns{', with LLM calls' if llm else ''}")
+
+    results = {mode: {'total': [], 'dynamic': [], 'llm input': [], 'llm cached': []} for mode in ('legacy', 'prefix')}
+    for turn in turns:
+        context = bench_turn_context(turn)
+        course_content = build_course_content(retriever.retrieve(turn['query']))
+        for mode in ('legacy', 'prefix'):
+            builder.mode = mode
+            prompt = builder.build(turn['query'], context, course_content)
+            if mode == 'legacy':
+                results[mode]['total'].append(estimate_tokens(prompt))
+                results[mode]['dynamic'].append(estimate_tokens(prompt))
+            else:
+                results[mode]['total'].append(builder.static_tokens + estimate_tokens(prompt[1].content))
+                results[mode]['dynamic'].append(estimate_tokens(prompt[1].content))
+            if llm is not None:
+                usage = getattr(llm.invoke(prompt, max_tokens=1), 'usage_metadata', None) or {}
+                results[mode]['llm input'].append(usage.get('input_tokens', 0))
+                results[mode]['llm cached'].append((usage.get('input_token_details') or {}).get('cache_read', 0))
+
+    rows = []
+    for mode, values in results.items():
+        row = {
+            'prompt': mode,
+            'avg input tokens': round(statistics.mean(values['total']), 1),
+            'avg uncacheable tokens': round(statistics.mean(values['dynamic']), 1),
+            'max input tokens': max(values['total'])
+        }
+        if values['llm input']:
+            row['avg llm input tokens'] = round(statistics.mean(values['llm input']), 1)
+            row['avg llm cached tokens'] = round(statistics.mean(values['llm cached']), 1)
+        rows.append(row)
+    print_table(rows, ['prompt', 'avg input tokens', 'avg uncacheable tokens', 'max input tokens',
+                       'avg llm input tokens', 'avg llm cached tokens'])
+    print(f"📌 Static prefix: {builder.static_tokens} tokens, identical on every turn")
+
+
+# --- schema: generated tokens, LLM latency and truncation, full response schema vs lean (plan deltas, capped thought) ---
+
+def bench_schema(args):
+    from langchain_groq import ChatGroq
+    from tutor_embeddings import create_embeddings
+    from vector_index import load_vectorstore
+    from retrieval import NavigatorRetriever, build_course_content, estimate_tokens
+    from multi_agent_tutor import UnifiedTutorAgent
+    from prompt_builder import PromptBuilder
+
+    vectorstore = load_vectorstore(args.vectorstore, create_embeddings(use_sidecar=False))
+    retriever = NavigatorRetriever(vectorstore, args.vectorstore, use_result_cache=False)
+    agent = UnifiedTutorAgent(None, retriever)
+    builders = {schema: PromptBuilder(agent.prompt_builder.profile_instructions,
+                                      agent.prompt_builder.scaffolding_approaches, mode='prefix', schema=schema)
+                for schema in ('full', 'lean')}
+    llm = ChatGroq(model="openai/gpt-oss-120b", groq_api_key=os.environ["GROQ_API_KEY"], temperature=0.4)
+    turns = load_queries(args.queries)[:args.limit]
+    # Candidate caps (high,guided,low) to measure before configuring CJ_MAX_TOKENS_*; default: as configured
+    caps = dict(zip(('high_support', 'guided_support', 'low_support'),
+                    (int(cap) for cap in args.caps.split(',')))) if args.caps else None
+    print(f"📏 Response schema benchmark on {len(turns)} turns (one Groq call per turn and schema), "
+          f"max_tokens: {caps or 'as configured'}")
+
+    results = {schema: {'output tokens': [], 'ms': [], 'valid': 0, 'truncated': 0} for schema in builders}
+    for turn in turns:
+        context = bench_turn_context(turn)
+        course_content = build_course_content(retriever.retrieve(turn['query']))
+        for schema, builder in builders.items():
+            prompt = builder.build(turn['query'], context, course_content)
+            level = context.scaffolding_level.value
+            max_tokens = caps.get(level) if caps else builder.max_tokens(level)
+            kwargs = {'max_tokens': max_tokens} if max_tokens else {}
+            start_time = time.perf_counter()
+            response = llm.invoke(prompt, **kwargs)
+            results[schema]['ms'].append((time.perf_counter() - start_time) * 1000)
+            usage = getattr(response, 'usage_metadata', None) or {}
+            results[schema]['output tokens'].append(usage.get('output_tokens') or estimate_tokens(response.content))
+            results[schema]['truncated'] += (getattr(response, 'response_metadata', None) or {}).get('finish_reason') == 'length'
+            content = response.content
+            try:
+                parsed = json.loads(content[content.find('{'):content.rfind('}') + 1])
+                results[schema]['valid'] += bool(parsed.get('response_to_student'))
+            except ValueError:
+                pass
+
+    rows = []
+    for schema, values in results.items():
+        rows.append({
+            'schema': schema,
+            'avg output tokens': round(statistics.mean(values['output tokens']), 1),
+            'p50 llm ms': round(percentile(values['ms'], 50), 1),
+            'p95 llm ms': round(percentile(values['ms'], 95), 1),
+            'valid json': f"{values['valid']}/{len(turns)}",
+            'truncated': f"{values['truncated']}/{len(turns)}"
+        })
+    print_table(rows, ['schema', 'avg output tokens', 'p50 llm ms', 'p95 llm ms', 'valid json', 'truncated'])
+    full_tokens = statistics.mean(results['full']['output tokens'])
+    lean_tokens = statistics.mean(results['lean']['output tokens'])
+    print(f"📉 Output tokens reduced by {100 * (1 - lean_tokens / full_tokens):.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CJ-Mentor retrieval benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    docstore_parser = subparsers.add_parser('docstore', help='Pickled docstore vs chunk store load time and RSS')
+    docstore_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    docstore_parser.add_argument('--repeat', type=int, default=3)
+    docstore_parser.set_defaults(func=bench_docstore)
+
+    docstore_child = subparsers.add_parser('docstore-child')
+    docstore_child.add_argument('mode', choices=['pickle', 'chunks'])
+    docstore_child.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    docstore_child.set_defaults(func=child_docstore)
+
+    embedding_parser = subparsers.add_parser('embedding', help='Import time, RSS and latency per embedding backend')
+    embedding_parser.add_argument('--backends', default='torch,onnx')
+    embedding_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    embedding_parser.set_defaults(func=bench_embedding)
+
+    embedding_child = subparsers.add_parser('embedding-child')
+    embedding_child.add_argument('backend')
+    embedding_child.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    embedding_child.set_defaults(func=child_embedding)
+
+    context_parser = subparsers.add_parser('context', help='Prompt context size: top-3 vs cutoff + MMR + budget')
+    context_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    context_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    context_parser.set_defaults(func=bench_context)
+
+    hybrid_parser = subparsers.add_parser('hybrid', help='Dense-only vs hybrid BM25 + dense latency and hit rate')
+    hybrid_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    hybrid_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    hybrid_parser.add_argument('--keyword-queries', default=DEFAULT_KEYWORD_QUERIES_PATH)
+    hybrid_parser.set_defaults(func=bench_hybrid)
+
+    ann_parser = subparsers.add_parser('ann', help='Recall@k, latency and size per index type')
+    ann_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    ann_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    ann_parser.add_argument('--types', default='flat,hnsw,ivfpq')
+    ann_parser.add_argument('--k', type=int, default=5)
+    ann_parser.add_argument('--corpus-sample', type=int, default=0,
+                            help='Use N stored chunk vectors as queries instead of embedding --queries')
+    ann_parser.set_defaults(func=bench_ann)
+
+    compact_parser = subparsers.add_parser('compact', help='fp16 / sq8 / PCA variants vs full precision')
+    compact_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    compact_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    compact_parser.add_argument('--types', default='flat,fp16,sq8,flat_pca128,sq8_pca128')
+    compact_parser.add_argument('--k', type=int, default=5)
+    compact_parser.add_argument('--corpus-sample', type=int, default=0,
+                                help='Use N stored chunk vectors as queries instead of embedding --queries')
+    compact_parser.set_defaults(func=bench_ann)
+
+    batcher_parser = subparsers.add_parser('batcher', help='Per-request vs micro-batched retrieval under load')
+    batcher_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    batcher_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    batcher_parser.add_argument('--concurrency', default='1,4,8,16')
+    batcher_parser.add_argument('--rounds', type=int, default=3)
+    batcher_parser.set_defaults(func=bench_batcher)
+
+    compress_parser = subparsers.add_parser('compress', help='Prompt tokens and LLM latency: raw vs compressed context')
+    compress_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    compress_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    compress_parser.add_argument('--budget', type=int, default=250, help='Context token budget')
+    compress_parser.add_argument('--llm', action='store_true', help='Also time a Groq call per context (GROQ_API_KEY)')
+    compress_parser.set_defaults(func=bench_compress)
+
+    boilerplate_parser = subparsers.add_parser('boilerplate', help='Index size and prompt context with / without boilerplate removal')
+    boilerplate_parser.add_argument('--html-root', default=os.path.join(BASE_DIR, '..', 'CyberCJ-main'))
+    boilerplate_parser.add_argument('--folders', default='CyberCJ,CyberCJ_Challenges')
+    boilerplate_parser.add_argument('--min-pages', type=int, default=2)
+    boilerplate_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    boilerplate_parser.set_defaults(func=bench_boilerplate)
+
+    intent_parser = subparsers.add_parser('intent', help='Local intent classifier vs heuristic vs LLM intent analysis')
+    intent_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    intent_parser.add_argument('--confidence', type=float, default=0.5, help='LLM fallback threshold')
+    intent_parser.add_argument('--llm', action='store_true', help='Also run the LLM path per turn (GROQ_API_KEY)')
+    intent_parser.set_defaults(func=bench_intent)
+
+    stream_parser = subparsers.add_parser('stream', help='Time to first visible token: /ask_stream vs /ask (GROQ_API_KEY)')
+    stream_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    stream_parser.add_argument('--limit', type=int, default=5, help='First-turn queries to send')
+    stream_parser.set_defaults(func=bench_stream)
+
+    prompt_parser = subparsers.add_parser('prompt', help='Input tokens per turn: legacy prompt vs static prefix + dynamic message')
+    prompt_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    prompt_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    prompt_parser.add_argument('--llm', action='store_true', help='Also send each prompt to Groq for its usage counts (GROQ_API_KEY)')
+    prompt_parser.set_defaults(func=bench_prompt)
+
+    schema_parser = subparsers.add_parser('schema', help='Output tokens and LLM latency: full vs lean response schema (GROQ_API_KEY)')
+    schema_parser.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    schema_parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    schema_parser.add_argument('--limit', type=int, default=20, help='Turns to send')
+    schema_parser.add_argument('--caps', default='', help='max_tokens per level to try: high,guided,low (e.g. 1600,1200,1000)')
+    schema_parser.set_defaults(func=bench_schema)
+
+    ann_child = subparsers.add_parser('ann-child')
+    ann_child.add_argument('index_type')
+    ann_child.add_argument('--vectors', required=True)
+    ann_child.add_argument('--k', type=int, default=5)
+    ann_child.add_argument('--vectorstore', default=DEFAULT_VECTORSTORE_PATH)
+    ann_child.set_defaults(func=child_ann)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Prebuilt BM25 inverted index over the navigator chunks.
+
+Built offline from the chunk store next to index.faiss, so it always covers the
+same chunks as the FAISS index:
+
+    bm25/
+        vocab.json        sorted term list (term id = position) + build parameters
+        indptr.npy        int64 CSR row pointers, one per term (vocab size + 1)
+        rows.npy          int32 chunk-store rows of every posting
+        impacts.npy       float32 precomputed BM25 weight of every posting
+        chunk_ids.npy     int64 chunk id (FAISS id) of every chunk-store row
+
+The full BM25 weight (idf * saturated, length-normalized tf) is computed at
+build time, so scoring a query is one np.add.at per query term.
+
+Usage:
+    python bm25_index.py build [faiss_index_cybersecurity_navigator]
+"""
+
+import os
+import re
+import sys
+import json
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+BM25_DIR_NAME = "bm25"
+FORMAT_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about an and any are as at be been but by can could do does for from had has have how i if in into
+is it its me my of on or our so such than that the their them then there these they this to was we
+were what when where which who why will with would you your explain tell know learn want please
+""".split())
+
+
+def bm25_path(vectorstore_path: str) -> str:
+    return os.path.join(vectorstore_path, BM25_DIR_NAME)
+
+
+def has_bm25_index(vectorstore_path: str) -> bool:
+    return os.path.exists(os.path.join(bm25_path(vectorstore_path), "vocab.json"))
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric terms without stopwords"""
+    return [token for token in _TOKEN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Read-only, memory-mapped BM25 index (see module docstring)"""
+
+    def __init__(self, index_path: str):
+        with open(os.path.join(index_path, "vocab.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format: {meta.get('format_version')}")
+
+        self.count: int = meta["count"]
+        self.terms: Dict[str, int] = {term: term_id for term_id, term in enumerate(meta["terms"])}
+        self.indptr = np.load(os.path.join(index_path, "indptr.npy"), mmap_mode="r")
+        self.rows = np.load(os.path.join(index_path, "rows.npy"), mmap_mode="r")
+        self.impacts = np.load(os.path.join(index_path, "impacts.npy"), mmap_mode="r")
+        self.chunk_ids = np.load(os.path.join(index_path, "chunk_ids.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def idf(self, term: str) -> float:
+        term_id = self.terms.get(term)
+        df = 0 if term_id is None else int(self.indptr[term_id + 1] - self.indptr[term_id])
+        return math.log(1.0 + (self.count - df + 0.5) / (df + 0.5))
+
+    def score(self, terms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 score of every chunk-store row, and how many distinct query terms each row contains"""
+        scores = np.zeros(self.count, dtype=np.float32)
+        matched = np.zeros(self.count, dtype=np.int32)
+        for term in set(terms):
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.indptr[term_id]), int(self.indptr[term_id + 1])
+            rows = self.rows[start:end]
+            np.add.at(scores, rows, self.impacts[start:end])
+            matched[rows] += 1
+        return scores, matched
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float, float]]:
+        """
+        Top-k (chunk_id, bm25 score, query term coverage in 0..1) for a query,
+        best first; chunks without any query term are never returned.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        scores, matched = self.score(terms)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(self.chunk_ids[row]), float(scores[row]), int(matched[row]) / len(terms)) for row in candidates]
+
+
+def build_bm25_index(vectorstore_path: str, index_path: Optional[str] = None,
+                     k1: float = BM25_K1, b: float = BM25_B) -> int:
+    """Build the BM25 index from the chunk store of a vectorstore"""
+    from chunk_store import ChunkStore, chunk_store_path
+
+    store = ChunkStore(chunk_store_path(vectorstore_path))
+    index_path = index_path or bm25_path(vectorstore_path)
+    os.makedirs(index_path, exist_ok=True)
+
+    term_counts: List[Counter] = [Counter(tokenize(store.text_at(row))) for row in range(len(store))]
+    doc_lengths = np.asarray([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+    avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 1.0
+
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    for row, counts in enumerate(term_counts):
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((row, tf))
+
+    terms = sorted(postings)
+    indptr = [0]
+    rows: List[int] = []
+    impacts: List[float] = []
+    count = len(store)
+    for term in terms:
+        term_postings = postings[term]
+        df = len(term_postings)
+        idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+        for row, tf in term_postings:
+            norm = k1 * (1.0 - b + b * doc_lengths[row] / avg_length)
+            rows.append(row)
+            impacts.append(idf * tf * (k1 + 1.0) / (tf + norm))
+        indptr.append(len(rows))
+
+    np.save(os.path.join(index_path, "indptr.npy"), np.asarray(indptr, dtype=np.int64))
+    np.save(os.path.join(index_path, "rows.npy"), np.asarray(rows, dtype=np.int32))
+    np.save(os.path.join(index_path, "impacts.npy"), np.asarray(impacts, dtype=np.float32))
+    np.save(os.path.join(index_path, "chunk_ids.npy"), np.asarray(store.ids, dtype=np.int64))
+    with open(os.path.join(index_path, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "count": count,
+            "k1": k1,
+            "b": b,
+            "avg_length": avg_length,
+            "terms": terms
+        }, f, ensure_ascii=False)
+
+    return len(terms)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Usage: python bm25_index.py build [vectorstore_path]")
+        sys.exit(1)
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    vectorstore_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(base_dir, "faiss_index_cybersecurity_navigator")
+    vocabulary_size = build_bm25_index(vectorstore_path)
+    print(f"✅ Wrote BM25 index ({vocabulary_size} terms) to {bm25_path(vectorstore_path)}")
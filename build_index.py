@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Build approximate (ANN) and compact variants of the navigator FAISS index.
+
+The raw chunk embeddings are the source of truth: embeddings.npy (with
+embedding_ids.npy, written by ingest.py) when present, else the vectors of the
+exact index.faiss. They are re-indexed as-is, so no chunk has to be embedded
+again and FAISS ids stay equal to chunk ids. Every variant is written next to
+index.faiss as
+
+    index_<type>.faiss    the index
+    index_<type>.json     build parameters and the search-time parameters
+
+and selected at runtime with CJ_INDEX_TYPE (see vector_index.py).
+
+fp16 and sq8 are exact-scan indexes storing each dimension as a float16 or an
+8-bit scalar-quantized code (2x and 4x smaller than float32). --pca D puts a
+PCA projection to D dimensions, learned from the indexed vectors, in front of
+any type (variant name "<type>_pca<D>"); FAISS applies the same projection to
+every query vector, so the query path needs no changes.
+
+Usage:
+    python build_index.py --type hnsw [--hnsw-m 32] [--ef-construction 200] [--ef-search 64]
+    python build_index.py --type ivfpq [--nlist N] [--pq-m 48] [--pq-nbits N] [--nprobe 8]
+    python build_index.py --type sq8 [--pca 128]
+    python build_index.py --type all [--pca D]
+    python build_index.py --knn-graph [--graph-k 16]
+
+--knn-graph also (re)builds the chunk neighbour graph (see chunk_graph.py).
+"""
+
+import os
+import json
+import math
+import time
+import argparse
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_VECTORSTORE_PATH = os.path.join(BASE_DIR, "faiss_index_cybersecurity_navigator")
+FLAT_INDEX_FILE_NAME = "index.faiss"
+# Persistent raw embeddings (row i is the vector of chunk id embedding_ids[i])
+EMBEDDINGS_FILE_NAME = "embeddings.npy"
+EMBEDDING_IDS_FILE_NAME = "embedding_ids.npy"
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq", "fp16", "sq8")
+VARIANT_TYPES = ("hnsw", "ivfpq", "fp16", "sq8")
+
+DEFAULT_PARAMS: Dict[str, Dict[str, Any]] = {
+    "flat": {},
+    "hnsw": {"hnsw_m": 32, "ef_construction": 200, "ef_search": 64},
+    # nlist and pq_nbits default to what the corpus size can train (see build_variant)
+    "ivfpq": {"nlist": None, "pq_m": 48, "pq_nbits": None, "nprobe": 8},
+    "fp16": {},
+    "sq8": {},
+}
+# Parameters applied at search time (FAISS ParameterSpace names)
+SEARCH_PARAMS = {"ef_search": "efSearch", "nprobe": "nprobe"}
+
+
+def variant_name(index_type: str, pca_dim: int = 0) -> str:
+    return f"{index_type}_pca{pca_dim}" if pca_dim else index_type
+
+
+def index_file_name(index_type: str) -> str:
+    return FLAT_INDEX_FILE_NAME if index_type == "flat" else f"index_{index_type}.faiss"
+
+
+def params_file_name(index_type: str) -> str:
+    return f"index_{index_type}.json"
+
+
+def load_index_params(vectorstore_path: str, index_type: str) -> Dict[str, Any]:
+    """Parameters stored next to an index variant ({} for the flat index)"""
+    path = os.path.join(vectorstore_path, params_file_name(index_type))
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def apply_search_params(index, params: Dict[str, Any]):
+    """Set search-time parameters (efSearch, nprobe) on an index, through any wrappers"""
+    parameter_space = faiss.ParameterSpace()
+    for key, faiss_name in SEARCH_PARAMS.items():
+        if params.get(key) is not None:
+            parameter_space.set_index_parameter(index, faiss_name, params[key])
+
+
+def factory_string(index_type: str, params: Dict[str, Any], pca_dim: int = 0) -> str:
+    if index_type == "flat":
+        factory = "Flat"
+    elif index_type == "hnsw":
+        factory = f"HNSW{params['hnsw_m']}"
+    elif index_type == "ivfpq":
+        factory = f"IVF{params['nlist']},PQ{params['pq_m']}x{params['pq_nbits']}"
+    elif index_type == "fp16":
+        factory = "SQfp16"
+    elif index_type == "sq8":
+        factory = "SQ8"
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+    return f"PCA{pca_dim},{factory}" if pca_dim else factory
+
+
+def has_embedding_store(vectorstore_path: str) -> bool:
+    return os.path.exists(os.path.join(vectorstore_path, EMBEDDINGS_FILE_NAME))
+
+
+def read_chunk_vectors(vectorstore_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (chunk ids, float32 vectors) of every indexed chunk: the persistent embedding
+    store if present, else the vectors of index.faiss (plain or ID-mapped)
+    """
+    if has_embedding_store(vectorstore_path):
+        ids = np.load(os.path.join(vectorstore_path, EMBEDDING_IDS_FILE_NAME))
+        vectors = np.load(os.path.join(vectorstore_path, EMBEDDINGS_FILE_NAME))
+        return ids.astype(np.int64), np.ascontiguousarray(vectors, dtype=np.float32)
+
+    flat_index = faiss.read_index(os.path.join(vectorstore_path, FLAT_INDEX_FILE_NAME))
+    if hasattr(flat_index, "id_map"):
+        ids = faiss.vector_to_array(flat_index.id_map).astype(np.int64)
+        inner = faiss.downcast_index(flat_index.index)
+        return ids, inner.reconstruct_n(0, inner.ntotal)
+    return np.arange(flat_index.ntotal, dtype=np.int64), flat_index.reconstruct_n(0, flat_index.ntotal)
+
+
+def read_flat_vectors(vectorstore_path: str) -> np.ndarray:
+    """All chunk vectors, in chunk id order"""
+    ids, vectors = read_chunk_vectors(vectorstore_path)
+    return vectors[np.argsort(ids, kind="stable")]
+
+
+def build_index(vectors: np.ndarray, index_type: str, params: Dict[str, Any], pca_dim: int = 0,
+                ids: Optional[np.ndarray] = None):
+    """
+    Train and fill an index of the given type. Vectors get ids 0..n-1, or the
+    given chunk ids (through an IndexIDMap2 wrapper) when those have gaps.
+    """
+    index = faiss.index_factory(vectors.shape[1], factory_string(index_type, params, pca_dim), faiss.METRIC_L2)
+    if index_type == "hnsw":
+        hnsw_index = faiss.downcast_index(index.index) if pca_dim else index
+        hnsw_index.hnsw.efConstruction = params["ef_construction"]
+    if not index.is_trained:
+        index.train(vectors)
+    if ids is not None and not np.array_equal(ids, np.arange(len(ids))):
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    else:
+        index.add(vectors)
+    apply_search_params(index, params)
+    return index
+
+
+def build_variant(vectorstore_path: str, index_type: str, overrides: Optional[Dict[str, Any]] = None,
+                  pca_dim: int = 0) -> Dict[str, Any]:
+    """Build index_<variant>.faiss from the chunk vectors and write its parameter file"""
+    if index_type == "flat" and not pca_dim:
+        raise ValueError("The flat index is index.faiss itself; use --pca to build a reduced flat variant")
+    ids, vectors = read_chunk_vectors(vectorstore_path)
+    if pca_dim and not 0 < pca_dim < vectors.shape[1]:
+        raise ValueError(f"--pca must be between 1 and {vectors.shape[1] - 1}")
+    params = dict(DEFAULT_PARAMS[index_type])
+    params.update({key: value for key, value in (overrides or {}).items() if key in params and value is not None})
+    if index_type == "ivfpq":
+        # k-means wants >= 39 training points per centroid: ~sqrt(n) lists, and at most
+        # 8 bits per PQ code (fewer for small corpora like today's ~1.3k chunks)
+        if not params["nlist"]:
+            params["nlist"] = max(1, int(math.sqrt(len(vectors))))
+        if not params["pq_nbits"]:
+            params["pq_nbits"] = min(8, max(4, int(math.log2(max(1, len(vectors) // 39)))))
+
+    start_time = time.time()
+    index = build_index(vectors, index_type, params, pca_dim, ids)
+    build_seconds = time.time() - start_time
+
+    name = variant_name(index_type, pca_dim)
+    index_path = os.path.join(vectorstore_path, index_file_name(name))
+    faiss.write_index(index, index_path + ".tmp")
+    os.replace(index_path + ".tmp", index_path)
+
+    record = {
+        "type": index_type,
+        "variant": name,
+        "factory": factory_string(index_type, params, pca_dim),
+        "params": params,
+        "pca_dim": pca_dim,
+        "ntotal": int(index.ntotal),
+        "dimension": int(vectors.shape[1]),
+        "build_seconds": round(build_seconds, 3),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": EMBEDDINGS_FILE_NAME if has_embedding_store(vectorstore_path) else FLAT_INDEX_FILE_NAME
+    }
+    with open(os.path.join(vectorstore_path, params_file_name(name)), "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+
+    size_mb = os.path.getsize(index_path) / (1024 * 1024)
+    print(f"✅ Built {name} index ({record['factory']}): {index.ntotal} vectors, "
+          f"{size_mb:.2f} MB, {build_seconds:.2f}s -> {index_path}")
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build ANN and compact variants of the navigator index")
+    parser.add_argument("--type", choices=list(INDEX_TYPES) + ["all"])
+    parser.add_argument("--pca", type=int, default=0, help="Project vectors to this many dimensions first")
+    parser.add_argument("--vectorstore", default=DEFAULT_VECTORSTORE_PATH)
+    parser.add_argument("--hnsw-m", type=int)
+    parser.add_argument("--ef-construction", type=int)
+    parser.add_argument("--ef-search", type=int)
+    parser.add_argument("--nlist", type=int)
+    parser.add_argument("--pq-m", type=int)
+    parser.add_argument("--pq-nbits", type=int)
+    parser.add_argument("--nprobe", type=int)
+    parser.add_argument("--knn-graph", action="store_true", help="Rebuild the chunk kNN graph")
+    parser.add_argument("--graph-k", type=int, help="Neighbours stored per chunk in the kNN graph")
+    args = parser.parse_args()
+    if not args.type and not args.knn_graph:
+        parser.error("give --type and/or --knn-graph")
+
+    overrides = {key: getattr(args, key) for key in
+                 ("hnsw_m", "ef_construction", "ef_search", "nlist", "pq_m", "pq_nbits", "nprobe")}
+    if args.type:
+        for index_type in (VARIANT_TYPES if args.type == "all" else (args.type,)):
+            build_variant(args.vectorstore, index_type, overrides, args.pca)
+
+    if args.knn_graph:
+        from chunk_graph import GRAPH_K, build_chunk_graph, graph_path
+        graph_k = args.graph_k or GRAPH_K
+        chunk_count = build_chunk_graph(args.vectorstore, graph_k)
+        print(f"✅ Wrote kNN graph ({chunk_count} chunks, k={graph_k}) to {graph_path(args.vectorstore)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Precomputed k-nearest-neighbour graph over the navigator chunks.
+
+Built offline from the chunk vectors (embeddings.npy or index.faiss), so row i
+holds the neighbours of chunk id i:
+
+    knn_graph/
+        meta.json           format version, chunk count, k
+        neighbors.npy       int32 [count, k] neighbour chunk ids, nearest first (-1 = none)
+        similarities.npy    float16 [count, k] cosine similarity of each neighbour
+
+Follow-up turns within a topic mostly need chunks next to the ones already in
+the prompt; NavigatorRetriever.expand() walks this graph from the previous
+turn's chunk ids instead of searching the index again.
+
+Usage:
+    python chunk_graph.py build [faiss_index_cybersecurity_navigator] [--k 16]
+"""
+
+import os
+import json
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+GRAPH_DIR_NAME = "knn_graph"
+FORMAT_VERSION = 1
+GRAPH_K = 16
+SEARCH_BATCH_SIZE = 256
+
+
+def graph_path(vectorstore_path: str) -> str:
+    return os.path.join(vectorstore_path, GRAPH_DIR_NAME)
+
+
+def has_chunk_graph(vectorstore_path: str) -> bool:
+    return os.path.exists(os.path.join(graph_path(vectorstore_path), "meta.json"))
+
+
+class ChunkGraph:
+    """Read-only, memory-mapped kNN graph (see module docstring)"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported kNN graph format: {meta.get('format_version')}")
+
+        self.count: int = meta["count"]
+        self.k: int = meta["k"]
+        self.neighbors = np.load(os.path.join(path, "neighbors.npy"), mmap_mode="r")
+        self.similarities = np.load(os.path.join(path, "similarities.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def expand(self, seed_ids: List[int], k: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        The k nearest neighbours of the seeds as (chunk_id, relevance), best first.
+        The seeds themselves are left out (they were in the previous prompt).
+        Relevance is the summed similarity to all seeds divided by the number of
+        seeds, so chunks next to several of the previous turn's chunks rank first.
+        """
+        k = min(k or self.k, self.k)
+        seeds = [seed for seed in dict.fromkeys(seed_ids) if 0 <= seed < self.count]
+        if not seeds:
+            return []
+
+        seed_set = set(seeds)
+        relevance: Dict[int, float] = {}
+        for seed in seeds:
+            for chunk_id, similarity in zip(self.neighbors[seed, :k], self.similarities[seed, :k]):
+                if chunk_id >= 0 and int(chunk_id) not in seed_set:
+                    relevance[int(chunk_id)] = relevance.get(int(chunk_id), 0.0) + float(similarity)
+        ranked = sorted(relevance.items(), key=lambda item: -item[1])
+        return [(chunk_id, score / len(seeds)) for chunk_id, score in ranked]
+
+
+def build_chunk_graph(vectorstore_path: str, k: int = GRAPH_K, index_path: Optional[str] = None) -> int:
+    """Exact kNN graph of every chunk vector; returns the number of rows (highest chunk id + 1)"""
+    import faiss
+    from build_index import read_chunk_vectors
+
+    chunk_ids, vectors = read_chunk_vectors(vectorstore_path)
+    # One row per chunk id; ids removed by incremental ingestion keep an empty (-1) row
+    count = int(chunk_ids.max()) + 1 if len(chunk_ids) else 0
+    k = min(k, len(vectors) - 1)
+    flat_index = faiss.IndexFlatIP(vectors.shape[1])
+    flat_index.add(vectors)
+
+    neighbors = np.full((count, k), -1, dtype=np.int32)
+    similarities = np.zeros((count, k), dtype=np.float16)
+    for start in range(0, len(vectors), SEARCH_BATCH_SIZE):
+        batch = vectors[start:start + SEARCH_BATCH_SIZE]
+        # k + 1: a chunk is its own nearest neighbour (exact duplicates may come first instead)
+        batch_scores, batch_rows = flat_index.search(batch, k + 1)
+        for offset, (row_positions, row_scores) in enumerate(zip(batch_rows, batch_scores)):
+            position = start + offset
+            keep = [(int(chunk_ids[i]), float(s)) for i, s in zip(row_positions, row_scores)
+                    if i != position and i != -1][:k]
+            neighbors[chunk_ids[position], :len(keep)] = [i for i, _ in keep]
+            similarities[chunk_ids[position], :len(keep)] = [s for _, s in keep]
+
+    index_path = index_path or graph_path(vectorstore_path)
+    os.makedirs(index_path, exist_ok=True)
+    np.save(os.path.join(index_path, "neighbors.npy"), neighbors)
+    np.save(os.path.join(index_path, "similarities.npy"), similarities)
+    with open(os.path.join(index_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"format_version": FORMAT_VERSION, "count": count, "k": k}, f)
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the kNN graph over the navigator chunks")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("vectorstore", nargs="?",
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "faiss_index_cybersecurity_navigator"))
+    parser.add_argument("--k", type=int, default=GRAPH_K, help="Neighbours stored per chunk")
+    args = parser.parse_args()
+
+    chunk_count = build_chunk_graph(args.vectorstore, args.k)
+    print(f"✅ Wrote kNN graph ({chunk_count} chunks, k={args.k}) to {graph_path(args.vectorstore)}")
@@ -0,0 +1,181 @@
+"""
+Compact memory-mapped chunk store for the navigator index.
+
+Replaces the pickled LangChain InMemoryDocstore (index.pkl) with a directory of
+flat files next to index.faiss:
+
+    chunk_store/
+        texts.bin        all chunk texts as one contiguous UTF-8 blob
+        offsets.npy      int64 byte offsets into texts.bin (count + 1 entries)
+        ids.npy          int64 chunk ids (the ids FAISS returns), sorted ascending
+        metadata.npy     uint32 row -> entry in the metadata table
+        meta.json        format version, chunk count and the metadata table
+
+Nothing is unpickled and nothing is decoded at load time; a chunk's text is only
+decoded from a zero-copy slice of the mapped blob when a search returns it.
+
+Usage:
+    python chunk_store.py convert [faiss_index_cybersecurity_navigator]
+"""
+
+import os
+import sys
+import json
+import mmap
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+
+CHUNK_STORE_DIR_NAME = "chunk_store"
+FORMAT_VERSION = 1
+
+
+def chunk_store_path(vectorstore_path: str) -> str:
+    return os.path.join(vectorstore_path, CHUNK_STORE_DIR_NAME)
+
+
+def has_chunk_store(vectorstore_path: str) -> bool:
+    return os.path.exists(os.path.join(chunk_store_path(vectorstore_path), "meta.json"))
+
+
+class ChunkStore(Docstore):
+    """Read-only docstore backed by memory-mapped files (see module docstring)"""
+
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        with open(os.path.join(store_path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk store format: {meta.get('format_version')}")
+
+        self.count: int = meta["count"]
+        self.metadata_table: List[Dict[str, Any]] = meta["metadata_table"]
+        self.offsets = np.load(os.path.join(store_path, "offsets.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(store_path, "ids.npy"), mmap_mode="r")
+        self.metadata_rows = np.load(os.path.join(store_path, "metadata.npy"), mmap_mode="r")
+
+        self._texts_file = open(os.path.join(store_path, "texts.bin"), "rb")
+        if os.path.getsize(self._texts_file.name) > 0:
+            self._texts = memoryview(mmap.mmap(self._texts_file.fileno(), 0, access=mmap.ACCESS_READ))
+        else:
+            self._texts = memoryview(b"")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def row_of(self, chunk_id: int) -> int:
+        """Row of a chunk id (ids are sorted, so this is a binary search)"""
+        row = int(np.searchsorted(self.ids, chunk_id))
+        if row >= self.count or int(self.ids[row]) != int(chunk_id):
+            raise KeyError(chunk_id)
+        return row
+
+    def view(self, chunk_id: int) -> memoryview:
+        """Zero-copy UTF-8 bytes of a chunk"""
+        row = self.row_of(chunk_id)
+        return self._texts[int(self.offsets[row]):int(self.offsets[row + 1])]
+
+    def text(self, chunk_id: int) -> str:
+        return str(self.view(chunk_id), "utf-8")
+
+    def text_at(self, row: int) -> str:
+        return str(self._texts[int(self.offsets[row]):int(self.offsets[row + 1])], "utf-8")
+
+    def metadata(self, chunk_id: int) -> Dict[str, Any]:
+        return self.metadata_table[int(self.metadata_rows[self.row_of(chunk_id)])]
+
+    def search(self, search) -> Document:
+        """LangChain Docstore interface: chunk id -> Document (decodes only this chunk)"""
+        chunk_id = int(search)
+        try:
+            row = self.row_of(chunk_id)
+        except KeyError:
+            return f"ID {search} not found."
+        metadata = dict(self.metadata_table[int(self.metadata_rows[row])])
+        metadata["chunk_id"] = chunk_id
+        return Document(id=str(chunk_id), page_content=self.text_at(row), metadata=metadata)
+
+
+class ChunkIdMap(Mapping):
+    """
+    index_to_docstore_id for a ChunkStore: FAISS already returns chunk ids, so the
+    mapping is the identity over the stored ids (no per-chunk Python objects).
+    """
+
+    def __init__(self, chunk_store: ChunkStore):
+        self.chunk_store = chunk_store
+
+    def __getitem__(self, key):
+        return int(key)
+
+    def __iter__(self):
+        return (int(chunk_id) for chunk_id in self.chunk_store.ids)
+
+    def __len__(self):
+        return len(self.chunk_store)
+
+
+def write_chunk_store(store_path: str, chunks: Iterable[Tuple[int, str, Dict[str, Any]]]):
+    """Write (chunk_id, text, metadata) tuples as a chunk store; ids must be ascending"""
+    os.makedirs(store_path, exist_ok=True)
+
+    offsets = [0]
+    ids: List[int] = []
+    metadata_rows: List[int] = []
+    metadata_table: List[Dict[str, Any]] = []
+    metadata_lookup: Dict[str, int] = {}
+
+    with open(os.path.join(store_path, "texts.bin"), "wb") as texts_file:
+        for chunk_id, text, metadata in chunks:
+            if ids and chunk_id <= ids[-1]:
+                raise ValueError("Chunk ids must be written in ascending order")
+            encoded = text.encode("utf-8")
+            texts_file.write(encoded)
+            offsets.append(offsets[-1] + len(encoded))
+            ids.append(chunk_id)
+
+            key = json.dumps(metadata or {}, sort_keys=True, ensure_ascii=False)
+            if key not in metadata_lookup:
+                metadata_lookup[key] = len(metadata_table)
+                metadata_table.append(metadata or {})
+            metadata_rows.append(metadata_lookup[key])
+
+    np.save(os.path.join(store_path, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(store_path, "ids.npy"), np.asarray(ids, dtype=np.int64))
+    np.save(os.path.join(store_path, "metadata.npy"), np.asarray(metadata_rows, dtype=np.uint32))
+    with open(os.path.join(store_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "count": len(ids),
+            "metadata_table": metadata_table
+        }, f, ensure_ascii=False, indent=2)
+
+    return len(ids)
+
+
+def convert_pickled_docstore(vectorstore_path: str, store_path: Optional[str] = None) -> int:
+    """Convert an existing index.pkl (InMemoryDocstore) into a chunk store"""
+    from vector_index import load_pickled_docstore
+
+    docstore, index_to_docstore_id = load_pickled_docstore(vectorstore_path)
+
+    def iter_chunks():
+        for position in sorted(index_to_docstore_id):
+            doc = docstore.search(index_to_docstore_id[position])
+            yield int(position), doc.page_content, doc.metadata
+
+    return write_chunk_store(store_path or chunk_store_path(vectorstore_path), iter_chunks())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != "convert":
+        print("Usage: python chunk_store.py convert [vectorstore_path]")
+        sys.exit(1)
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    vectorstore_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(base_dir, "faiss_index_cybersecurity_navigator")
+    count = convert_pickled_docstore(vectorstore_path)
+    print(f"✅ Wrote {count} chunks to {chunk_store_path(vectorstore_path)}")
@@ -0,0 +1,158 @@
+"""
+Extractive compression of the retrieved chunks before they go into the prompt.
+
+Navigator chunks are ~500 characters of scraped page text: navigation labels,
+headings and sentences about neighbouring topics come along with the part the
+student asked about. ContextCompressor splits the selected chunks into
+sentences, scores every sentence against the turn's query vectors with the
+already-loaded MiniLM model (one matrix product), and keeps the best sentences,
+in their original order, until the token budget is used up.
+
+Sentence vectors are cached per chunk text, so a chunk is only split and
+embedded the first time it is selected. They are embedded with the underlying
+model directly and never enter the query embedding cache.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from retrieval import estimate_tokens
+
+CONTEXT_COMPRESSION_ENABLED = os.getenv("CJ_CONTEXT_COMPRESSION", "1").lower() not in ("0", "false", "no")
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CJ_CONTEXT_TOKEN_BUDGET", "250"))
+SENTENCE_CACHE_SIZE = int(os.getenv("CJ_SENTENCE_CACHE_SIZE", "2048"))
+# Fragments shorter than this (menu labels, stray headings) are never kept on their own
+MIN_SENTENCE_CHARS = 25
+
+# Sentence ends, or the runs of whitespace scraped pages leave between blocks
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])|\s{2,}|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences (and block fragments) of a chunk, whitespace-normalized"""
+    sentences = (" ".join(part.split()) for part in _SENTENCE_BREAK.split(text or ""))
+    return [sentence for sentence in sentences if sentence]
+
+
+def select_sentences(scores: np.ndarray, costs: List[int], token_budget: int) -> List[int]:
+    """Positions of the best-scoring sentences that fit the budget together (greedy, best first)"""
+    selected: List[int] = []
+    used = 0
+    for position in np.argsort(-scores, kind="stable"):
+        if used + costs[position] <= token_budget:
+            selected.append(int(position))
+            used += costs[position]
+    return sorted(selected)
+
+
+class ContextCompressor:
+    """Query-focused sentence extraction for course_content, with a per-chunk sentence cache"""
+
+    def __init__(self, embeddings, token_budget: int = CONTEXT_TOKEN_BUDGET, max_chunks: int = SENTENCE_CACHE_SIZE):
+        # Sentences bypass the query embedding cache (CachedEmbeddings.inner)
+        self.embeddings = getattr(embeddings, "inner", embeddings)
+        self.token_budget = token_budget
+        self.max_chunks = max_chunks
+        self._sentences: "OrderedDict[str, Tuple[List[str], np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.compressions = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.chunk_hits = 0
+        self.chunk_misses = 0
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if hasattr(self.embeddings, "embed_array"):
+            vectors = self.embeddings.embed_array(texts)
+        else:
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    def chunk_sentences(self, texts: List[str]) -> List[Tuple[List[str], np.ndarray]]:
+        """Sentences and unit sentence vectors of each chunk text; all uncached chunks embedded in one batch"""
+        results: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        with self._lock:
+            for text in texts:
+                if text in self._sentences:
+                    self._sentences.move_to_end(text)
+                    results[text] = self._sentences[text]
+                    self.chunk_hits += 1
+
+        missing = [text for text in dict.fromkeys(texts) if text not in results]
+        if missing:
+            self.chunk_misses += len(missing)
+            split = [split_sentences(text) for text in missing]
+            flat = [sentence for sentences in split for sentence in sentences]
+            vectors = self._embed(flat) if flat else np.zeros((0, 0), dtype=np.float32)
+            offset = 0
+            with self._lock:
+                for text, sentences in zip(missing, split):
+                    results[text] = (sentences, vectors[offset:offset + len(sentences)])
+                    offset += len(sentences)
+                    self._sentences[text] = results[text]
+                while len(self._sentences) > self.max_chunks:
+                    self._sentences.popitem(last=False)
+        return [results[text] for text in texts]
+
+    def compress(self, docs: List[Document], query_vectors: np.ndarray, token_budget: int = 0,
+                 separator: str = "\n\n") -> str:
+        """
+        The sentences of docs most similar to any of the query vectors, up to
+        token_budget estimated tokens, kept in chunk and sentence order.
+        """
+        token_budget = token_budget or self.token_budget
+        texts = [doc.page_content.strip() for doc in docs]
+        chunks = self.chunk_sentences(texts)
+
+        owners: List[int] = []
+        sentences: List[str] = []
+        vectors: List[np.ndarray] = []
+        seen = set()
+        for chunk_position, (chunk_sentences, chunk_vectors) in enumerate(chunks):
+            for sentence, vector in zip(chunk_sentences, chunk_vectors):
+                # Overlapping chunks repeat sentences; fragments carry no content on their own
+                if sentence in seen or len(sentence) < MIN_SENTENCE_CHARS:
+                    continue
+                seen.add(sentence)
+                owners.append(chunk_position)
+                sentences.append(sentence)
+                vectors.append(vector)
+        if not sentences:
+            return separator.join(texts)
+
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        query_vectors = query_vectors / np.clip(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12, None)
+        scores = (np.vstack(vectors) @ query_vectors.T).max(axis=1)
+        costs = [estimate_tokens(sentence) + 1 for sentence in sentences]
+        keep = select_sentences(scores, costs, token_budget)
+        if not keep:
+            # Never send an empty knowledge base: cut the best sentence at a word boundary
+            best = int(np.argmax(scores))
+            return sentences[best][:token_budget * 4].rsplit(" ", 1)[0]
+
+        parts: Dict[int, List[str]] = {}
+        for position in keep:
+            parts.setdefault(owners[position], []).append(sentences[position])
+        content = separator.join(" ".join(parts[owner]) for owner in sorted(parts))
+
+        self.compressions += 1
+        self.tokens_in += estimate_tokens(separator.join(texts))
+        self.tokens_out += estimate_tokens(content)
+        return content
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'compressions': self.compressions,
+            'token_budget': self.token_budget,
+            'avg_tokens_in': round(self.tokens_in / self.compressions, 1) if self.compressions else 0.0,
+            'avg_tokens_out': round(self.tokens_out / self.compressions, 1) if self.compressions else 0.0,
+            'cached_chunks': len(self._sentences),
+            'chunk_hits': self.chunk_hits,
+            'chunk_misses': self.chunk_misses
+        }
@@ -0,0 +1,232 @@
+"""
+Two-tier cache of query embeddings for the CJ-Mentor retriever.
+
+Tier 1 is a per-process LRU (size + TTL bounded). Tier 2 is a SQLite file that
+all workers share and that survives worker recycling; at boot it can be
+pre-warmed with the queries students sent before (feedback logs).
+
+Keys are normalized queries, so "What is phishing?" and "what is  phishing"
+share one entry. The normalized text is what gets embedded, which keeps the
+cached vector identical whichever variant filled the entry.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EMBED_CACHE_ENABLED = os.getenv("CJ_EMBED_CACHE", "1").lower() not in ("0", "false", "no")
+EMBED_CACHE_SIZE = int(os.getenv("CJ_EMBED_CACHE_SIZE", "2048"))
+EMBED_CACHE_TTL = float(os.getenv("CJ_EMBED_CACHE_TTL", "3600"))
+# Empty string disables the on-disk tier
+EMBED_CACHE_DB = os.getenv("CJ_EMBED_CACHE_DB", os.path.join(BASE_DIR, "cache", "query_embeddings.sqlite3"))
+EMBED_CACHE_DISK_TTL = float(os.getenv("CJ_EMBED_CACHE_DISK_TTL", str(30 * 24 * 3600)))
+EMBED_CACHE_PREWARM_LIMIT = int(os.getenv("CJ_EMBED_CACHE_PREWARM_LIMIT", "500"))
+# Feedback logs written by server.py (and the legacy app_multi_agent.py location)
+_DEFAULT_PREWARM_FILES = [
+    os.path.join(os.path.dirname(BASE_DIR), 'feedback_data', 'cybercj_feedback.jsonl'),
+    os.path.join(BASE_DIR, 'feedback_data.jsonl')
+]
+EMBED_CACHE_PREWARM_FILES = [
+    path for path in os.getenv("CJ_EMBED_CACHE_PREWARM_FILES", ",".join(_DEFAULT_PREWARM_FILES)).split(",") if path
+]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    return _WHITESPACE.sub(" ", (text or "").lower()).strip().rstrip("?!.").strip()
+
+
+class DiskEmbeddingCache:
+    """SQLite-backed tier shared by all worker processes"""
+
+    def __init__(self, db_path: str, model_key: str, ttl_seconds: float = EMBED_CACHE_DISK_TTL):
+        self.db_path = db_path
+        self.model_key = model_key
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "model TEXT NOT NULL, query TEXT NOT NULL, vector BLOB NOT NULL, created REAL NOT NULL, "
+                "PRIMARY KEY (model, query))"
+            )
+            conn.execute("DELETE FROM query_embeddings WHERE created < ?", (time.time() - ttl_seconds,))
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and per process (never reuse a connection across fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self._connection().execute(
+            "SELECT vector, created FROM query_embeddings WHERE model = ? AND query = ?",
+            (self.model_key, key)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (model, query, vector, created) VALUES (?, ?, ?, ?)",
+                [(self.model_key, key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+            )
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-process LRU in front of an optional disk tier"""
+
+    def __init__(self, inner: Embeddings, model_key: str, max_entries: int = EMBED_CACHE_SIZE,
+                 ttl_seconds: float = EMBED_CACHE_TTL, disk_path: Optional[str] = EMBED_CACHE_DB):
+        self.inner = inner
+        self.model_key = model_key
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk: Optional[DiskEmbeddingCache] = None
+        if disk_path:
+            try:
+                self.disk = DiskEmbeddingCache(disk_path, model_key)
+            except sqlite3.Error as e:
+                print(f"⚠️ Query embedding disk cache disabled ({e})")
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _get_memory(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            vector, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _put_memory(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        vector = self._get_memory(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector
+        if self.disk is not None:
+            try:
+                vector = self.disk.get(key)
+            except sqlite3.Error:
+                vector = None
+            if vector is not None:
+                self.disk_hits += 1
+                self._put_memory(key, vector)
+                return vector
+        return None
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a float32 array, embedding all cache misses in one batch"""
+        keys = [normalize_query(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        for key in keys:
+            if key in vectors or key in missing:
+                continue
+            vector = self._lookup(key)
+            if vector is None:
+                missing.append(key)
+            else:
+                vectors[key] = vector
+
+        if missing:
+            self.misses += len(missing)
+            fresh = np.asarray(self.inner.embed_documents(missing), dtype=np.float32)
+            new_entries = dict(zip(missing, fresh))
+            for key, vector in new_entries.items():
+                self._put_memory(key, vector)
+            vectors.update(new_entries)
+            if self.disk is not None:
+                try:
+                    self.disk.put_many(new_entries)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not write query embeddings to disk cache: {e}")
+
+        return np.vstack([vectors[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def prewarm(self, queries: Iterable[str], batch_size: int = 64) -> int:
+        """Fill both tiers with the given queries; returns how many were newly embedded"""
+        misses_before = self.misses
+        batch: List[str] = []
+        for query in queries:
+            batch.append(query)
+            if len(batch) >= batch_size:
+                self.embed_array(batch)
+                batch = []
+        if batch:
+            self.embed_array(batch)
+        return self.misses - misses_before
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'disk_enabled': self.disk is not None
+        }
+
+
+def load_feedback_queries(paths: Iterable[str] = EMBED_CACHE_PREWARM_FILES,
+                          limit: int = EMBED_CACHE_PREWARM_LIMIT) -> List[str]:
+    """Most frequent student queries found in the feedback JSONL logs"""
+    counts: Counter = Counter()
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                query = next((record[field] for field in ('user_query', 'user_input', 'question', 'message')
+                              if isinstance(record.get(field), str) and record.get(field).strip()), None)
+                if query:
+                    counts[normalize_query(query)] += 1
+    return [query for query, _ in counts.most_common(limit)]
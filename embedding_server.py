@@ -0,0 +1,247 @@
+"""
+Embedding sidecar for the CyberCJ backend.
+
+One process owns the only copy of the MiniLM encoder and listens on a Unix
+socket. Gunicorn workers send it query strings; concurrent requests from all
+workers are collected for a few milliseconds and embedded in a single forward
+pass. Workers use SidecarEmbeddings, which falls back to an in-process encoder
+while the sidecar is unreachable.
+
+Wire format (both directions): 4-byte big-endian length + payload.
+    request payload:  UTF-8 JSON {"texts": ["...", ...]}
+    response payload: float32 vectors, row-major (len(texts) x dim)
+
+Usage:
+    python embedding_server.py [--socket /tmp/cybercj-embeddings.sock]
+"""
+
+import os
+import json
+import time
+import queue
+import socket
+import struct
+import argparse
+import threading
+import socketserver
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from tutor_embeddings import EMBEDDING_SOCKET_PATH, create_embeddings
+
+MAX_BATCH_SIZE = int(os.getenv("CJ_EMBEDDING_MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.getenv("CJ_EMBEDDING_MAX_WAIT_MS", "5"))
+# Seconds to keep using the in-process fallback before trying the sidecar again
+RETRY_INTERVAL = float(os.getenv("CJ_EMBEDDING_RETRY_INTERVAL", "10"))
+
+_LENGTH = struct.Struct("!I")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return _recv_exact(sock, size)
+
+
+# --- Server side ---
+
+class EmbeddingBatcher:
+    """Collects texts from concurrent requests and embeds them in one forward pass"""
+
+    def __init__(self, embeddings, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pending: "queue.Queue[tuple]" = queue.Queue()
+        self.batches = 0
+        self.texts_embedded = 0
+        self.thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        future = Future()
+        self.pending.put((texts, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts_embedded += len(texts)
+            start = 0
+            for item_texts, future in batch:
+                future.set_result(vectors[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Connections are persistent: one worker thread keeps its socket open
+        while True:
+            try:
+                request = json.loads(recv_frame(self.request).decode("utf-8"))
+            except (ConnectionError, OSError):
+                return
+            vectors = self.server.batcher.submit(request["texts"]).result()
+            send_frame(self.request, vectors.tobytes())
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # every gunicorn worker thread may connect at once
+
+    def __init__(self, socket_path: str, batcher: EmbeddingBatcher):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.batcher = batcher
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+
+
+def wait_for_sidecar(socket_path: str = EMBEDDING_SOCKET_PATH, timeout: float = 120.0) -> bool:
+    """Block until the sidecar accepts connections (used by gunicorn before forking)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(socket_path)
+                return True
+        except OSError:
+            time.sleep(0.5)
+    return False
+
+
+# --- Client side ---
+
+class SidecarEmbeddings(Embeddings):
+    """
+    LangChain Embeddings that delegate to the embedding sidecar.
+    Each thread keeps its own connection. If the sidecar is down the texts are
+    embedded in-process (the fallback encoder is only loaded when first needed)
+    and the sidecar is retried after RETRY_INTERVAL seconds.
+    """
+
+    def __init__(self, socket_path: str, fallback_factory: Callable[[], Embeddings], timeout: float = 10.0):
+        self.socket_path = socket_path
+        self.fallback_factory = fallback_factory
+        self.timeout = timeout
+        self._fallback: Optional[Embeddings] = None
+        self._fallback_lock = threading.Lock()
+        self._local = threading.local()
+        self._retry_at = 0.0
+        self.sidecar_calls = 0
+        self.fallback_calls = 0
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _close_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            self._local.sock = None
+
+    def _get_fallback(self) -> Embeddings:
+        if self._fallback is None:
+            with self._fallback_lock:
+                if self._fallback is None:
+                    print("⚠️ Embedding sidecar unavailable, loading in-process encoder")
+                    self._fallback = self.fallback_factory()
+        return self._fallback
+
+    def _embed_via_sidecar(self, texts: List[str]) -> List[List[float]]:
+        sock = self._connection()
+        send_frame(sock, json.dumps({"texts": texts}).encode("utf-8"))
+        vectors = np.frombuffer(recv_frame(sock), dtype=np.float32)
+        return vectors.reshape(len(texts), -1).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if time.monotonic() >= self._retry_at:
+            try:
+                vectors = self._embed_via_sidecar(list(texts))
+                self.sidecar_calls += 1
+                return vectors
+            except (OSError, ConnectionError, ValueError) as e:
+                self._close_connection()
+                self._retry_at = time.monotonic() + RETRY_INTERVAL
+                print(f"⚠️ Embedding sidecar request failed ({e}), using in-process fallback")
+        self.fallback_calls += 1
+        return self._get_fallback().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CyberCJ embedding sidecar")
+    parser.add_argument("--socket", default=EMBEDDING_SOCKET_PATH)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    print("🧠 Loading embedding model for sidecar...")
+    embeddings = create_embeddings(batch_size=args.max_batch, use_sidecar=False, use_cache=False)
+    embeddings.embed_query("warm up")  # Load weights and start thread pools before accepting traffic
+
+    server = EmbeddingServer(args.socket, EmbeddingBatcher(embeddings, args.max_batch, args.max_wait_ms))
+    print(f"✅ Embedding sidecar listening on {args.socket} "
+          f"(max batch {args.max_batch}, max wait {args.max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
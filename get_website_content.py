@@ -1,5 +1,10 @@
 import os
-from bs4 import BeautifulSoup
+import time
+import hashlib
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup, FeatureNotFound
 
 # --- 配置项 ---
 # 你的 Chat_bot 脚本所在的目录 (当前脚本也应在此目录)
@@ -18,18 +23,67 @@ HTML_SOURCE_FOLDERS = [
 KNOWLEDGE_FILE_NAME = 'knowledge.txt'
 KNOWLEDGE_FILE_PATH = os.path.join(CHATBOT_DIR, KNOWLEDGE_FILE_NAME)
 
+# 提取文本的最小长度, 更短的页面会被跳过
+MIN_TEXT_LENGTH = 50
+
+# HTML 解析器: lxml (C 实现, 比纯 Python 的 html.parser 快得多); 未安装时自动退回 html.parser
+HTML_PARSER = os.getenv("CJ_HTML_PARSER", "lxml")
+# 并行提取的进程数, 以及同时在途的页面数上限 (限制内存占用)
+EXTRACT_WORKERS = int(os.getenv("CJ_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_WINDOW = int(os.getenv("CJ_EXTRACT_WINDOW", "0")) or EXTRACT_WORKERS * 4
+
+# 跨页面重复文本块 (模板导航、测验界面文字、弹窗等) 的去除:
+# 出现在至少 BOILERPLATE_MIN_PAGES 个页面的文本块只保留第一次出现 (按页面顺序), 其余页面中删除
+BOILERPLATE_ENABLED = os.getenv("CJ_BOILERPLATE", "1").lower() not in ("0", "false", "no")
+BOILERPLATE_MIN_PAGES = int(os.getenv("CJ_BOILERPLATE_MIN_PAGES", "2"))
+# 文本块 = 不包含其他块级元素的块级元素 (其中的内联标签如 <b>、<a> 保留在块内)
+BLOCK_TAGS = ["p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "td", "th", "dt", "dd", "div", "section",
+              "article", "blockquote", "figcaption", "label", "pre"]
+
+def _make_soup(html_content):
+    global HTML_PARSER
+    try:
+        return BeautifulSoup(html_content, HTML_PARSER)
+    except FeatureNotFound:
+        print(f"Warning: HTML parser '{HTML_PARSER}' not installed, falling back to html.parser")
+        HTML_PARSER = 'html.parser'
+        return BeautifulSoup(html_content, HTML_PARSER)
+
 # --- HTML 解析与文本提取函数 ---
-def extract_text_from_html_content(html_content, source_file_path=""):
-    """
-    从给定的HTML内容中提取纯文本。
-    可以根据需要定制选择器来获取更精确的内容。
-    """
-    soup = BeautifulSoup(html_content, 'html.parser')
+def _clean_soup(html_content):
+    soup = _make_soup(html_content)
 
     # 1. 移除不需要的标签 (脚本, 样式, 导航, 页眉, 页脚等)
     for element_type in ["script", "style", "nav", "header", "footer", "aside", "form", "button"]:
         for element in soup.find_all(element_type):
             element.decompose()
+    return soup
+
+def block_key(text):
+    """文本块的键: 规范化空白后的 SHA-1 前 16 位"""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()[:16]
+
+def _leaf_blocks(soup):
+    """(元素, 键) 列表: 所有不含其他块级元素且有文本的块级元素"""
+    blocks = []
+    for element in soup.find_all(BLOCK_TAGS):
+        if element.find(BLOCK_TAGS) is None:
+            text = element.get_text(separator=' ', strip=True)
+            if text:
+                blocks.append((element, block_key(text)))
+    return blocks
+
+def extract_text_from_html_content(html_content, source_file_path="", drop_blocks=None):
+    """
+    从给定的HTML内容中提取纯文本。
+    可以根据需要定制选择器来获取更精确的内容。
+    drop_blocks: 要删除的文本块的键 (见 plan_boilerplate)。
+    """
+    soup = _clean_soup(html_content)
+    if drop_blocks:
+        for element, key in _leaf_blocks(soup):
+            if key in drop_blocks:
+                element.decompose()
 
     # 2. (可选) 如果内容主要在特定标签内 (例如 <main>, <article>, 或者某个特定id/class的div)
     #    你可以取消注释并调整下面的代码
@@ -54,60 +108,185 @@ def extract_text_from_html_content(html_content, source_file_path=""):
 
     return text
 
-# --- 主逻辑 ---
-def main():
-    print(f"Chatbot directory: {CHATBOT_DIR}")
-    print(f"HTML parent directory: {HTML_PARENT_DIR}")
-    print(f"Knowledge file will be saved to: {KNOWLEDGE_FILE_PATH}")
-
-    all_extracted_texts = []
-    file_count = 0
-
-    for source_folder in HTML_SOURCE_FOLDERS:
+# --- HTML 文件扫描 ---
+def find_html_files(source_folders=HTML_SOURCE_FOLDERS, parent_dir=HTML_PARENT_DIR):
+    """
+    遍历源文件夹, 依次返回 (文件路径, 相对路径)。
+    相对路径以 parent_dir 为基准, 用于标识来源 (ingest.py 也用它作为页面的键)。
+    """
+    for source_folder in source_folders:
         if not os.path.isdir(source_folder):
             print(f"Warning: Source folder not found: {source_folder}")
             continue
 
         print(f"\nScanning HTML files in: {source_folder}")
-        for root, _, files in os.walk(source_folder):
-            for file_name in files:
+        for root, dirs, files in os.walk(source_folder):
+            dirs.sort() # 固定遍历顺序, 保证输出确定 (重复文本块保留第一次出现)
+            for file_name in sorted(files):
                 if file_name.lower().endswith(('.html', '.htm')):
                     file_path = os.path.join(root, file_name)
-                    relative_path = os.path.relpath(file_path, HTML_PARENT_DIR) # 获取相对路径，用于标识来源
-                    print(f"  Processing: {relative_path}")
-                    try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f: # errors='ignore' 以防有编码问题
-                            html_content = f.read()
-                            extracted_text = extract_text_from_html_content(html_content, source_file_path=relative_path)
-
-                            if extracted_text and len(extracted_text) > 50: # 只添加有实质内容且长度超过50的文本
-                                # (可选) 在文本前添加来源信息
-                                # source_info = f"[Source: {relative_path}]\n"
-                                # all_extracted_texts.append(source_info + extracted_text)
-                                all_extracted_texts.append(extracted_text)
-                                file_count += 1
-                            else:
-                                print(f"    Skipped (empty or too short): {relative_path}")
-                    except Exception as e:
-                        print(f"    Error processing {relative_path}: {e}")
-
-    if not all_extracted_texts:
-        print("\nNo text was extracted. Knowledge file will not be created/updated.")
+                    yield file_path, os.path.relpath(file_path, parent_dir)
+
+# --- 并行提取流水线 ---
+def extract_file(file_path, relative_path, drop_blocks=None):
+    """
+    提取单个文件 (在工作进程中运行)。
+    返回 (相对路径, 文本, 错误信息); 文本过短时为 None。
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f: # errors='ignore' 以防有编码问题
+            text = extract_text_from_html_content(f.read(), source_file_path=relative_path, drop_blocks=drop_blocks)
+    except Exception as e:
+        return relative_path, None, str(e)
+    if not text or len(text) <= MIN_TEXT_LENGTH: # 只保留有实质内容且长度超过50的文本
+        return relative_path, None, None
+    return relative_path, text, None
+
+def scan_file_blocks(file_path, relative_path):
+    """
+    扫描单个文件的文本块 (在工作进程中运行, 用于 plan_boilerplate)。
+    返回 (相对路径, 文本块键列表, 未去重时的文本长度, 错误信息)。
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            soup = _clean_soup(f.read())
+    except Exception as e:
+        return relative_path, [], 0, str(e)
+    keys = list(dict.fromkeys(key for _, key in _leaf_blocks(soup)))
+    return relative_path, keys, len(soup.get_text(separator=' ', strip=True)), None
+
+def plan_boilerplate(page_blocks, min_pages=BOILERPLATE_MIN_PAGES):
+    """
+    page_blocks: {相对路径: 文本块键}, 按页面顺序。
+    出现在至少 min_pages 个页面的文本块只由第一个页面保留;
+    返回 {相对路径: 该页面要删除的键 (frozenset)} 和重复文本块的数量。
+    """
+    if not min_pages or min_pages < 2:
+        return {path: frozenset() for path in page_blocks}, 0
+    page_counts = Counter(key for keys in page_blocks.values() for key in set(keys))
+    owners = {}
+    for path, keys in page_blocks.items():
+        for key in keys:
+            if page_counts[key] >= min_pages:
+                owners.setdefault(key, path)
+    drops = {path: frozenset(key for key in keys if key in owners and owners[key] != path)
+             for path, keys in page_blocks.items()}
+    return drops, len(owners)
+
+def extract_pages(files, workers=EXTRACT_WORKERS, window=EXTRACT_WINDOW, task=extract_file):
+    """
+    按输入顺序逐个返回 task 的结果 (结果确定, 与进程数无关)。
+    files 是 task 参数元组 (文件路径, 相对路径[, 其他参数]) 的可迭代对象, 按需读取;
+    最多 window 个页面同时在途, 所以内存占用与站点大小无关。
+    """
+    if workers <= 1:
+        for args in files:
+            yield task(*args)
         return
 
-    print(f"\nExtracted text from {file_count} HTML files.")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for args in files:
+            pending.append(pool.submit(task, *args))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+class Throughput:
+    """流水线吞吐量统计 (pages/sec, chunks/sec)"""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.pages = 0
+        self.chunks = 0
+
+    def report(self, label="Extraction"):
+        elapsed = max(time.perf_counter() - self.start_time, 1e-9)
+        line = f"⏱️ {label}: {self.pages} pages in {elapsed:.2f}s ({self.pages / elapsed:.1f} pages/sec"
+        if self.chunks:
+            line += f", {self.chunks} chunks, {self.chunks / elapsed:.1f} chunks/sec"
+        print(line + ")")
+
+# --- 主逻辑 ---
+def main():
+    parser = argparse.ArgumentParser(description="Extract the CyberCJ HTML pages into knowledge.txt")
+    parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS, help="Extraction processes (1 = no pool)")
+    parser.add_argument("--window", type=int, default=EXTRACT_WINDOW, help="Max pages in flight")
+    parser.add_argument("--min-pages", type=int, default=BOILERPLATE_MIN_PAGES if BOILERPLATE_ENABLED else 0,
+                        help="Drop repeats of text blocks found on at least this many pages (0 = keep everything)")
+    args = parser.parse_args()
+
+    print(f"Chatbot directory: {CHATBOT_DIR}")
+    print(f"HTML parent directory: {HTML_PARENT_DIR}")
+    print(f"Knowledge file will be saved to: {KNOWLEDGE_FILE_PATH}")
+    print(f"Parser: {HTML_PARSER}, workers: {args.workers}, window: {args.window}")
+
+    # 第一遍: 只扫描文本块键 (内存中只保留键), 找出跨页面重复的文本块
+    files = list(find_html_files())
+    drops = {}
+    raw_chars = 0
+    if args.min_pages >= 2:
+        page_blocks = {}
+        failed = []
+        try:
+            for relative_path, keys, page_chars, error in extract_pages(files, args.workers, args.window, scan_file_blocks):
+                if error:
+                    print(f"    Error scanning {relative_path}: {error}")
+                    failed.append(relative_path)
+                page_blocks[relative_path] = keys
+                raw_chars += page_chars
+        except Exception as e:
+            print(f"    Error scanning text blocks: {e}")
+            failed.append("(scan pass)")
+        if failed:
+            # 扫描不完整时无法判断哪个页面保留重复文本块, 本次不做去重
+            drops, raw_chars = {}, 0
+            print(f"⚠️ Boilerplate scan failed for {len(failed)} page(s); keeping every text block this run")
+        else:
+            drops, repeated = plan_boilerplate(page_blocks, args.min_pages)
+            print(f"🧹 {repeated} text blocks repeat on >= {args.min_pages} pages; keeping only their first occurrence")
+        del page_blocks
+
+    file_count = 0
+    kept_chars = 0
+    throughput = Throughput()
+    temp_path = KNOWLEDGE_FILE_PATH + ".tmp"
 
     try:
-        with open(KNOWLEDGE_FILE_PATH, 'w', encoding='utf-8') as outfile:
-            for i, text_content in enumerate(all_extracted_texts):
-                outfile.write(text_content)
-                # 在不同文件提取的内容之间添加两个换行符作为分隔
-                if i < len(all_extracted_texts) - 1:
-                    outfile.write("\n\n")
-        print(f"\nKnowledge base '{KNOWLEDGE_FILE_NAME}' created/updated successfully at '{KNOWLEDGE_FILE_PATH}'.")
-        print("Important: Remember to delete the old FAISS index folder for your chatbot to use the new knowledge.")
+        # 第二遍: 边提取边写入临时文件, 不在内存中保留所有页面的文本
+        with open(temp_path, 'w', encoding='utf-8') as outfile:
+            tasks = ((file_path, relative_path, drops.get(relative_path)) for file_path, relative_path in files)
+            for relative_path, extracted_text, error in extract_pages(tasks, args.workers, args.window):
+                throughput.pages += 1
+                if error:
+                    print(f"    Error processing {relative_path}: {error}")
+                elif extracted_text is None:
+                    print(f"    Skipped (empty or too short): {relative_path}")
+                else:
+                    # 在不同文件提取的内容之间添加两个换行符作为分隔
+                    if file_count:
+                        outfile.write("\n\n")
+                    outfile.write(extracted_text)
+                    file_count += 1
+                    kept_chars += len(extracted_text)
     except Exception as e:
         print(f"\nError writing knowledge file: {e}")
+        return
+
+    throughput.report()
+    if raw_chars:
+        print(f"🧹 Boilerplate removal: {raw_chars:,} -> {kept_chars:,} characters "
+              f"({100 * (1 - kept_chars / raw_chars):.1f}% smaller)")
+    if not file_count:
+        os.remove(temp_path)
+        print("\nNo text was extracted. Knowledge file will not be created/updated.")
+        return
+
+    print(f"\nExtracted text from {file_count} HTML files.")
+    os.replace(temp_path, KNOWLEDGE_FILE_PATH)
+    print(f"\nKnowledge base '{KNOWLEDGE_FILE_NAME}' created/updated successfully at '{KNOWLEDGE_FILE_PATH}'.")
+    print("Tip: run `python ingest.py` to re-embed only the changed pages instead of rebuilding the FAISS index.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
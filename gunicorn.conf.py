@@ -21,6 +21,16 @@ max_requests_jitter = 100
 # Preload app for memory efficiency
 preload_app = False
 
+# Copy-on-write preloading of the read-only RAG resources (embedding model weights,
+# FAISS vectors, docstore). With CJ_PRELOAD=1 the master loads them once and every
+# worker inherits the pages; per-worker state is re-initialized in post_fork.
+preload_rag = os.environ.get('CJ_PRELOAD', '0').lower() in ('1', 'true', 'yes')
+
+# Shared embedding sidecar: one process owns the MiniLM model and batches the
+# query embeddings of all workers (see embedding_server.py)
+embedding_sidecar = os.environ.get('CJ_EMBEDDING_SIDECAR', '0').lower() in ('1', 'true', 'yes')
+embedding_sidecar_process = None
+
 # Logging
 loglevel = "info"
 accesslog = "-"
@@ -32,4 +42,50 @@ proc_name = "cybercj-server"
 # Security
 limit_request_line = 4096
 limit_request_fields = 100
-limit_request_field_size = 8190
\ No newline at end of file
+limit_request_field_size = 8190
+
+
+# Server hooks
+def on_starting(server):
+    """Start the embedding sidecar and load the shared read-only RAG resources before any fork"""
+    if embedding_sidecar:
+        import sys
+        import subprocess
+        from embedding_server import wait_for_sidecar
+        from tutor_embeddings import EMBEDDING_SOCKET_PATH
+
+        global embedding_sidecar_process
+        embedding_sidecar_process = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'embedding_server.py')]
+        )
+        if wait_for_sidecar(EMBEDDING_SOCKET_PATH):
+            server.log.info("Embedding sidecar ready on %s", EMBEDDING_SOCKET_PATH)
+        else:
+            server.log.warning("Embedding sidecar did not start; workers will embed in-process")
+
+    if preload_rag:
+        import multi_agent_tutor
+        from memory_stats import process_memory, format_memory
+        multi_agent_tutor.preload_shared_resources()
+        server.log.info("Master memory after preload: %s", format_memory(process_memory()))
+
+
+def post_fork(server, worker):
+    """Re-initialize per-worker state (torch threads) inherited from the master"""
+    if preload_rag:
+        import multi_agent_tutor
+        multi_agent_tutor.reinitialize_after_fork()
+
+
+def post_worker_init(worker):
+    """Warm up the CJ-Mentor system as soon as each worker has loaded the app"""
+    import server
+    if server.WARMUP_ENABLED:
+        worker.log.info("Starting CJ-Mentor warm-up in worker %s", worker.pid)
+        server.start_background_warmup()
+
+
+def on_exit(server):
+    """Stop the embedding sidecar together with the master"""
+    if embedding_sidecar_process is not None:
+        embedding_sidecar_process.terminate()
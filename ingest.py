@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Incremental ingestion of the CyberCJ HTML pages into the navigator index.
+
+get_website_content.py re-extracts every page into knowledge.txt, after which
+the whole index had to be re-embedded. ingest.py keeps a manifest of every
+page's content hash and chunk ids, and on each run only re-extracts, re-chunks
+and re-embeds pages that are new or changed; the chunks of changed and deleted
+pages are removed by id. Files written next to index.faiss:
+
+    ingest_manifest.json     per page: SHA-256 of the HTML, its chunk ids, its text
+                             block keys and the boilerplate blocks dropped from it
+    embeddings.npy           float32 raw embedding of every chunk
+    embedding_ids.npy        int64 chunk id of every embeddings.npy row
+    index.faiss              IndexIDMap2 over a flat L2 index (ids = chunk ids)
+
+Chunk ids are never reused. The chunk store, BM25 index, kNN graph and every
+built index variant are regenerated from the chunk texts and embeddings.npy,
+so switching or rebuilding an index type never needs a full re-embed.
+
+Text blocks repeated across pages (template navigation, quiz UI strings,
+popups, copied lessons) are kept only on the first page that has them (see
+plan_boilerplate in get_website_content.py).
+
+The first run (no manifest yet) ingests every page and replaces the index.
+
+Usage:
+    python ingest.py [--dry-run] [--html-root DIR] [--vectorstore PATH] [--workers N] [--window N]
+"""
+
+import os
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from build_index import (
+    DEFAULT_VECTORSTORE_PATH, EMBEDDING_IDS_FILE_NAME, EMBEDDINGS_FILE_NAME, FLAT_INDEX_FILE_NAME,
+    build_variant, has_embedding_store, load_index_params
+)
+from chunk_store import ChunkStore, chunk_store_path, has_chunk_store, write_chunk_store
+
+MANIFEST_FILE_NAME = "ingest_manifest.json"
+MANIFEST_FORMAT_VERSION = 1
+# Same splitter settings the navigator index was originally built with
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+EMBED_BATCH_SIZE = 64
+
+
+def page_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def load_manifest(vectorstore_path: str) -> Dict[str, Any]:
+    path = os.path.join(vectorstore_path, MANIFEST_FILE_NAME)
+    if not os.path.exists(path):
+        return {"format_version": MANIFEST_FORMAT_VERSION, "next_chunk_id": 0, "pages": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != MANIFEST_FORMAT_VERSION:
+        raise ValueError(f"Unsupported ingest manifest format: {manifest.get('format_version')}")
+    return manifest
+
+
+def write_json_atomic(path: str, data: Dict[str, Any]):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def swap_directory(new_path: str, final_path: str):
+    """
+    Replace a directory with a freshly written one. Workers that still map the
+    old files keep reading them (the files are unlinked, not overwritten).
+    """
+    old_path = final_path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(final_path):
+        os.rename(final_path, old_path)
+    os.rename(new_path, final_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def chunk_page(text: str, source: str) -> List[Tuple[str, Dict[str, Any]]]:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return [(chunk, {"source": source}) for chunk in splitter.split_text(text)]
+
+
+def embed_texts(embeddings, texts: List[str]) -> np.ndarray:
+    batches = [np.asarray(embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]), dtype=np.float32)
+               for start in range(0, len(texts), EMBED_BATCH_SIZE)]
+    return np.vstack(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+
+
+def drop_digest(drop_blocks) -> str:
+    """Short digest of the set of boilerplate blocks dropped from a page"""
+    return hashlib.sha1(",".join(sorted(drop_blocks)).encode("utf-8")).hexdigest()[:16]
+
+
+def scan_pages(source_folders: List[str], parent_dir: str) -> Dict[str, Tuple[str, str]]:
+    """relative path -> (file path, content hash) of every HTML page"""
+    from get_website_content import find_html_files
+
+    pages = {}
+    for file_path, relative_path in find_html_files(source_folders, parent_dir):
+        with open(file_path, "rb") as f:
+            pages[relative_path] = (file_path, page_hash(f.read()))
+    return pages
+
+
+def update_index(vectorstore_path: str, removed_ids: List[int], new_ids: np.ndarray, new_vectors: Optional[np.ndarray],
+                 all_ids: np.ndarray, all_vectors: np.ndarray, incremental: bool):
+    """
+    Remove and add vectors in the ID-mapped flat index (or build it from scratch).
+    The result is written to index.faiss.tmp; the caller moves it into place.
+    """
+    index_path = os.path.join(vectorstore_path, FLAT_INDEX_FILE_NAME)
+    index = faiss.read_index(index_path) if incremental and os.path.exists(index_path) else None
+    if index is None or not hasattr(index, "id_map"):
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(all_vectors.shape[1]))
+        index.add_with_ids(all_vectors, all_ids)
+    else:
+        if removed_ids:
+            index.remove_ids(np.asarray(removed_ids, dtype=np.int64))
+        if new_vectors is not None and len(new_ids):
+            index.add_with_ids(new_vectors, new_ids)
+    faiss.write_index(index, index_path + ".tmp")
+    return index
+
+
+def write_pickled_docstore(vectorstore_path: str, chunks: List[Tuple[int, str, Dict[str, Any]]]):
+    """index.pkl for CJ_DOCSTORE=pickle / FAISS.load_local (chunk id -> docstore id str(chunk id))"""
+    from langchain_core.documents import Document
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    docstore = InMemoryDocstore({str(chunk_id): Document(id=str(chunk_id), page_content=text, metadata=metadata)
+                                 for chunk_id, text, metadata in chunks})
+    path = os.path.join(vectorstore_path, "index.pkl")
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump((docstore, {chunk_id: str(chunk_id) for chunk_id, _, _ in chunks}), f)
+    os.replace(path + ".tmp", path)
+
+
+def rebuild_derived(vectorstore_path: str):
+    """Chunk-derived indexes: BM25, kNN graph (if built before) and every built index variant"""
+    from bm25_index import bm25_path, build_bm25_index
+    from chunk_graph import build_chunk_graph, graph_path, has_chunk_graph
+
+    build_bm25_index(vectorstore_path, bm25_path(vectorstore_path) + ".new")
+    swap_directory(bm25_path(vectorstore_path) + ".new", bm25_path(vectorstore_path))
+    print("✅ Rebuilt BM25 index")
+
+    if has_chunk_graph(vectorstore_path):
+        with open(os.path.join(graph_path(vectorstore_path), "meta.json"), "r", encoding="utf-8") as f:
+            graph_k = json.load(f)["k"]
+        build_chunk_graph(vectorstore_path, graph_k, graph_path(vectorstore_path) + ".new")
+        swap_directory(graph_path(vectorstore_path) + ".new", graph_path(vectorstore_path))
+        print("✅ Rebuilt kNN graph")
+
+    for file_name in sorted(os.listdir(vectorstore_path)):
+        if not (file_name.startswith("index_") and file_name.endswith(".json")):
+            continue
+        record = load_index_params(vectorstore_path, file_name[len("index_"):-len(".json")])
+        if "type" not in record:
+            continue
+        build_variant(vectorstore_path, record["type"], record.get("params"), record.get("pca_dim", 0))
+
+
+def ingest(vectorstore_path: str, source_folders: List[str], parent_dir: str, embeddings=None,
+           dry_run: bool = False, workers: Optional[int] = None, window: Optional[int] = None,
+           min_pages: Optional[int] = None) -> Dict[str, int]:
+    """Bring the navigator index in line with the HTML pages; returns page and chunk counts"""
+    from get_website_content import (
+        BOILERPLATE_ENABLED, BOILERPLATE_MIN_PAGES, EXTRACT_WINDOW, EXTRACT_WORKERS,
+        Throughput, extract_pages, plan_boilerplate, scan_file_blocks
+    )
+
+    workers = workers or EXTRACT_WORKERS
+    window = window or EXTRACT_WINDOW
+    if min_pages is None:
+        min_pages = BOILERPLATE_MIN_PAGES if BOILERPLATE_ENABLED else 0
+    manifest = load_manifest(vectorstore_path)
+    incremental = bool(manifest["pages"])
+    known = manifest["pages"]
+    pages = scan_pages(source_folders, parent_dir)
+
+    new_pages = [path for path in pages if path not in known]
+    changed_pages = [path for path in pages if path in known and known[path]["hash"] != pages[path][1]]
+    deleted_pages = [path for path in known if path not in pages]
+
+    # Cross-page boilerplate: block keys of unchanged pages come from the manifest. An unchanged
+    # page is re-extracted when the set of blocks it has to drop changed (e.g. the page that kept
+    # a repeated block was deleted)
+    to_scan = [path for path in pages if path in new_pages or path in changed_pages or "blocks" not in known[path]]
+    scanned = {}
+    failed = []
+    for path, keys, _, error in extract_pages(((pages[path][0], path) for path in to_scan), workers, window,
+                                              scan_file_blocks):
+        if error:
+            print(f"⚠️ Could not scan {path}: {error}")
+            failed.append(path)
+        scanned[path] = keys
+    # The block keys are stored in the manifest, so a failed scan would hide the page's blocks for good
+    if failed:
+        raise RuntimeError(f"Boilerplate scan failed for {len(failed)} page(s); nothing was written")
+    page_blocks = {path: scanned[path] if path in scanned else known[path]["blocks"] for path in pages}
+    drops, repeated_blocks = plan_boilerplate(page_blocks, min_pages)
+    refiltered_pages = [path for path in pages if path in known and path not in changed_pages
+                        and known[path].get("drop_digest") != drop_digest(drops[path])]
+
+    summary = {
+        "new_pages": len(new_pages),
+        "changed_pages": len(changed_pages),
+        "deleted_pages": len(deleted_pages),
+        "refiltered_pages": len(refiltered_pages),
+        "unchanged_pages": len(pages) - len(new_pages) - len(changed_pages) - len(refiltered_pages),
+        "repeated_blocks": repeated_blocks
+    }
+    removed_ids = [chunk_id for path in changed_pages + refiltered_pages + deleted_pages
+                   for chunk_id in known[path]["chunk_ids"]]
+    print(f"📄 Pages: {summary['new_pages']} new, {summary['changed_pages']} changed, "
+          f"{summary['deleted_pages']} deleted, {summary['refiltered_pages']} with changed boilerplate, "
+          f"{summary['unchanged_pages']} unchanged")
+    if min_pages:
+        print(f"🧹 {repeated_blocks} text blocks repeat on >= {min_pages} pages; keeping only their first occurrence")
+    if not incremental:
+        print("🆕 No ingest manifest yet: ingesting every page and replacing the index")
+    if dry_run or not (new_pages or changed_pages or deleted_pages or refiltered_pages):
+        summary.update(added_chunks=0, removed_chunks=len(removed_ids) if dry_run else 0)
+        return summary
+
+    if embeddings is None:
+        from tutor_embeddings import create_embeddings
+        embeddings = create_embeddings(use_sidecar=False, use_cache=False)
+
+    # Re-extract (process pool, in page order), re-chunk and embed only new and changed pages,
+    # embedding in batches while the extraction workers keep going; chunk ids are never reused
+    next_chunk_id = manifest["next_chunk_id"]
+    new_chunks: List[Tuple[int, str, Dict[str, Any]]] = []
+    vector_batches: List[np.ndarray] = []
+    embedded = 0
+    throughput = Throughput()
+    to_extract = ((pages[path][0], path, drops[path]) for path in new_pages + changed_pages + refiltered_pages)
+    for path, text, error in extract_pages(to_extract, workers, window):
+        throughput.pages += 1
+        if error:
+            print(f"⚠️ Could not extract {path}: {error}")
+        chunk_ids = []
+        for chunk_text, metadata in (chunk_page(text, path) if text else []):
+            new_chunks.append((next_chunk_id, chunk_text, metadata))
+            chunk_ids.append(next_chunk_id)
+            next_chunk_id += 1
+        known[path] = {"hash": pages[path][1], "chunk_ids": chunk_ids}
+        while len(new_chunks) - embedded >= EMBED_BATCH_SIZE:
+            vector_batches.append(embed_texts(embeddings, [text for _, text, _ in new_chunks[embedded:embedded + EMBED_BATCH_SIZE]]))
+            embedded += EMBED_BATCH_SIZE
+            throughput.chunks = embedded
+    for path in pages:
+        known[path]["blocks"] = page_blocks[path]
+        known[path]["drop_digest"] = drop_digest(drops[path])
+    if embedded < len(new_chunks):
+        vector_batches.append(embed_texts(embeddings, [text for _, text, _ in new_chunks[embedded:]]))
+    throughput.chunks = len(new_chunks)
+    throughput.report("Extract + chunk + embed")
+    for path in deleted_pages:
+        del known[path]
+
+    new_ids = np.asarray([chunk_id for chunk_id, _, _ in new_chunks], dtype=np.int64)
+    new_vectors = np.vstack(vector_batches) if vector_batches else None
+
+    # Surviving chunks: texts from the current chunk store, vectors from embeddings.npy
+    removed = set(removed_ids)
+    kept_chunks: List[Tuple[int, str, Dict[str, Any]]] = []
+    kept_ids = np.zeros(0, dtype=np.int64)
+    kept_vectors = None
+    if incremental and has_chunk_store(vectorstore_path) and has_embedding_store(vectorstore_path):
+        store = ChunkStore(chunk_store_path(vectorstore_path))
+        kept_chunks = [(int(chunk_id), store.text_at(row), store.metadata(int(chunk_id)))
+                       for row, chunk_id in enumerate(store.ids) if int(chunk_id) not in removed]
+        stored_ids = np.load(os.path.join(vectorstore_path, EMBEDDING_IDS_FILE_NAME))
+        stored_vectors = np.load(os.path.join(vectorstore_path, EMBEDDINGS_FILE_NAME))
+        keep = ~np.isin(stored_ids, np.asarray(removed_ids, dtype=np.int64))
+        kept_ids, kept_vectors = stored_ids[keep], stored_vectors[keep]
+    elif incremental:
+        raise RuntimeError("Ingest manifest found but the chunk store or embeddings.npy is missing; "
+                           f"delete {MANIFEST_FILE_NAME} to re-ingest every page")
+
+    all_chunks = sorted(kept_chunks + new_chunks, key=lambda chunk: chunk[0])
+    if not all_chunks:
+        raise RuntimeError("No page text left to index; refusing to write an empty index")
+    all_ids = np.concatenate([kept_ids, new_ids]).astype(np.int64)
+    all_vectors = np.ascontiguousarray(
+        np.vstack([vectors for vectors in (kept_vectors, new_vectors) if vectors is not None and len(vectors)]),
+        dtype=np.float32
+    )
+    order = np.argsort(all_ids, kind="stable")
+    all_ids, all_vectors = all_ids[order], all_vectors[order]
+
+    # Write the new chunk store and index.faiss next to the old ones and swap them in back to back, so
+    # a worker reload sees either both old or both new (NavigatorRetriever also refuses mismatched ids);
+    # derived indexes are rebuilt from the new files, and the manifest is written last
+    for file_name, array in ((EMBEDDING_IDS_FILE_NAME, all_ids), (EMBEDDINGS_FILE_NAME, all_vectors)):
+        path = os.path.join(vectorstore_path, file_name)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(path + ".tmp", path)
+    write_chunk_store(chunk_store_path(vectorstore_path) + ".new", all_chunks)
+    index = update_index(vectorstore_path, removed_ids, new_ids, new_vectors, all_ids, all_vectors, incremental)
+    index_path = os.path.join(vectorstore_path, FLAT_INDEX_FILE_NAME)
+    swap_directory(chunk_store_path(vectorstore_path) + ".new", chunk_store_path(vectorstore_path))
+    os.replace(index_path + ".tmp", index_path)
+    rebuild_derived(vectorstore_path)
+    write_pickled_docstore(vectorstore_path, all_chunks)
+
+    manifest["next_chunk_id"] = next_chunk_id
+    manifest["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    write_json_atomic(os.path.join(vectorstore_path, MANIFEST_FILE_NAME), manifest)
+
+    summary.update(added_chunks=len(new_chunks), removed_chunks=len(removed_ids))
+    print(f"✅ Index updated: +{len(new_chunks)} / -{len(removed_ids)} chunks, {index.ntotal} vectors total")
+    return summary
+
+
+def main():
+    from get_website_content import HTML_PARENT_DIR
+
+    parser = argparse.ArgumentParser(description="Incrementally ingest the CyberCJ HTML pages")
+    parser.add_argument("--vectorstore", default=DEFAULT_VECTORSTORE_PATH)
+    parser.add_argument("--html-root", default=HTML_PARENT_DIR,
+                        help="Directory containing the CyberCJ and CyberCJ_Challenges folders")
+    parser.add_argument("--folders", default="CyberCJ,CyberCJ_Challenges")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which pages changed")
+    parser.add_argument("--workers", type=int, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--window", type=int, help="Max pages in flight in the extraction pool")
+    parser.add_argument("--min-pages", type=int,
+                        help="Drop repeats of text blocks found on at least this many pages (0 = keep everything)")
+    args = parser.parse_args()
+
+    source_folders = [os.path.join(args.html_root, folder) for folder in args.folders.split(",")]
+    summary = ingest(args.vectorstore, source_folders, args.html_root, dry_run=args.dry_run,
+                     workers=args.workers, window=args.window, min_pages=args.min_pages)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
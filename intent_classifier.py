@@ -0,0 +1,193 @@
+"""
+Local intent classifier: is the student answering the tutor's last question,
+or asking something new?
+
+analyze_input_intent sends a long few-shot prompt to the 120B model to get one
+word back. IntentClassifier answers on the CPU with the MiniLM model the
+retriever already loads. A tiny logistic regression combines three features:
+
+    margin       similarity to the "answering" centroid minus similarity to the
+                 "new_question" centroid (centroids of labelled example inputs)
+    relatedness  cosine between the input and the tutor's previous question
+    heuristic    +1 short reply without "?", -1 question or request, 0 otherwise
+
+The weights are fitted on the labelled examples at first use (leave-one-out
+margins, so an example does not vote for itself). The input vector comes from
+the query embedding cache and is reused by retrieval, so a call costs about a
+millisecond. Callers fall back to the LLM when the confidence is low.
+"""
+
+import os
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+INTENT_CLASSIFIER_ENABLED = os.getenv("CJ_INTENT_CLASSIFIER", "1").lower() not in ("0", "false", "no")
+# Below this confidence (0 = coin flip, 1 = certain) the LLM decides instead
+INTENT_CONFIDENCE = float(os.getenv("CJ_INTENT_CONFIDENCE", "0.5"))
+# Optional JSONL of extra labelled turns: {"query", "previous_question", "intent"}
+INTENT_EXAMPLES_PATH = os.getenv("CJ_INTENT_EXAMPLES", "")
+
+INTENTS = ("answering", "new_question")
+QUESTION_OPENERS = ("what", "how", "why", "who", "when", "where", "which", "can you", "could you",
+                    "tell me", "explain", "i'd like to", "i want to", "what's")
+
+# (student input, previous tutor question, intent)
+DEFAULT_EXAMPLES: List[Tuple[str, str, str]] = [
+    ("spyware and adware", "Can you name two kinds of malware that collect data?", "answering"),
+    ("it locks your files until you pay", "What do you think ransomware does?", "answering"),
+    ("a fake website that looks like the bank", "What might a phishing link lead to?", "answering"),
+    ("because the evidence could be changed", "Why does the chain of custody matter?", "answering"),
+    ("hashing", "Which technique proves a disk image was not altered?", "answering"),
+    ("I think it is the integrity part", "Which pillar of the CIA triad does tampering affect?", "answering"),
+    ("no idea", "How would you secure a home router?", "answering"),
+    ("maybe a firewall", "What could block the incoming connection?", "answering"),
+    ("the email asks for the password urgently", "What seems suspicious about this message?", "answering"),
+    ("sure, let's go", "Shall we look at a real case next?", "answering"),
+    ("ok", "Does that make sense so far?", "answering"),
+    ("by using a long passphrase and a password manager", "How can users make their accounts harder to crack?", "answering"),
+    ("the warrant has to name the device", "What must investigators get before searching a laptop?", "answering"),
+    ("updates patch the vulnerability", "Why is installing updates important?", "answering"),
+    ("social engineering", "What do we call manipulating people into revealing information?", "answering"),
+    ("they could track your location", "What risks come with sharing photos publicly?", "answering"),
+    ("What is a zero-day exploit?", "What does a patch fix?", "new_question"),
+    ("How does a VPN work?", "What is the role of an ISP?", "new_question"),
+    ("Can you explain digital forensics?", "Which pillar of the CIA triad does tampering affect?", "new_question"),
+    ("what is identity theft", "Why is installing updates important?", "new_question"),
+    ("tell me about cyberstalking laws", "How can users make their accounts harder to crack?", "new_question"),
+    ("I want to learn about cookies and tracking", "Does that make sense so far?", "new_question"),
+    ("What's the difference between hacking and cracking?", "What do you think ransomware does?", "new_question"),
+    ("explain public key cryptography", "What seems suspicious about this message?", "new_question"),
+    ("Who investigates cybercrime in the US?", "How would you secure a home router?", "new_question"),
+    ("why do people use Tor?", "What might a phishing link lead to?", "new_question"),
+    ("Could you create a learning plan for Network Security?", "Shall we look at a real case next?", "new_question"),
+    ("how are DDoS attacks prosecuted", "Which technique proves a disk image was not altered?", "new_question"),
+    ("What is two-factor authentication?", "What must investigators get before searching a laptop?", "new_question"),
+    ("Which laws cover computer fraud?", "What risks come with sharing photos publicly?", "new_question"),
+    ("what does a SOC analyst do", "What do we call manipulating people into revealing information?", "new_question"),
+    ("How do I report a scam?", "Why does the chain of custody matter?", "new_question"),
+]
+
+
+def heuristic_vote(user_input: str) -> float:
+    """+1 for a short reply without "?", -1 for a question or request, 0 otherwise"""
+    text = user_input.strip().lower()
+    if text.endswith("?") or text.startswith(QUESTION_OPENERS):
+        return -1.0
+    if len(text.split()) <= 5:
+        return 1.0
+    return 0.0
+
+
+def load_examples(path: str) -> List[Tuple[str, str, str]]:
+    """Labelled turns from a JSONL file in the benchmark_queries.jsonl format"""
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                if item.get("previous_question") and item.get("intent") in INTENTS:
+                    examples.append((item["query"], item["previous_question"], item["intent"]))
+    return examples
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+class IntentClassifier:
+    """Nearest-centroid + logistic regression intent classifier over MiniLM vectors"""
+
+    def __init__(self, embeddings, examples: Optional[List[Tuple[str, str, str]]] = None,
+                 confidence_threshold: float = INTENT_CONFIDENCE):
+        self.embeddings = embeddings
+        self.examples = list(examples if examples is not None else DEFAULT_EXAMPLES)
+        if examples is None and INTENT_EXAMPLES_PATH:
+            self.examples.extend(load_examples(INTENT_EXAMPLES_PATH))
+        self.confidence_threshold = confidence_threshold
+        self._lock = threading.Lock()
+        self._centroids: Optional[np.ndarray] = None
+        self._weights: Optional[np.ndarray] = None
+        self.calls = 0
+        self.low_confidence = 0
+        self.total_ms = 0.0
+
+    def _embed(self, texts: List[str], cached: bool) -> np.ndarray:
+        # Example texts bypass the query embedding cache (CachedEmbeddings.inner)
+        embeddings = self.embeddings if cached else getattr(self.embeddings, "inner", self.embeddings)
+        if hasattr(embeddings, "embed_array"):
+            return _unit(embeddings.embed_array(texts))
+        return _unit(embeddings.embed_documents(texts))
+
+    def fit(self):
+        """Centroids and feature weights from the labelled examples (runs once, on first use)"""
+        with self._lock:
+            if self._weights is not None:
+                return
+            inputs = self._embed([example[0] for example in self.examples], cached=False)
+            questions = self._embed([example[1] for example in self.examples], cached=False)
+            labels = np.array([1.0 if example[2] == "answering" else 0.0 for example in self.examples])
+
+            sums = np.vstack([inputs[labels == 1].sum(axis=0), inputs[labels == 0].sum(axis=0)])
+            # Leave-one-out centroids: an example is scored against centroids it is not part of
+            loo_scores = np.zeros((len(labels), 2))
+            for position, vector in enumerate(inputs):
+                own_class = 0 if labels[position] == 1 else 1
+                loo_sums = sums.copy()
+                loo_sums[own_class] -= vector
+                loo_scores[position] = _unit(loo_sums) @ vector
+            features = self._features(loo_scores, inputs, questions, [example[0] for example in self.examples])
+
+            weights = np.zeros(features.shape[1] + 1)
+            design = np.hstack([features, np.ones((len(features), 1))])
+            for _ in range(500):
+                predictions = 1.0 / (1.0 + np.exp(-design @ weights))
+                weights -= 0.5 * (design.T @ (predictions - labels) / len(labels) + 0.05 * weights)
+
+            self._centroids = _unit(sums)
+            self._weights = weights
+
+    @staticmethod
+    def _features(centroid_scores: np.ndarray, inputs: np.ndarray, questions: np.ndarray,
+                  texts: List[str]) -> np.ndarray:
+        margin = centroid_scores[:, 0] - centroid_scores[:, 1]
+        relatedness = np.sum(inputs * questions, axis=1)
+        votes = np.array([heuristic_vote(text) for text in texts])
+        return np.column_stack([margin, relatedness, votes])
+
+    def classify(self, user_input: str, previous_question: str = "") -> Tuple[str, float]:
+        """(intent, confidence in [0, 1]) for one student turn"""
+        if not user_input or not previous_question:
+            return "new_question", 1.0
+        if self._weights is None:
+            self.fit()
+
+        start_time = time.perf_counter()
+        vectors = self._embed([user_input, previous_question], cached=True)
+        features = self._features(vectors[:1] @ self._centroids.T, vectors[:1], vectors[1:], [user_input])
+        probability = 1.0 / (1.0 + np.exp(-(features[0] @ self._weights[:-1] + self._weights[-1])))
+        intent = "answering" if probability >= 0.5 else "new_question"
+        confidence = float(abs(probability - 0.5) * 2)
+
+        self.calls += 1
+        self.total_ms += (time.perf_counter() - start_time) * 1000
+        if confidence < self.confidence_threshold:
+            self.low_confidence += 1
+        return intent, confidence
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.confidence_threshold
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'examples': len(self.examples),
+            'confidence_threshold': self.confidence_threshold,
+            'low_confidence': self.low_confidence,
+            'llm_fallback_rate': round(self.low_confidence / self.calls, 4) if self.calls else 0.0,
+            'avg_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0
+        }
@@ -0,0 +1,113 @@
+"""
+Incremental extraction of one string field from a JSON object that is still
+being generated.
+
+The tutor answers with a JSON object whose "response_to_student" field is the
+only part the student sees. JsonFieldStreamer is fed the LLM's token stream
+chunk by chunk and returns the newly decoded characters of that field as soon
+as they arrive, so they can be forwarded to the browser before the object is
+complete. Text before the first "{" (preambles, code fences) is ignored, escape
+sequences split across chunks are handled, and only top-level keys match.
+"""
+
+from typing import List, Optional
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class JsonFieldStreamer:
+    """Feeds on raw JSON text, emits the decoded characters of one top-level string field"""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.value = ""
+        self.complete = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._reading_key = False
+        self._key: List[str] = []
+        self._last_key = ""
+        self._expecting_value = False
+        self._capturing = False
+
+    def _decoded(self, char: str, out: List[str]):
+        if self._capturing:
+            out.append(char)
+        elif self._reading_key:
+            self._key.append(char)
+
+    def _unicode_char(self, code: int, out: List[str]):
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._decoded(chr(code), out)
+
+    def feed(self, text: str) -> str:
+        """Consume the next chunk; returns the field characters it completed (may be empty)"""
+        out: List[str] = []
+        for char in text:
+            if self.complete:
+                break
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._unicode is not None:
+                    self._unicode += char
+                    if len(self._unicode) == 4:
+                        try:
+                            self._unicode_char(int(self._unicode, 16), out)
+                        except ValueError:
+                            pass
+                        self._unicode = None
+                elif self._escape:
+                    self._escape = False
+                    if char == "u":
+                        self._unicode = ""
+                    else:
+                        self._decoded(_ESCAPES.get(char, char), out)
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._capturing:
+                        self._capturing = False
+                        self.complete = True
+                    elif self._reading_key:
+                        self._reading_key = False
+                        self._last_key = "".join(self._key)
+                else:
+                    self._decoded(char, out)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expecting_value:
+                    self._capturing = self._last_key == self.field
+                elif self._depth == 1:
+                    self._reading_key = True
+                    self._key = []
+            elif char == ":" and self._depth == 1:
+                self._expecting_value = True
+            elif char == "," and self._depth == 1:
+                self._expecting_value = False
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+
+        emitted = "".join(out)
+        self.value += emitted
+        return emitted
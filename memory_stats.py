@@ -0,0 +1,62 @@
+"""
+Process memory helpers for the CyberCJ backend.
+
+Used to confirm how much of a gunicorn worker's memory is shared with the
+master (copy-on-write pages of the preloaded model and index) and how much is
+private to the worker.
+"""
+
+import os
+import sys
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    Return memory usage of a process in MB.
+
+    On Linux this reads /proc/<pid>/smaps_rollup and reports RSS, PSS and the
+    shared/private split. Elsewhere only the peak RSS of the current process is
+    available.
+    """
+    pid = pid or os.getpid()
+    smaps_path = f"/proc/{pid}/smaps_rollup"
+
+    if os.path.exists(smaps_path):
+        fields = {}
+        with open(smaps_path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+
+        def mb(*names):
+            return round(sum(fields.get(name, 0) for name in names) / 1024, 1)
+
+        return {
+            'pid': pid,
+            'rss_mb': mb('Rss'),
+            'pss_mb': mb('Pss'),
+            'shared_mb': mb('Shared_Clean', 'Shared_Dirty'),
+            'private_mb': mb('Private_Clean', 'Private_Dirty')
+        }
+
+    # Fallback (macOS dev machines): peak RSS of the current process only
+    if resource is None:
+        return {'pid': pid}
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {'pid': pid, 'max_rss_mb': round(max_rss / divisor, 1)}
+
+
+def format_memory(stats: Dict[str, float]) -> str:
+    """One-line summary used in the server logs"""
+    if 'rss_mb' in stats:
+        return (f"RSS {stats['rss_mb']} MB (shared {stats['shared_mb']} MB, "
+                f"private {stats['private_mb']} MB, PSS {stats['pss_mb']} MB)")
+    return f"peak RSS {stats.get('max_rss_mb', '?')} MB"
@@ -1,10 +1,14 @@
 # multi_agent_tutor.py - CyberJustice Multi-Agent Tutor System
 
 import os
+import sys
 import json
 import time
 import re
-from typing import Dict, Any, Optional, List
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional, List, Callable, Iterator, Tuple
 from enum import Enum
 from dotenv import load_dotenv
 load_dotenv()
@@ -12,11 +16,26 @@ load_dotenv()
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains.question_answering import load_qa_chain
 
+from tutor_embeddings import create_embeddings
+from embedding_cache import load_feedback_queries
+from vector_index import load_vectorstore
+from retrieval import MULTI_QUERY_ENABLED, NavigatorRetriever, build_course_content
+from retrieval_batcher import RETRIEVAL_BATCHING_ENABLED, RetrievalBatcher
+from plan_prefetch import PLAN_PREFETCH_ENABLED, PlanPrefetcher
+from context_compression import CONTEXT_COMPRESSION_ENABLED, ContextCompressor
+from intent_classifier import INTENT_CLASSIFIER_ENABLED, IntentClassifier
+from json_stream import JsonFieldStreamer
+from prompt_builder import PromptBuilder
+
+# LLM intent analysis: "concurrent" runs it alongside generation, "background" after the
+# response has been returned (the session is updated when it finishes), "off" keeps the local intent
+INTENT_ANALYSIS_MODE = os.getenv("CJ_INTENT_ANALYSIS", "concurrent").lower()
+INTENT_WORKERS = int(os.getenv("CJ_INTENT_WORKERS", "4"))
+
 
 def analyze_input_intent(user_input: str, previous_question: str = "", llm=None) -> str:
     """
@@ -120,6 +139,14 @@ class ConversationContext:
         self.step_completion_status: List[bool] = []
         self.plan_just_completed: bool = False
 
+        # Chunks retrieved ahead of time for the current/next plan steps (see plan_prefetch.py)
+        self.pinned_chunks: Optional[Dict[str, Any]] = None
+        # Chunks of the previous turn's prompt and their index version, seeds for kNN graph expansion
+        self.last_chunk_ids: List[int] = []
+        self.last_chunk_version: str = ""
+        # Latest LLM intent analysis; filled in after the response in background mode
+        self.last_input_intent: Optional[str] = None
+
 class UnifiedTutorAgent:
     """
     CJ-Mentor: A personalized AI learning tutor for Cyber Criminal Justice students
@@ -128,9 +155,16 @@ class UnifiedTutorAgent:
     Personality: Patient, guiding, logical, encouraging, and highly adaptive.
     Core Philosophy: try not giving direct answers, instead guides students to discover through questioning.
     """
-    def __init__(self, llm, retriever):
+    def __init__(self, llm, retriever, prefetcher: Optional[PlanPrefetcher] = None,
+                 compressor: Optional[ContextCompressor] = None):
         self.llm = llm
         self.retriever = retriever
+        self.prefetcher = prefetcher
+        self.compressor = compressor
+        self.prompt_builder = PromptBuilder(
+            {profile.value: self._get_profile_instructions(profile) for profile in UserProfile},
+            {level.value: self._determine_scaffolding_approach(level) for level in ScaffoldingLevel}
+        )
 
     def _get_profile_instructions(self, profile: UserProfile) -> str:
         """Detailed profile-specific guidance aligned with CJ-Mentor blueprint"""
@@ -171,94 +205,75 @@ class UnifiedTutorAgent:
             - Set tasks that require synthesis of multiple concepts
             - Challenge students to apply knowledge creatively"""
 
-    def generate_response(self, user_input: str, context: ConversationContext) -> Dict[str, Any]:
+    def _retrieval_sub_queries(self, context: ConversationContext) -> List[str]:
+        """Sub-queries searched alongside the student's input: current plan step and previous tutor question"""
+        sub_queries = []
+        if context.learning_plan and 0 <= context.current_plan_step < len(context.learning_plan):
+            sub_queries.append(str(context.learning_plan[context.current_plan_step]))
+        if context.last_question:
+            sub_queries.append(context.last_question)
+        return sub_queries
+
+    def _stream_llm(self, prompt: str, on_text: Callable[[str], None], **llm_kwargs) -> str:
+        """Stream the LLM output, passing response_to_student characters to on_text as they arrive"""
+        streamer = JsonFieldStreamer("response_to_student")
+        parts = []
+        for chunk in self.llm.stream(prompt, **llm_kwargs):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if not text:
+                continue
+            parts.append(text)
+            visible = streamer.feed(text)
+            if visible:
+                on_text(visible)
+        return "".join(parts)
+
+    def generate_response(self, user_input: str, context: ConversationContext,
+                          turn_intent: Optional[str] = None,
+                          on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         CJ-Mentor's enhanced intelligence: Implements THINK, PLAN, ACT cycle
         for strategic learning guidance with proactive planning capabilities.
+        With on_text, the LLM output is streamed and the student-facing text is
+        passed to on_text while the rest of the JSON is still being generated.
         """
-        profile_instructions = self._get_profile_instructions(context.user_profile)
-        scaffolding_approach = self._determine_scaffolding_approach(context.scaffolding_level)
-
-        # Enhanced retrieval with topic context
-        search_query = f"{user_input} {context.current_topic or ''} {context.learning_objective or ''}"
-        relevant_docs = self.retriever.invoke(search_query)  # Updated to use invoke instead of deprecated method
-        course_content = "\n\n".join([doc.page_content for doc in relevant_docs[:3]])
-
-        # Strategic planning prompt with THINK-PLAN-ACT cycle
-        unified_prompt = f"""
-You are CJ-Mentor, an expert AI tutor with strategic planning abilities. Your goal is to guide the student through a logical learning path, not just answer questions reactively.
-
-**STUDENT PROFILE:**
-- User Type: {context.user_profile.value}
-- Profile Guidance: {profile_instructions}
-- Current Scaffolding Level: {context.scaffolding_level.value}
-
-**CONVERSATION CONTEXT:**
-- Current Topic: {context.current_topic or "Not set"}
-- Learning Objective: {context.learning_objective or "To be determined"}
-- Previous Tutor Question: "{context.last_question or "None"}"
-- **Current Learning Plan:** {context.learning_plan or "None. A new plan needs to be created."}
-- **Current Plan Step:** {context.current_plan_step + 1 if context.learning_plan else "No plan exists"}
-- **Total Plan Steps:** {len(context.learning_plan) if context.learning_plan else 0}
-- **Plan Just Completed:** {context.plan_just_completed}
-
-**STUDENT'S LATEST INPUT:** "{user_input}"
-
-**RELEVANT KNOWLEDGE BASE:**
----
-{course_content}
----
-
-**YOUR TASK: Follow the THINK, PLAN, ACT cycle.**
-
-**1. THINK (Internal Assessment & Strategy):**
-   - **Topic Analysis:** Is this a new topic, continuation of current topic, or student answering my question?
-   - **Student Assessment:** How well did they understand? Are they ready for next step or need more support?
-   - **Plan Status:** Should I create new plan, advance current plan, stay on current step, or adapt plan?
-   - **Plan Completion Check:** If plan_just_completed is True, congratulate completion and ask what they'd like to learn next
-   - **Learning Goal:** What specific learning outcome should this interaction achieve?
-
-**2. PLAN (Strategic Learning Path):**
-   - **If plan_just_completed is True:** Acknowledge the completion and ask student what new topic they'd like to explore
-   - **If no plan exists OR topic completely changed:** Create a new 4-6 step learning plan that progresses logically from basic understanding to practical application
-   - **If plan exists and student succeeded:** Advance to next step (increment plan_step)
-   - **If plan exists but student needs help:** Stay on current step, provide more scaffolding
-   - **If student asks great unexpected question:** Adapt plan or temporarily deviate then return
-
-**3. ACT (Execute Current Plan Step):**
-   - Craft response that directly implements the current plan step
-   - Provide appropriate scaffolding level for current step
-   - Always end with clear question/challenge aligned with current step
-   - Be encouraging and build on student's progress
-
-**SCAFFOLDING APPROACH FOR CURRENT LEVEL:**
-{scaffolding_approach}
-
-
-**OUTPUT FORMAT - RESPOND WITH JSON:**
-{{
-  "internal_thought": "Your step-by-step thinking process: topic analysis, student assessment, plan decision, and response strategy",
-  "updated_plan": {{
-    "plan": ["Step 1 description", "Step 2 description", "Step 3 description", "Step 4 description"],
-    "plan_step": 0,
-    "plan_adaptation": "Explanation of any plan changes or why staying on current step"
-  }},
-  "scaffolding_adjustment": {{
-    "new_scaffolding_level": "HIGH_SUPPORT" | "GUIDED_SUPPORT" | "LOW_SUPPORT",
-    "reasoning": "Why this scaffolding level is appropriate for current step"
-  }},
-  "response_to_student": "Your natural, encouraging response that executes the current plan step and ends with a guiding question"
-}}
-
-**EXAMPLE SUCCESSFUL CYCLE:**
-
-Student: "I want to learn about phishing"
-Internal Thought: "New topic detected. Student wants to learn phishing. I need to create a comprehensive 4-step plan starting with basic definition and building to practical prevention. This is step 1."
-Updated Plan: {{"plan": ["Basic definition and recognition", "Analyze phishing email examples", "Understand attack consequences", "Learn prevention strategies"], "plan_step": 0}}
-Response: "Phishing is a crucial cybersecurity topic! Let's build your expertise step by step. To start our learning journey, how would you describe what phishing is in your own words? Don't worry if you're not sure - we'll build from whatever understanding you have."
-
-Now, analyze the current situation and generate your strategic CJ-Mentor response:
-"""
+
+        # Answering turns stay on the current plan step: reuse its prefetched chunks and query vectors
+        relevant_docs = None
+        query_vectors = None
+        if turn_intent == "answering" and self.prefetcher is not None:
+            pinned = self.prefetcher.pinned(context)
+            if pinned is not None:
+                relevant_docs, query_vectors = pinned["docs"], pinned["query_vectors"]
+                print(f"📌 Using {len(relevant_docs)} pinned chunks for plan step {context.current_plan_step + 1}")
+
+        # Otherwise an answer stays near the previous turn's chunks: walk the kNN graph, no FAISS search
+        if relevant_docs is None and turn_intent == "answering":
+            relevant_docs = self.retriever.expand(context.last_chunk_ids, keyword_query=user_input,
+                                                  seed_version=context.last_chunk_version)
+            if relevant_docs is not None:
+                print(f"🕸️ Expanded {len(relevant_docs)} chunks from the previous turn's neighbourhood")
+
+        # Enhanced retrieval: raw input, current plan step and previous tutor question in one batched search
+        if relevant_docs is None and MULTI_QUERY_ENABLED:
+            relevant_docs = self.retriever.retrieve(user_input, keyword_query=user_input,
+                                                    extra_queries=self._retrieval_sub_queries(context))
+        elif relevant_docs is None:
+            search_query = f"{user_input} {context.current_topic or ''} {context.learning_objective or ''}"
+            relevant_docs = self.retriever.retrieve(search_query, keyword_query=user_input)
+        context.last_chunk_ids = [doc.metadata["chunk_id"] for doc in relevant_docs if "chunk_id" in doc.metadata]
+        context.last_chunk_version = self.retriever.index_version
+        if self.compressor is not None and relevant_docs:
+            # Keep only the sentences closest to the input and the plan step / previous question
+            # (pinned chunks: closest to their plan step, with no embedding on the request path)
+            if query_vectors is None:
+                query_vectors = self.retriever.embed_queries([user_input, *self._retrieval_sub_queries(context)])
+            course_content = self.compressor.compress(relevant_docs, query_vectors)
+        else:
+            course_content = build_course_content(relevant_docs)
+
+        # Strategic planning prompt with THINK-PLAN-ACT cycle: static prefix + budgeted per-turn context
+        unified_prompt = self.prompt_builder.build(user_input, context, course_content)
 
         try:
             print(f"🤖 CJ-Mentor starting response generation...")
@@ -269,16 +284,31 @@ Now, analyze the current situation and generate your strategic CJ-Mentor respons
             import time
             start_time = time.time()
 
-            raw_response = self.llm.invoke(unified_prompt)
+            # Optional cap on generated tokens by scaffolding level (CJ_MAX_TOKENS_*)
+            llm_kwargs = {}
+            max_tokens = self.prompt_builder.max_tokens(context.scaffolding_level.value)
+            if max_tokens:
+                llm_kwargs["max_tokens"] = max_tokens
+
+            if on_text is None:
+                raw_response = self.llm.invoke(unified_prompt, **llm_kwargs)
+                raw_content = raw_response.content
+                usage = getattr(raw_response, "usage_metadata", None) or {}
+                if usage.get("input_tokens"):
+                    cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+                    print(f"🧾 LLM usage: {usage['input_tokens']} input tokens ({cached} cached), "
+                          f"{usage.get('output_tokens', 0)} output tokens")
+            else:
+                raw_content = self._stream_llm(unified_prompt, on_text, **llm_kwargs)
 
             end_time = time.time()
             print(f"⏱️ LLM response time: {end_time - start_time:.2f} seconds")
-            print(f"✅ Got LLM response, content length: {len(raw_response.content)}")
+            print(f"✅ Got LLM response, content length: {len(raw_content)}")
 
             import json
 
             # Enhanced JSON parsing
-            content = raw_response.content.strip()
+            content = raw_content.strip()
 
             # Find JSON boundaries more reliably
             start_idx = content.find('{')
@@ -302,14 +332,15 @@ Now, analyze the current situation and generate your strategic CJ-Mentor respons
                 if not parsed_response.get("response_to_student"):
                     parsed_response["response_to_student"] = "I'm here to guide your learning journey. What would you like to explore?"
 
-                if not parsed_response.get("updated_plan"):
+                # Lean responses carry a plan_update delta instead, applied by _update_context
+                if not parsed_response.get("updated_plan") and not parsed_response.get("plan_update"):
                     parsed_response["updated_plan"] = {
                         "plan": ["Explore the topic together"],
                         "plan_step": 0,
                         "plan_adaptation": "Created basic exploration plan"
                     }
 
-                if not parsed_response.get("internal_thought"):
+                if not parsed_response.get("internal_thought") and not parsed_response.get("plan_update"):
                     parsed_response["internal_thought"] = "Engaging with student's learning interests"
 
                 # Log the internal thinking for debugging
@@ -317,12 +348,18 @@ Now, analyze the current situation and generate your strategic CJ-Mentor respons
 
                 return parsed_response
             else:
-                # Fallback with basic plan structure
+                # Output cut off (e.g. by max_tokens): keep whatever part of the student response was written
+                partial_response = JsonFieldStreamer("response_to_student")
+                partial_response.feed(content)
+                if partial_response.value.strip():
+                    content = partial_response.value.strip()
+
+                # Fallback with basic plan structure (an existing plan is kept on its current step)
                 return {
                     "internal_thought": "JSON parsing failed, creating basic response",
                     "updated_plan": {
-                        "plan": ["Continue learning conversation"],
-                        "plan_step": 0,
+                        "plan": context.learning_plan or ["Continue learning conversation"],
+                        "plan_step": context.current_plan_step if context.learning_plan else 0,
                         "plan_adaptation": "Fallback plan created"
                     },
                     "scaffolding_adjustment": {
@@ -381,9 +418,38 @@ class CyberJusticeMultiAgentTutor:
 
         # Initialize RAG components
         self.retriever = self._initialize_rag()
+        # Concurrent requests of this worker share one embed + FAISS search per few-ms window
+        self.retrieval_batcher = RetrievalBatcher(self.retriever) if RETRIEVAL_BATCHING_ENABLED else None
+        self.retriever.batcher = self.retrieval_batcher
+
+        # Sentence-level compression of the retrieved chunks to a token budget
+        self.context_compressor = (ContextCompressor(self.retriever.vectorstore.embeddings)
+                                   if CONTEXT_COMPRESSION_ENABLED else None)
+
+        # Retrieve chunks for upcoming plan steps in the background
+        self.plan_prefetcher = (PlanPrefetcher(self.retriever, compressor=self.context_compressor)
+                                if PLAN_PREFETCH_ENABLED else None)
+
+        # LLM intent analysis runs off the request's critical path (CJ_INTENT_ANALYSIS)
+        self.intent_mode = INTENT_ANALYSIS_MODE if INTENT_ANALYSIS_MODE in ("concurrent", "background") else "off"
+        self.intent_executor = (ThreadPoolExecutor(max_workers=INTENT_WORKERS, thread_name_prefix="intent")
+                                if self.intent_mode != "off" else None)
+        # Local MiniLM classifier; the LLM is only asked when it is not confident
+        self.intent_classifier = (IntentClassifier(self.retriever.vectorstore.embeddings)
+                                  if INTENT_CLASSIFIER_ENABLED else None)
+        self.intent_calls = 0
+        self.intent_failures = 0
+        self.intent_disagreements = 0
+
+        # Streaming (/ask_stream) counters: time to first visible token vs full response
+        self.streams = 0
+        self.streams_with_text = 0
+        self.stream_first_token_seconds = 0.0
+        self.stream_total_seconds = 0.0
 
         # We only need one powerful agent now
-        self.tutor_agent = UnifiedTutorAgent(self.llm, self.retriever)
+        self.tutor_agent = UnifiedTutorAgent(self.llm, self.retriever, self.plan_prefetcher,
+                                             self.context_compressor)
 
         # Conversation management
         self.conversations: Dict[str, ConversationContext] = {}
@@ -400,26 +466,111 @@ class CyberJusticeMultiAgentTutor:
             if not os.path.exists(self.vectorstore_path_abs):
                 raise FileNotFoundError(f"CRITICAL: Pre-built FAISS index not found at {self.vectorstore_path_abs}.")
 
-            # Use optimized embeddings with reduced memory usage
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={'device': 'cpu'},  # Force CPU to avoid GPU memory issues
-                encode_kwargs={'normalize_embeddings': True, 'batch_size': 1}  # Small batch size
-            )
-
-            # Load or create vectorstore
-            vectorstore = FAISS.load_local(
-                self.vectorstore_path_abs,
-                embeddings,
-                allow_dangerous_deserialization=True
+            # Reuse the read-only vectorstore preloaded by the gunicorn master (copy-on-write),
+            # otherwise load a private copy in this process
+            vectorstore = _shared_vectorstores.get(self.vectorstore_path_abs)
+            if vectorstore is not None:
+                print("♻️ Using preloaded shared embeddings and FAISS index")
+            else:
+                vectorstore = load_vectorstore(self.vectorstore_path_abs, create_embeddings())
+
+            vectorstore_path = self.vectorstore_path_abs
+            return NavigatorRetriever(
+                vectorstore,
+                vectorstore_path,
+                k=5,
+                loader=lambda embeddings: load_vectorstore(vectorstore_path, embeddings)
             )
 
-            return vectorstore.as_retriever(search_kwargs={"k": 5})
-
         except Exception as e:
             print(f"Error initializing RAG: {e}")
             raise
 
+    def warm_up(self, probe_query: str = "What is cybersecurity?") -> Dict[str, float]:
+        """
+        Exercise the embedding model and FAISS index once so that the first
+        student request does not pay the cold-start cost.
+        Returns timings (in seconds) for the dummy embed and search.
+        """
+        vectorstore = self.retriever.vectorstore
+
+        start_time = time.time()
+        query_vector = vectorstore.embeddings.embed_query(probe_query)
+        embed_time = time.time() - start_time
+
+        start_time = time.time()
+        vectorstore.similarity_search_by_vector(query_vector, k=1)
+        search_time = time.time() - start_time
+
+        print(f"🔥 CJ-Mentor warm-up: embed {embed_time:.3f}s, search {search_time:.3f}s")
+        timings = {
+            "warmup_embed_seconds": round(embed_time, 4),
+            "warmup_search_seconds": round(search_time, 4)
+        }
+
+        # Pre-warm the query embedding cache with what students asked before
+        embeddings = vectorstore.embeddings
+        if hasattr(embeddings, "prewarm"):
+            start_time = time.time()
+            queries = load_feedback_queries()
+            if queries:
+                newly_embedded = embeddings.prewarm(queries)
+                timings["prewarm_queries"] = len(queries)
+                timings["prewarm_seconds"] = round(time.time() - start_time, 4)
+                print(f"🔥 Query cache pre-warmed with {len(queries)} historical queries ({newly_embedded} embedded)")
+
+        return timings
+
+    def get_performance_stats(self) -> Dict[str, Any]:
+        """Runtime counters of the retrieval stack (served by /stats)"""
+        stats: Dict[str, Any] = {"active_sessions": len(self.conversations)}
+        embeddings = self.retriever.vectorstore.embeddings
+        if hasattr(embeddings, "stats"):
+            stats["query_embedding_cache"] = embeddings.stats()
+        stats["retrieval"] = self.retriever.stats()
+        if self.plan_prefetcher is not None:
+            stats["plan_prefetch"] = self.plan_prefetcher.stats()
+        if self.context_compressor is not None:
+            stats["context_compression"] = self.context_compressor.stats()
+        stats["intent_analysis"] = {
+            'mode': self.intent_mode,
+            'llm_calls': self.intent_calls,
+            'failures': self.intent_failures,
+            'local_disagreements': self.intent_disagreements
+        }
+        if self.intent_classifier is not None:
+            stats["intent_classifier"] = self.intent_classifier.stats()
+        stats["prompt"] = self.tutor_agent.prompt_builder.stats()
+        stats["streaming"] = {
+            'streams': self.streams,
+            'avg_first_token_ms': (round(1000 * self.stream_first_token_seconds / self.streams_with_text, 1)
+                                   if self.streams_with_text else 0.0),
+            'avg_total_ms': round(1000 * self.stream_total_seconds / self.streams, 1) if self.streams else 0.0
+        }
+        return stats
+
+    def _submit_intent_analysis(self, user_input: str, previous_question: str) -> Optional[Future]:
+        """Start the LLM intent call on the intent pool; None when disabled or trivially decided"""
+        if self.intent_executor is None or not user_input or not previous_question:
+            return None
+        self.intent_calls += 1
+        return self.intent_executor.submit(analyze_input_intent, user_input, previous_question, self.llm)
+
+    def _record_intent(self, context: ConversationContext, history_entry: Dict[str, Any],
+                       local_intent: str, future: Future) -> Optional[str]:
+        """Store a finished LLM intent on the session and its history entry"""
+        try:
+            intent = future.result()
+        except Exception as e:
+            self.intent_failures += 1
+            print(f"⚠️ Intent analysis failed: {e}")
+            return None
+        if intent != local_intent:
+            self.intent_disagreements += 1
+        history_entry['input_intent'] = intent
+        context.last_input_intent = intent
+        return intent
+
     def _get_or_create_context(self, session_id: str, user_profile: str = "general") -> ConversationContext:
         """Get existing conversation context or create new one"""
         if session_id not in self.conversations:
@@ -430,6 +581,25 @@ class CyberJusticeMultiAgentTutor:
 
         return self.conversations[session_id]
 
+    def _apply_plan_delta(self, context: ConversationContext, plan_update: Any) -> Dict[str, Any]:
+        """
+        Full-schema updated_plan for a lean plan_update delta:
+        advance -> next step, stay -> current step, replace -> new plan at its first step
+        """
+        if not isinstance(plan_update, dict):
+            plan_update = {"action": str(plan_update)}
+        action = str(plan_update.get("action", "stay")).lower()
+        reason = plan_update.get("reason", "")
+        new_plan = plan_update.get("plan")
+
+        if action == "replace" and isinstance(new_plan, list) and new_plan:
+            return {"plan": new_plan, "plan_step": 0, "plan_adaptation": reason or "New plan"}
+        if not context.learning_plan:
+            # Nothing to advance or stay on: keep waiting for a plan
+            return {"plan_adaptation": reason}
+        step = context.current_plan_step + 1 if action == "advance" else context.current_plan_step
+        return {"plan": context.learning_plan, "plan_step": step, "plan_adaptation": reason}
+
     def _update_context(self, context: ConversationContext, user_input: str, agent_output: Dict[str, Any]):
         """
         Enhanced context updating with strategic learning plan management
@@ -439,6 +609,12 @@ class CyberJusticeMultiAgentTutor:
         context.plan_just_completed = False
 
         response_text = agent_output.get("response_to_student", "I'm here to guide your learning journey.")
+        # Lean schema: turn the plan delta and scaffolding level into the full-schema updates
+        if agent_output.get("plan_update") is not None:
+            agent_output["updated_plan"] = self._apply_plan_delta(context, agent_output["plan_update"])
+        if agent_output.get("new_scaffolding_level") and not agent_output.get("scaffolding_adjustment"):
+            agent_output["scaffolding_adjustment"] = {"new_scaffolding_level": agent_output["new_scaffolding_level"],
+                                                      "reasoning": ""}
         updated_plan_data = agent_output.get("updated_plan", {})
         scaffolding_adjustment = agent_output.get("scaffolding_adjustment", {})
         internal_thought = agent_output.get("internal_thought", "")
@@ -530,7 +706,8 @@ class CyberJusticeMultiAgentTutor:
         response = re.sub(r'\n\s*\n', '\n\n', response)
         return response.strip()
 
-    def chat(self, user_input: str, session_id: str = "default", user_profile: str = "general") -> Dict[str, Any]:
+    def chat(self, user_input: str, session_id: str = "default", user_profile: str = "general",
+             on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         CJ-Mentor: Strategic learning interface with proactive planning capabilities
 
@@ -552,9 +729,25 @@ class CyberJusticeMultiAgentTutor:
             if len(context.conversation_history) == 0:
                 print("🆕 CJ-Mentor: Initializing strategic learning session with planning capabilities")
 
+            # Cheap intent (local classifier or heuristic, no LLM call) decides whether pinned
+            # plan-step chunks or the chunk graph can be reused
+            previous_question = context.last_question
+            intent_confident = False
+            if self.intent_classifier is not None:
+                turn_intent, confidence = self.intent_classifier.classify(user_input, previous_question)
+                intent_confident = self.intent_classifier.is_confident(confidence)
+            else:
+                turn_intent = analyze_input_intent(user_input, previous_question)
+
+            # The LLM intent call judges against the question the student saw, so start it before
+            # _update_context replaces last_question; in concurrent mode it overlaps generation
+            intent_future = None
+            if self.intent_mode == "concurrent" and not intent_confident:
+                intent_future = self._submit_intent_analysis(user_input, previous_question)
+
             # Core CJ-Mentor Strategic Intelligence: THINK-PLAN-ACT cycle
             print("🧠 Generating agent response...")
-            agent_output = self.tutor_agent.generate_response(user_input, context)
+            agent_output = self.tutor_agent.generate_response(user_input, context, turn_intent, on_text)
 
             # Extract response for student
             cleaned_response = self._clean_response(agent_output.get("response_to_student", ""))
@@ -564,8 +757,21 @@ class CyberJusticeMultiAgentTutor:
             # Update context with strategic planning data
             self._update_context(context, user_input, agent_output)
 
-            # Enhanced intent analysis for better continuity
-            input_intent = analyze_input_intent(user_input, context.last_question, self.llm)
+            # Pin chunks for the (new or advanced) plan's current and next steps, off the request path
+            if self.plan_prefetcher is not None:
+                self.plan_prefetcher.schedule(context)
+
+            # Enhanced intent analysis for better continuity, without a second blocking round trip
+            history_entry = context.conversation_history[-1]
+            history_entry['input_intent'] = turn_intent
+            input_intent = turn_intent
+            if intent_future is not None:
+                input_intent = self._record_intent(context, history_entry, turn_intent, intent_future) or turn_intent
+            elif self.intent_mode == "background" and not intent_confident:
+                intent_future = self._submit_intent_analysis(user_input, previous_question)
+                if intent_future is not None:
+                    intent_future.add_done_callback(
+                        lambda done: self._record_intent(context, history_entry, turn_intent, done))
 
             # Calculate plan progress metrics
             plan_progress = 0
@@ -628,6 +834,96 @@ class CyberJusticeMultiAgentTutor:
                 "plan_progress_percentage": 0.0
             }
 
+    def stream_chat(self, user_input: str, session_id: str = "default",
+                    user_profile: str = "general") -> Iterator[Tuple[str, Any]]:
+        """
+        chat() as a stream of events: ("delta", text) for each piece of the
+        student-facing response as the LLM generates it, then ("done", response_data)
+        once plan and scaffolding updates have been applied, or ("error", message)
+        if the turn failed.
+        """
+        events: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        start_time = time.time()
+
+        def run():
+            try:
+                response_data = self.chat(user_input, session_id, user_profile,
+                                          on_text=lambda text: events.put(("delta", text)))
+                # chat() answers a failed turn with its fallback reply and the error
+                if "error" in response_data:
+                    events.put(("error", response_data["error"]))
+                else:
+                    events.put(("done", response_data))
+            except Exception as e:
+                events.put(("error", str(e)))
+
+        # The turn runs to completion even if the client disconnects, so the session stays consistent
+        threading.Thread(target=run, name="stream-chat", daemon=True).start()
+        first_token_at = None
+        while True:
+            kind, payload = events.get()
+            if kind == "delta" and first_token_at is None:
+                first_token_at = time.time()
+                print(f"⚡ First visible token after {first_token_at - start_time:.2f} seconds")
+            if kind != "delta":
+                self.streams += 1
+                self.stream_total_seconds += time.time() - start_time
+                if first_token_at is not None:
+                    self.streams_with_text += 1
+                    self.stream_first_token_seconds += first_token_at - start_time
+            yield kind, payload
+            if kind != "delta":
+                return
+
+# --- Shared RAG resources ---
+
+DEFAULT_VECTORSTORE_PATH = "faiss_index_cybersecurity_navigator"
+
+# Read-only vectorstores (embedding model + FAISS index + docstore) keyed by absolute path.
+# Filled by preload_shared_resources() in the gunicorn master so that forked workers
+# share the pages copy-on-write instead of each loading a private copy.
+_shared_vectorstores: Dict[str, Any] = {}
+
+
+def preload_shared_resources(vectorstore_path: str = DEFAULT_VECTORSTORE_PATH):
+    """
+    Load the read-only RAG resources once, before gunicorn forks its workers.
+    No inference is run here: torch/OpenMP thread pools must not be started
+    in the master, the workers warm them up after fork.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    vectorstore_path_abs = os.path.join(base_dir, os.path.basename(vectorstore_path))
+    if vectorstore_path_abs in _shared_vectorstores:
+        return _shared_vectorstores[vectorstore_path_abs]
+
+    start_time = time.time()
+    vectorstore = load_vectorstore(vectorstore_path_abs, create_embeddings())
+    _shared_vectorstores[vectorstore_path_abs] = vectorstore
+
+    # Move everything loaded so far into the permanent GC generation so the
+    # collector in the workers does not write to (and un-share) these pages
+    import gc
+    gc.collect()
+    gc.freeze()
+
+    print(f"📦 Preloaded shared embeddings and FAISS index in {time.time() - start_time:.2f}s")
+    return vectorstore
+
+
+def reinitialize_after_fork(torch_threads: Optional[int] = None):
+    """
+    Reset per-process state in a freshly forked worker.
+    The ChatGroq client is created per worker by create_tutor_system(), so only
+    the torch intra-op thread pool needs to be configured here.
+    """
+    if torch_threads is None:
+        torch_threads = int(os.getenv("CJ_TORCH_THREADS", "1"))
+    # Only touch torch if it is already loaded (the ONNX backend never imports it)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(torch_threads)
+
+
 def create_tutor_system():
     """Factory function to create the CJ-Mentor Advanced Scaffolding Learning System"""
     groq_api_key = os.getenv("GROQ_API_KEY")
@@ -635,6 +931,6 @@ def create_tutor_system():
         raise ValueError("GROQ_API_KEY not set in environment variables")
 
     knowledge_file = './knowledge.txt'
-    vectorstore_path = "faiss_index_cybersecurity_navigator"
+    vectorstore_path = DEFAULT_VECTORSTORE_PATH
 
     return CyberJusticeMultiAgentTutor(groq_api_key, knowledge_file, vectorstore_path)
\ No newline at end of file
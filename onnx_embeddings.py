@@ -0,0 +1,165 @@
+"""
+int8 ONNX backend for the all-MiniLM-L6-v2 query encoder.
+
+Runs an exported, dynamically quantized MiniLM with onnxruntime and the Rust
+`tokenizers` package, so the web workers do not need to import torch at all.
+Vectors use the same mean pooling + L2 normalization as sentence-transformers,
+so they are compatible with the existing navigator index.
+
+Usage:
+    # One-off export (needs torch, transformers and onnx; run on a dev machine)
+    python onnx_embeddings.py export [--out models/all-MiniLM-L6-v2-onnx]
+
+    # Cosine similarity of ONNX vectors vs the torch vectors stored in index.faiss
+    python onnx_embeddings.py parity [--vectorstore faiss_index_cybersecurity_navigator]
+"""
+
+import os
+import argparse
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ONNX_MODEL_DIR = os.path.join(BASE_DIR, "models", "all-MiniLM-L6-v2-onnx")
+ONNX_MODEL_FILE_NAME = "model_int8.onnx"
+TOKENIZER_FILE_NAME = "tokenizer.json"
+
+# sentence-transformers truncates all-MiniLM-L6-v2 inputs at 256 word pieces
+MAX_SEQ_LENGTH = 256
+ONNX_THREADS = int(os.getenv("CJ_ONNX_THREADS", "1"))
+
+
+def has_onnx_model(model_dir: str = DEFAULT_ONNX_MODEL_DIR) -> bool:
+    return (os.path.exists(os.path.join(model_dir, ONNX_MODEL_FILE_NAME))
+            and os.path.exists(os.path.join(model_dir, TOKENIZER_FILE_NAME)))
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    """LangChain Embeddings running the int8 MiniLM export on onnxruntime (CPU)"""
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_MODEL_DIR, threads: int = ONNX_THREADS, batch_size: int = 32):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE_NAME))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE_NAME),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalization (same as sentence-transformers)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into a float32 (n, 384) array"""
+        if not texts:
+            return np.zeros((0, 384), dtype=np.float32)
+        batches = [self._encode_batch(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return np.vstack(batches).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+
+def export_onnx_model(out_dir: str = DEFAULT_ONNX_MODEL_DIR):
+    """Export all-MiniLM-L6-v2 to ONNX and quantize the weights to int8"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from tutor_embeddings import EMBEDDING_MODEL_NAME
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+    model = AutoModel.from_pretrained(EMBEDDING_MODEL_NAME).eval()
+
+    fp32_path = os.path.join(out_dir, "model_fp32.onnx")
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    # Positional order of BertModel.forward()
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            args=tuple(sample[name] for name in input_names),
+            f=fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17
+        )
+
+    quantize_dynamic(fp32_path, os.path.join(out_dir, ONNX_MODEL_FILE_NAME), weight_type=QuantType.QInt8)
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, TOKENIZER_FILE_NAME))
+    os.remove(fp32_path)
+    print(f"✅ Exported int8 ONNX MiniLM to {out_dir}")
+
+
+def parity_check(vectorstore_path: str, model_dir: str = DEFAULT_ONNX_MODEL_DIR, limit: int = 0):
+    """
+    Compare ONNX vectors of the indexed chunks with the torch vectors stored in
+    the flat index (both are unit length, so the dot product is the cosine).
+    """
+    import faiss
+    from chunk_store import ChunkStore, chunk_store_path
+
+    store = ChunkStore(chunk_store_path(vectorstore_path))
+    index = faiss.read_index(os.path.join(vectorstore_path, "index.faiss"))
+    chunk_ids = [int(chunk_id) for chunk_id in store.ids[:limit or len(store)]]
+
+    embeddings = OnnxMiniLMEmbeddings(model_dir, threads=os.cpu_count() or 1)
+    onnx_vectors = embeddings.embed_array([store.text(chunk_id) for chunk_id in chunk_ids])
+    torch_vectors = np.vstack([index.reconstruct(chunk_id) for chunk_id in chunk_ids])
+
+    cosines = (onnx_vectors * torch_vectors).sum(axis=1)
+    print(f"🔬 ONNX int8 vs torch parity on {len(chunk_ids)} indexed chunks")
+    print(f"   mean cosine: {cosines.mean():.4f}")
+    print(f"   min cosine:  {cosines.min():.4f}")
+    print(f"   p1 cosine:   {np.percentile(cosines, 1):.4f}")
+    print(f"   >= 0.99:     {(cosines >= 0.99).mean() * 100:.1f}%")
+    return cosines
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="int8 ONNX MiniLM backend")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export and quantize the model")
+    export_parser.add_argument("--out", default=DEFAULT_ONNX_MODEL_DIR)
+
+    parity_parser = subparsers.add_parser("parity", help="Cosine parity against the indexed torch vectors")
+    parity_parser.add_argument("--vectorstore", default=os.path.join(BASE_DIR, "faiss_index_cybersecurity_navigator"))
+    parity_parser.add_argument("--model-dir", default=DEFAULT_ONNX_MODEL_DIR)
+    parity_parser.add_argument("--limit", type=int, default=0, help="Only check the first N chunks")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_onnx_model(args.out)
+    else:
+        parity_check(args.vectorstore, args.model_dir, args.limit)
@@ -0,0 +1,112 @@
+"""
+Plan-step document prefetching for CJ-Mentor sessions.
+
+Once a learning plan exists, the topics of the next turns are known. After each
+turn the PlanPrefetcher retrieves the chunks for the current and next plan steps
+in a background thread and pins them on the session's ConversationContext.
+When the student is answering the tutor's question, generate_response uses the
+pinned chunks and skips embedding and search entirely: the step's query vector
+is stored with the pins for context compression, and the compressor's sentence
+vectors of the pinned chunks are computed during the prefetch.
+
+Pins belong to one plan and one index version: a new plan, or a rebuilt index,
+starts from an empty set of pins.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+PLAN_PREFETCH_ENABLED = os.getenv("CJ_PLAN_PREFETCH", "1").lower() not in ("0", "false", "no")
+# How many plan steps to keep pinned, starting with the current one
+PREFETCH_STEPS = int(os.getenv("CJ_PREFETCH_STEPS", "2"))
+
+
+class PlanPrefetcher:
+    """Retrieves and pins chunks for upcoming plan steps, off the request path"""
+
+    def __init__(self, retriever, steps: int = PREFETCH_STEPS, compressor=None):
+        self.retriever = retriever
+        self.steps = steps
+        self.compressor = compressor
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plan-prefetch")
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self.prefetched = 0
+        self.failures = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _current_pins(self, context) -> Optional[Dict[str, Any]]:
+        pins = getattr(context, "pinned_chunks", None)
+        if (not pins or not context.learning_plan or pins["plan"] != tuple(context.learning_plan)
+                or pins["index_version"] != self.retriever.index_version):
+            return None
+        return pins
+
+    def schedule(self, context):
+        """Queue retrieval for the current and next plan steps that are not pinned yet"""
+        if not context.learning_plan:
+            context.pinned_chunks = None
+            return
+
+        pins = self._current_pins(context)
+        if pins is None:
+            pins = {"plan": tuple(context.learning_plan), "index_version": self.retriever.index_version, "steps": {}}
+            context.pinned_chunks = pins
+
+        first_step = context.current_plan_step
+        # _prefetch fills pins["steps"] from the executor thread
+        with self._lock:
+            for step in [step for step in list(pins["steps"]) if step < first_step]:
+                pins["steps"].pop(step, None)
+
+        for step in range(first_step, min(len(context.learning_plan), first_step + self.steps)):
+            key = (id(pins), step)
+            with self._lock:
+                if step in pins["steps"] or key in self._in_flight:
+                    continue
+                self._in_flight.add(key)
+            self.executor.submit(self._prefetch, pins, step, str(context.learning_plan[step]), key)
+
+    def _prefetch(self, pins: Dict[str, Any], step: int, step_text: str, key):
+        try:
+            docs = self.retriever.retrieve(step_text)
+            query_vectors = self.retriever.embed_queries([step_text])
+            if self.compressor is not None:
+                # Warm the sentence cache so compressing the pinned chunks embeds nothing
+                self.compressor.chunk_sentences([doc.page_content.strip() for doc in docs])
+            with self._lock:
+                pins["steps"][step] = {"docs": docs, "query_vectors": query_vectors}
+            self.prefetched += 1
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠️ Plan step prefetch failed (step {step + 1}): {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def pinned(self, context) -> Optional[Dict[str, Any]]:
+        """
+        {"docs": Documents, "query_vectors": step query vectors} pinned for the
+        session's current plan step, or None if not (yet) available
+        """
+        pins = self._current_pins(context)
+        with self._lock:
+            pinned = pins["steps"].get(context.current_plan_step) if pins else None
+        if pinned is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pinned
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'prefetched_steps': self.prefetched,
+            'failures': self.failures,
+            'pinned_hits': self.hits,
+            'pinned_misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,251 @@
+"""
+Prompt assembly for the CJ-Mentor tutor turn.
+
+The instructions, the output format and the worked example never change
+between turns. PromptBuilder renders them once, at startup, into a
+byte-identical system message. Everything that does change (profile guidance,
+scaffolding approach, conversation state, retrieved knowledge, the student's
+input) goes into a second message after it. Providers
+that cache prompt prefixes can then reuse the system message on every request.
+
+Each dynamic section has a token budget and is cut at a word boundary when it
+goes over. Every build logs the estimated tokens of the static prefix and of
+each dynamic section.
+
+CJ_RESPONSE_SCHEMA selects the output format the prefix asks for. "full" (the
+default) is the original schema that re-sends the whole plan every turn. "lean"
+caps internal_thought and expresses plan changes as a delta (advance / stay /
+replace, applied by _update_context). Output token caps per scaffolding level
+are only sent when CJ_MAX_TOKENS_* are configured.
+
+CJ_PROMPT_MODE=legacy sends the original single-string layout, with the
+dynamic fields ahead of the instructions (for comparison and rollback). It is
+assembled from the same constants, so a prompt edit is made in one place.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from retrieval import estimate_tokens
+
+PROMPT_MODE = os.getenv("CJ_PROMPT_MODE", "prefix").lower()
+# Per-section token budgets of the dynamic part of the prompt
+SECTION_BUDGETS = {
+    "student_input": int(os.getenv("CJ_PROMPT_INPUT_TOKENS", "300")),
+    "previous_question": int(os.getenv("CJ_PROMPT_QUESTION_TOKENS", "120")),
+    "learning_plan": int(os.getenv("CJ_PROMPT_PLAN_TOKENS", "250")),
+    "knowledge": int(os.getenv("CJ_PROMPT_KNOWLEDGE_TOKENS", "400")),
+}
+
+# "full": the original schema that re-sends the whole plan every turn;
+# "lean" (opt-in): short internal_thought, plan deltas (advance/stay/replace)
+RESPONSE_SCHEMA = os.getenv("CJ_RESPONSE_SCHEMA", "full").lower()
+# Optional output token caps per scaffolding level, 0 = provider default. They include the
+# reasoning tokens of reasoning models; measure with `benchmark_rag.py schema --caps` first
+MAX_TOKENS_BY_LEVEL = {
+    "high_support": int(os.getenv("CJ_MAX_TOKENS_HIGH_SUPPORT", "0")),
+    "guided_support": int(os.getenv("CJ_MAX_TOKENS_GUIDED_SUPPORT", "0")),
+    "low_support": int(os.getenv("CJ_MAX_TOKENS_LOW_SUPPORT", "0")),
+}
+ADVANCE_HINTS = {"full": "increment plan_step", "lean": 'plan_update action "advance"'}
+
+Prompt = Union[str, List[BaseMessage]]
+
+
+def truncate_to_tokens(text: str, budget: int) -> Tuple[str, bool]:
+    """text cut at a word boundary to about budget estimated tokens, and whether it was cut"""
+    if not budget or estimate_tokens(text) <= budget:
+        return text, False
+    return text[:budget * 4].rsplit(" ", 1)[0] + " …", True
+
+
+def _dedent(text: str) -> str:
+    return "\n".join(line.strip() for line in text.strip().splitlines())
+
+
+STATIC_INSTRUCTIONS = """You are CJ-Mentor, an expert AI tutor with strategic planning abilities. Your goal is to guide the student through a logical learning path, not just answer questions reactively.
+
+**YOUR TASK: Follow the THINK, PLAN, ACT cycle.**
+
+**1. THINK (Internal Assessment & Strategy):**
+   - **Topic Analysis:** Is this a new topic, continuation of current topic, or student answering my question?
+   - **Student Assessment:** How well did they understand? Are they ready for next step or need more support?
+   - **Plan Status:** Should I create new plan, advance current plan, stay on current step, or adapt plan?
+   - **Plan Completion Check:** If plan_just_completed is True, congratulate completion and ask what they'd like to learn next
+   - **Learning Goal:** What specific learning outcome should this interaction achieve?
+
+**2. PLAN (Strategic Learning Path):**
+   - **If plan_just_completed is True:** Acknowledge the completion and ask student what new topic they'd like to explore
+   - **If no plan exists OR topic completely changed:** Create a new 4-6 step learning plan that progresses logically from basic understanding to practical application
+   - **If plan exists and student succeeded:** Advance to next step ({advance_hint})
+   - **If plan exists but student needs help:** Stay on current step, provide more scaffolding
+   - **If student asks great unexpected question:** Adapt plan or temporarily deviate then return
+
+**3. ACT (Execute Current Plan Step):**
+   - Craft response that directly implements the current plan step
+   - Provide appropriate scaffolding level for current step
+   - Always end with clear question/challenge aligned with current step
+   - Be encouraging and build on student's progress"""
+
+FULL_OUTPUT_FORMAT = """**OUTPUT FORMAT - RESPOND WITH JSON:**
+{
+  "internal_thought": "Your step-by-step thinking process: topic analysis, student assessment, plan decision, and response strategy",
+  "updated_plan": {
+    "plan": ["Step 1 description", "Step 2 description", "Step 3 description", "Step 4 description"],
+    "plan_step": 0,
+    "plan_adaptation": "Explanation of any plan changes or why staying on current step"
+  },
+  "scaffolding_adjustment": {
+    "new_scaffolding_level": "HIGH_SUPPORT" | "GUIDED_SUPPORT" | "LOW_SUPPORT",
+    "reasoning": "Why this scaffolding level is appropriate for current step"
+  },
+  "response_to_student": "Your natural, encouraging response that executes the current plan step and ends with a guiding question"
+}
+
+**EXAMPLE SUCCESSFUL CYCLE:**
+
+Student: "I want to learn about phishing"
+Internal Thought: "New topic detected. Student wants to learn phishing. I need to create a comprehensive 4-step plan starting with basic definition and building to practical prevention. This is step 1."
+Updated Plan: {"plan": ["Basic definition and recognition", "Analyze phishing email examples", "Understand attack consequences", "Learn prevention strategies"], "plan_step": 0}
+Response: "Phishing is a crucial cybersecurity topic! Let's build your expertise step by step. To start our learning journey, how would you describe what phishing is in your own words? Don't worry if you're not sure - we'll build from whatever understanding you have."
+"""
+
+LEAN_OUTPUT_FORMAT = """**OUTPUT FORMAT - RESPOND WITH COMPACT JSON:**
+{
+  "internal_thought": "Optional. At most 25 words: your assessment and plan decision",
+  "plan_update": {"action": "advance" | "stay" | "replace", "plan": ["Step 1 description", "Step 2 description", "Step 3 description", "Step 4 description"], "reason": "Optional. A few words"},
+  "new_scaffolding_level": "HIGH_SUPPORT" | "GUIDED_SUPPORT" | "LOW_SUPPORT",
+  "response_to_student": "Your natural, encouraging response that executes the current plan step and ends with a guiding question"
+}
+
+**PLAN UPDATE ACTIONS:**
+- "advance": the student completed the current step, move on to the next one
+- "stay": remain on the current step
+- "replace": a new plan is needed (no plan exists, or the topic completely changed). Only "replace" includes "plan"; the new plan starts at its first step.
+Never repeat an unchanged plan.
+
+**EXAMPLE SUCCESSFUL CYCLE:**
+
+Student: "I want to learn about phishing"
+{"internal_thought": "New topic, no plan yet: 4-step phishing plan, start with the definition.", "plan_update": {"action": "replace", "plan": ["Basic definition and recognition", "Analyze phishing email examples", "Understand attack consequences", "Learn prevention strategies"]}, "new_scaffolding_level": "HIGH_SUPPORT", "response_to_student": "Phishing is a crucial cybersecurity topic! Let's build your expertise step by step. To start our learning journey, how would you describe what phishing is in your own words? Don't worry if you're not sure - we'll build from whatever understanding you have."}"""
+
+
+PROMPT_HANDOFF = "The next message holds the student's profile and scaffolding approach, the conversation state, the relevant knowledge base and the student's latest input."
+
+DYNAMIC_TEMPLATE = """**STUDENT PROFILE:**
+- User Type: {user_type}
+- Profile Guidance: {profile_guidance}
+- Current Scaffolding Level: {scaffolding_level}
+
+**SCAFFOLDING APPROACH FOR CURRENT LEVEL:**
+{scaffolding_approach}
+
+**CONVERSATION CONTEXT:**
+- Current Topic: {current_topic}
+- Learning Objective: {learning_objective}
+- Previous Tutor Question: "{previous_question}"
+- **Current Learning Plan:** {learning_plan}
+- **Current Plan Step:** {plan_step}
+- **Total Plan Steps:** {total_steps}
+- **Plan Just Completed:** {plan_just_completed}
+
+**RELEVANT KNOWLEDGE BASE:**
+---
+{knowledge}
+---
+
+**STUDENT'S LATEST INPUT:** "{student_input}"
+
+Now, analyze the current situation and generate your strategic CJ-Mentor response:"""
+
+
+def legacy_prompt(dynamic_text: str) -> str:
+    """The original single-string layout (CJ_PROMPT_MODE=legacy): the turn's fields ahead of the
+    instructions, assembled from the same text as the static prefix"""
+    intro, instructions = STATIC_INSTRUCTIONS.replace("{advance_hint}", ADVANCE_HINTS["full"]).split("\n\n", 1)
+    fields, closing = dynamic_text.rsplit("\n\n", 1)
+    return "\n\n".join([intro, fields, instructions, FULL_OUTPUT_FORMAT.strip(), closing])
+
+
+class PromptBuilder:
+    """Static system prefix rendered once + budgeted dynamic message per turn"""
+
+    def __init__(self, profile_instructions: Dict[str, str], scaffolding_approaches: Dict[str, str],
+                 mode: str = PROMPT_MODE, budgets: Dict[str, int] = None, schema: str = RESPONSE_SCHEMA):
+        self.profile_instructions = profile_instructions
+        self.scaffolding_approaches = scaffolding_approaches
+        self.mode = mode if mode in ("prefix", "legacy") else "prefix"
+        self.budgets = dict(SECTION_BUDGETS if budgets is None else budgets)
+        # The legacy prompt only knows the full schema
+        self.schema = "lean" if schema == "lean" and self.mode != "legacy" else "full"
+        self.static_prefix = "\n\n".join([
+            STATIC_INSTRUCTIONS.replace("{advance_hint}", ADVANCE_HINTS[self.schema]),
+            (LEAN_OUTPUT_FORMAT if self.schema == "lean" else FULL_OUTPUT_FORMAT).strip(),
+            PROMPT_HANDOFF
+        ])
+        self.static_tokens = estimate_tokens(self.static_prefix)
+        self.builds = 0
+        self.dynamic_tokens = 0
+        self.truncations: Dict[str, int] = {name: 0 for name in self.budgets}
+
+    def _section(self, name: str, text: str, sizes: Dict[str, int]) -> str:
+        # The legacy prompt never cut its sections
+        text, truncated = truncate_to_tokens(text, self.budgets.get(name, 0) if self.mode != "legacy" else 0)
+        if truncated:
+            self.truncations[name] = self.truncations.get(name, 0) + 1
+        sizes[name] = estimate_tokens(text)
+        return text
+
+    def dynamic_message(self, user_input: str, context: Any, course_content: str) -> Tuple[str, Dict[str, int]]:
+        """The per-turn part of the prompt and the estimated tokens of each budgeted section"""
+        sizes: Dict[str, int] = {}
+        plan = context.learning_plan
+        plan_text = ("\n" + "\n".join(f"  {position + 1}. {step}" for position, step in enumerate(plan))
+                     if plan else "None. A new plan needs to be created.")
+        text = DYNAMIC_TEMPLATE.format(
+            user_type=context.user_profile.value,
+            profile_guidance=" ".join(self.profile_instructions.get(context.user_profile.value, "").split()),
+            scaffolding_level=context.scaffolding_level.value,
+            scaffolding_approach=_dedent(self.scaffolding_approaches.get(context.scaffolding_level.value, "")),
+            current_topic=context.current_topic or "Not set",
+            learning_objective=context.learning_objective or "To be determined",
+            previous_question=self._section("previous_question", context.last_question or "None", sizes),
+            learning_plan=self._section("learning_plan", plan_text, sizes),
+            plan_step=context.current_plan_step + 1 if plan else "No plan exists",
+            total_steps=len(plan) if plan else 0,
+            plan_just_completed=context.plan_just_completed,
+            knowledge=self._section("knowledge", course_content, sizes),
+            student_input=self._section("student_input", user_input, sizes),
+        )
+        return text, sizes
+
+    def build(self, user_input: str, context: Any, course_content: str) -> Prompt:
+        """Messages for llm.invoke / llm.stream (a single string in legacy mode)"""
+        if self.mode == "legacy":
+            prompt = legacy_prompt(self.dynamic_message(user_input, context, course_content)[0])
+            print(f"🧾 Prompt tokens (legacy): {estimate_tokens(prompt)}")
+            return prompt
+
+        text, sizes = self.dynamic_message(user_input, context, course_content)
+        dynamic_tokens = estimate_tokens(text)
+        self.builds += 1
+        self.dynamic_tokens += dynamic_tokens
+        print(f"🧾 Prompt tokens: {self.static_tokens} static prefix + {dynamic_tokens} dynamic "
+              f"({', '.join(f'{name} {tokens}' for name, tokens in sizes.items())})")
+        return [SystemMessage(content=self.static_prefix), HumanMessage(content=text)]
+
+    def max_tokens(self, scaffolding_level: str) -> Optional[int]:
+        """Configured output token cap for a turn at this scaffolding level (None: provider default)"""
+        return MAX_TOKENS_BY_LEVEL.get(scaffolding_level) or None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'response_schema': self.schema,
+            'static_prefix_tokens': self.static_tokens,
+            'builds': self.builds,
+            'avg_dynamic_tokens': round(self.dynamic_tokens / self.builds, 1) if self.builds else 0.0,
+            'truncations': dict(self.truncations)
+        }
@@ -0,0 +1,493 @@
+"""
+Retriever for the CJ-Mentor navigator index.
+
+NavigatorRetriever is a drop-in replacement for vectorstore.as_retriever():
+invoke(query) returns LangChain Documents. It searches the FAISS index directly
+so results can be cached as (chunk_id, score) pairs, and it notices when a
+rebuilt index is deployed: the index files are re-checked at most every
+CJ_INDEX_CHECK_INTERVAL seconds, and on a change the index is reloaded and every
+cached result of the old version is dropped.
+
+retrieve(query) adds the selection stage used for the tutor prompt: candidates
+below a similarity floor are cut, the rest are re-ranked with maximal marginal
+relevance so overlapping chunks do not crowd each other out, and
+build_course_content() packs the survivors into a hard character budget.
+When a BM25 index was built next to the FAISS index, dense and lexical rankings
+are fused with reciprocal rank fusion, and short keyword queries with a strong
+lexical match skip the embedding entirely.
+
+expand(seed_chunk_ids) serves follow-up turns without a FAISS search: it walks
+the precomputed chunk kNN graph (chunk_graph.py) from the previous turn's
+chunks, and gives up (None) when the student's input points elsewhere.
+"""
+
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from bm25_index import BM25Index, bm25_path, has_bm25_index, tokenize
+from chunk_graph import ChunkGraph, graph_path, has_chunk_graph
+from embedding_cache import normalize_query
+from retrieval_cache import (
+    RESULT_CACHE_ENABLED, RetrievalResultCache, RankedChunks, index_signature, index_version
+)
+
+INDEX_CHECK_INTERVAL = float(os.getenv("CJ_INDEX_CHECK_INTERVAL", "30"))
+
+# Selection stage for the tutor prompt
+RETRIEVAL_MMR_ENABLED = os.getenv("CJ_RETRIEVAL_MMR", "1").lower() not in ("0", "false", "no")
+MMR_LAMBDA = float(os.getenv("CJ_MMR_LAMBDA", "0.7"))
+# Candidates at least this similar to an already picked chunk are duplicates and never picked
+DUPLICATE_SIMILARITY = float(os.getenv("CJ_DUPLICATE_SIMILARITY", "0.98"))
+FETCH_K = int(os.getenv("CJ_FETCH_K", "10"))
+MAX_CHUNKS = int(os.getenv("CJ_MAX_CHUNKS", "3"))
+MIN_SIMILARITY = float(os.getenv("CJ_MIN_SIMILARITY", "0.3"))
+MAX_SIMILARITY_GAP = float(os.getenv("CJ_MAX_SIMILARITY_GAP", "0.2"))
+# 0 disables the budget
+CONTEXT_CHAR_BUDGET = int(os.getenv("CJ_CONTEXT_CHAR_BUDGET", "1500"))
+
+# Search the raw input, the current plan step and the previous tutor question as separate sub-queries
+MULTI_QUERY_ENABLED = os.getenv("CJ_MULTI_QUERY", "1").lower() not in ("0", "false", "no")
+
+# Hybrid BM25 + dense retrieval (active when the index folder has a bm25/ directory)
+HYBRID_ENABLED = os.getenv("CJ_HYBRID", "1").lower() not in ("0", "false", "no")
+RRF_K = int(os.getenv("CJ_RRF_K", "60"))
+LEXICAL_MIN_RATIO = float(os.getenv("CJ_LEXICAL_MIN_RATIO", "0.5"))
+LEXICAL_FASTPATH_MAX_TERMS = int(os.getenv("CJ_LEXICAL_FASTPATH_MAX_TERMS", "3"))
+LEXICAL_FASTPATH_MIN_IDF = float(os.getenv("CJ_LEXICAL_FASTPATH_MIN_IDF", "2.5"))
+
+# Follow-up turns: expand from the previous turn's chunks through the kNN graph
+CHUNK_GRAPH_ENABLED = os.getenv("CJ_CHUNK_GRAPH", "1").lower() not in ("0", "false", "no")
+GRAPH_EXPAND_K = int(os.getenv("CJ_GRAPH_EXPAND_K", "8"))
+# Expand only when the new input stays this close (cosine) to the centroid of the previous chunks
+GRAPH_MIN_CENTROID_SIMILARITY = float(os.getenv("CJ_GRAPH_MIN_CENTROID_SIMILARITY", "0.3"))
+
+
+def load_lexical_index(vectorstore_path: str) -> Optional[BM25Index]:
+    """BM25 index of a vectorstore, or None when hybrid retrieval is off or not built"""
+    if not HYBRID_ENABLED or not has_bm25_index(vectorstore_path):
+        return None
+    try:
+        return BM25Index(bm25_path(vectorstore_path))
+    except (OSError, ValueError) as e:
+        print(f"⚠️ BM25 index not loaded, using dense retrieval only: {e}")
+        return None
+
+
+def load_chunk_graph(vectorstore_path: str) -> Optional[ChunkGraph]:
+    """The kNN graph built next to the index, or None (graph expansion disabled)"""
+    if not CHUNK_GRAPH_ENABLED or not has_chunk_graph(vectorstore_path):
+        return None
+    try:
+        return ChunkGraph(graph_path(vectorstore_path))
+    except (OSError, ValueError) as e:
+        print(f"⚠️ kNN graph not loaded, follow-up turns use full search: {e}")
+        return None
+
+
+def check_index_matches_docstore(vectorstore):
+    """Raise ValueError unless every id the FAISS index can return has a docstore entry"""
+    import faiss
+
+    index = vectorstore.index
+    ids = (faiss.vector_to_array(index.id_map) if hasattr(index, "id_map")
+           else np.arange(index.ntotal, dtype=np.int64))
+    docstore = vectorstore.docstore
+    if hasattr(docstore, "ids"):
+        missing = int(np.count_nonzero(~np.isin(ids, np.asarray(docstore.ids))))
+    else:
+        mapping = vectorstore.index_to_docstore_id
+        missing = sum(1 for chunk_id in ids.tolist() if chunk_id not in mapping)
+    if missing:
+        raise ValueError(f"{missing} of {len(ids)} index ids have no chunk in the docstore (index files mid-update?)")
+
+
+def merge_ranked(rankings: List[RankedChunks]) -> RankedChunks:
+    """Merge rankings of several sub-queries: best (smallest) distance per chunk, closest first"""
+    best: Dict[int, float] = {}
+    for ranked in rankings:
+        for chunk_id, score in ranked:
+            if chunk_id not in best or score < best[chunk_id]:
+                best[chunk_id] = score
+    return tuple(sorted(best.items(), key=lambda item: item[1]))
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = RRF_K) -> Dict[int, float]:
+    """RRF score per chunk id: sum of 1 / (k + rank) over the rankings it appears in"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return fused
+
+
+def l2_to_similarity(scores: np.ndarray) -> np.ndarray:
+    """Cosine similarity from squared L2 distances between unit vectors"""
+    return 1.0 - np.asarray(scores, dtype=np.float32) / 2.0
+
+
+def adaptive_cutoff(similarities: np.ndarray, min_similarity: float = MIN_SIMILARITY,
+                    max_gap: float = MAX_SIMILARITY_GAP) -> np.ndarray:
+    """Positions worth keeping: above the floor and close enough to the best hit (the best is always kept)"""
+    if len(similarities) == 0:
+        return np.zeros(0, dtype=np.int64)
+    threshold = max(min_similarity, float(similarities.max()) - max_gap)
+    keep = np.flatnonzero(similarities >= threshold)
+    return keep if len(keep) else np.asarray([int(np.argmax(similarities))])
+
+
+def mmr_select(relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_mult: float = MMR_LAMBDA,
+               duplicate_similarity: float = DUPLICATE_SIMILARITY) -> List[int]:
+    """
+    Maximal marginal relevance over unit vectors: greedily pick the candidate
+    maximizing lambda * relevance - (1 - lambda) * max similarity to the picks so far.
+    Near-duplicates of a pick are skipped. Returns positions into relevance/vectors in pick order.
+    """
+    n = len(relevance)
+    if n == 0 or k <= 0:
+        return []
+    pairwise = vectors @ vectors.T
+    first = int(np.argmax(relevance))
+    selected = [first]
+    available = np.ones(n, dtype=bool)
+    available[first] = False
+    redundancy = pairwise[first].copy()
+    available &= redundancy < duplicate_similarity
+    while len(selected) < k and available.any():
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+        available &= redundancy < duplicate_similarity
+    return selected
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about 4 characters per token for English prose)"""
+    return (len(text) + 3) // 4
+
+
+def build_course_content(docs: List[Document], char_budget: int = CONTEXT_CHAR_BUDGET,
+                         separator: str = "\n\n") -> str:
+    """Join chunk texts in order until the character budget is used up"""
+    parts: List[str] = []
+    used = 0
+    for doc in docs:
+        text = doc.page_content.strip()
+        cost = len(text) + (len(separator) if parts else 0)
+        if char_budget and used + cost > char_budget:
+            if not parts:
+                # Never send an empty knowledge base: cut the best chunk at a word boundary
+                text = text[:char_budget].rsplit(" ", 1)[0]
+                parts.append(text)
+            break
+        parts.append(text)
+        used += cost
+    return separator.join(parts)
+
+
+class NavigatorRetriever:
+    """Search the navigator index with a versioned result cache in front of it"""
+
+    def __init__(self, vectorstore, vectorstore_path: str, k: int = 5,
+                 loader: Optional[Callable[[Any], Any]] = None,
+                 result_cache: Optional[RetrievalResultCache] = None, use_result_cache: Optional[bool] = None):
+        self.vectorstore = vectorstore
+        self.vectorstore_path = vectorstore_path
+        self.k = k
+        self.loader = loader
+        if use_result_cache is None:
+            use_result_cache = RESULT_CACHE_ENABLED
+        if result_cache is None and use_result_cache:
+            result_cache = RetrievalResultCache()
+        self.result_cache = result_cache
+        self.lexical = load_lexical_index(vectorstore_path)
+        self.graph = load_chunk_graph(vectorstore_path)
+        # Set by the tutor when cross-request batching is enabled (see retrieval_batcher.py)
+        self.batcher = None
+        self.selections = 0
+        self.selected_chunks = 0
+        self.lexical_fast_paths = 0
+        self.hybrid_searches = 0
+        self.multi_query_searches = 0
+        self.graph_expansions = 0
+        self.graph_fallbacks = 0
+
+        self._reload_lock = threading.Lock()
+        self._signature = index_signature(vectorstore_path)
+        self.index_version = index_version(vectorstore_path)
+        self._next_check = time.monotonic() + INDEX_CHECK_INTERVAL
+        print(f"🔖 Navigator index version {self.index_version}")
+
+    # --- Index version tracking ---
+
+    def _check_index_version(self):
+        """Reload the index (and invalidate cached results) if its files changed"""
+        if self.loader is None or time.monotonic() < self._next_check:
+            return
+        with self._reload_lock:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + INDEX_CHECK_INTERVAL
+            try:
+                signature = index_signature(self.vectorstore_path)
+                if signature == self._signature:
+                    return
+                version = index_version(self.vectorstore_path)
+                if version != self.index_version:
+                    print(f"🔄 Navigator index changed ({self.index_version} -> {version}), reloading")
+                    vectorstore = self.loader(self.vectorstore.embeddings)
+                    # Fail closed: an index and docstore from different ingest runs are not swapped in
+                    # (the signature stays old, so the next check tries again)
+                    check_index_matches_docstore(vectorstore)
+                    self.vectorstore = vectorstore
+                    self.lexical = load_lexical_index(self.vectorstore_path)
+                    self.graph = load_chunk_graph(self.vectorstore_path)
+                    self.index_version = version
+                    if self.result_cache is not None:
+                        self.result_cache.invalidate(keep_version=version)
+                self._signature = signature
+            except Exception as e:
+                # A half-copied index must not take the worker down; keep serving the old one
+                print(f"⚠️ Index reload check failed, keeping version {self.index_version}: {e}")
+
+    # --- Search ---
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed several queries in one batch"""
+        embeddings = self.vectorstore.embeddings
+        if hasattr(embeddings, "embed_array"):
+            return embeddings.embed_array(queries)
+        return np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+
+    def search_many(self, queries: List[str], k: int) -> List[RankedChunks]:
+        """One embedding batch and one FAISS search for several queries (no caching)"""
+        query_vectors = np.ascontiguousarray(self.embed_queries(queries), dtype=np.float32)
+        scores, chunk_ids = self.vectorstore.index.search(query_vectors, k)
+        return [
+            tuple((int(chunk_id), float(score)) for chunk_id, score in zip(row_ids, row_scores) if chunk_id != -1)
+            for row_ids, row_scores in zip(chunk_ids, scores)
+        ]
+
+    def document(self, chunk_id: int, score: Optional[float] = None) -> Document:
+        """Document for a chunk id, with chunk_id (and score) added to its metadata"""
+        doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[chunk_id])
+        metadata = dict(doc.metadata)
+        metadata["chunk_id"] = chunk_id
+        if score is not None:
+            metadata["score"] = score
+        return Document(id=doc.id, page_content=doc.page_content, metadata=metadata)
+
+    def search_ranked_many(self, queries: List[str], k: Optional[int] = None) -> Tuple[List[RankedChunks], str]:
+        """
+        Ranked (chunk_id, score) pairs for each query. Cached queries are served
+        from the result cache; all others are embedded and searched together.
+        """
+        self._check_index_version()
+        k = k or self.k
+        version = self.index_version
+        results: List[Optional[RankedChunks]] = [None] * len(queries)
+        missing: Dict[str, List[int]] = {}
+
+        for position, query in enumerate(queries):
+            key = f"{k}:{normalize_query(query)}"
+            ranked = self.result_cache.get(version, key) if self.result_cache is not None else None
+            if ranked is not None:
+                results[position] = ranked
+            else:
+                missing.setdefault(key, []).append(position)
+
+        if missing:
+            keys = list(missing)
+            texts = [queries[missing[key][0]] for key in keys]
+            if self.batcher is not None:
+                fresh = self.batcher.search_many(texts, k)
+            else:
+                fresh = self.search_many(texts, k)
+            for key, ranked in zip(keys, fresh):
+                if self.result_cache is not None:
+                    self.result_cache.put(version, key, ranked)
+                for position in missing[key]:
+                    results[position] = ranked
+        return results, version
+
+    def search_ranked(self, query: str, k: Optional[int] = None) -> Tuple[RankedChunks, str]:
+        """Ranked (chunk_id, score) pairs for a query, served from the cache when possible"""
+        results, version = self.search_ranked_many([query], k)
+        return results[0], version
+
+    def invoke(self, query: str) -> List[Document]:
+        ranked, _ = self.search_ranked(query)
+        return [self.document(chunk_id, score) for chunk_id, score in ranked]
+
+    # --- Selection stage ---
+
+    def _candidate_vectors(self, chunk_ids: List[int]) -> Optional[np.ndarray]:
+        """Stored vectors of the candidates, or None if the index cannot reconstruct them"""
+        try:
+            vectors = self.vectorstore.index.reconstruct_batch(np.asarray(chunk_ids, dtype=np.int64))
+        except RuntimeError:
+            return None
+        # Quantized / PCA-reduced indexes reconstruct approximately; renormalize so dot products stay cosines
+        return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    def _diversify(self, chunk_ids: List[int], relevance: np.ndarray, max_chunks: int,
+                   use_mmr: bool = RETRIEVAL_MMR_ENABLED) -> List[int]:
+        """Positions of up to max_chunks candidates, MMR re-ranked when the vectors are available"""
+        vectors = self._candidate_vectors(chunk_ids) if use_mmr and len(chunk_ids) > 1 else None
+        if vectors is not None:
+            return mmr_select(relevance, vectors, max_chunks)
+        return list(np.argsort(-relevance, kind="stable")[:max_chunks])
+
+    def select(self, ranked: RankedChunks, max_chunks: int = MAX_CHUNKS,
+               use_mmr: bool = RETRIEVAL_MMR_ENABLED) -> RankedChunks:
+        """Adaptive cutoff followed by MMR re-ranking of ranked (chunk_id, score) candidates"""
+        if not ranked:
+            return ranked
+        similarities = l2_to_similarity([score for _, score in ranked])
+        keep = adaptive_cutoff(similarities)
+        order = self._diversify([ranked[i][0] for i in keep], similarities[keep], max_chunks, use_mmr)
+        return tuple(ranked[int(keep[i])] for i in order)
+
+    def _select_lexical(self, hits: List[Tuple[int, float, float]], max_chunks: int) -> List[int]:
+        """Chunk ids from BM25 hits alone (fast path): cut weak hits, then diversify"""
+        relevance = np.asarray([score for _, score, _ in hits], dtype=np.float32)
+        relevance /= relevance[0]
+        keep = np.flatnonzero(relevance >= LEXICAL_MIN_RATIO)
+        order = self._diversify([hits[i][0] for i in keep], relevance[keep], max_chunks)
+        return [hits[int(keep[i])][0] for i in order]
+
+    def _select_hybrid(self, ranked: RankedChunks, hits: List[Tuple[int, float, float]],
+                       max_chunks: int) -> List[int]:
+        """Fuse dense and BM25 rankings with RRF; keep candidates that pass either cutoff, then diversify"""
+        fused = reciprocal_rank_fusion([[chunk_id for chunk_id, _ in ranked], [chunk_id for chunk_id, _, _ in hits]])
+        keep = set()
+        if ranked:
+            similarities = l2_to_similarity([score for _, score in ranked])
+            keep.update(ranked[int(i)][0] for i in adaptive_cutoff(similarities))
+        if hits:
+            top_score = hits[0][1]
+            keep.update(chunk_id for chunk_id, score, _ in hits if score >= LEXICAL_MIN_RATIO * top_score)
+
+        candidates = sorted(keep, key=lambda chunk_id: -fused[chunk_id])
+        relevance = np.asarray([fused[chunk_id] for chunk_id in candidates], dtype=np.float32)
+        relevance /= relevance.max()
+        return [candidates[i] for i in self._diversify(candidates, relevance, max_chunks)]
+
+    def lexical_fast_path(self, keyword_query: str, k: int = FETCH_K) -> Optional[List[Tuple[int, float, float]]]:
+        """
+        BM25 hits for short, specific keyword queries ("NIST CSF", "MITM") whose
+        best hit contains every query term; None means run the dense search.
+        """
+        if self.lexical is None or len(keyword_query.split()) > LEXICAL_FASTPATH_MAX_TERMS:
+            return None
+        terms = tokenize(keyword_query)
+        if not terms or min(self.lexical.idf(term) for term in terms) < LEXICAL_FASTPATH_MIN_IDF:
+            return None
+        hits = self.lexical.search(keyword_query, k)
+        if not hits or hits[0][2] < 1.0:
+            return None
+        return hits
+
+    def retrieve(self, query: str, max_chunks: int = MAX_CHUNKS, keyword_query: Optional[str] = None,
+                 extra_queries: Optional[List[str]] = None) -> List[Document]:
+        """
+        Few, diverse, relevant chunks for the tutor prompt (fetches CJ_FETCH_K candidates).
+        keyword_query is the raw student input: it is checked for the lexical fast
+        path and is the only text BM25 scores. extra_queries (e.g. the current plan
+        step) only feed the dense search, in the same batch as query, merged by score.
+        """
+        self._check_index_version()
+        fetch_k = max(FETCH_K, max_chunks)
+        dense_scores: Dict[int, float] = {}
+        keyword_query = keyword_query or query
+
+        # A short, specific keyword input names what the student wants: BM25 alone, no embedding
+        hits = self.lexical_fast_path(keyword_query, fetch_k)
+        if hits is not None:
+            self.lexical_fast_paths += 1
+            selected = self._select_lexical(hits, max_chunks)
+        else:
+            queries = list(dict.fromkeys(q for q in [query, *(extra_queries or [])] if q and q.strip()))
+            rankings, _ = self.search_ranked_many(queries, fetch_k)
+            ranked = merge_ranked(rankings)
+            if len(queries) > 1:
+                self.multi_query_searches += 1
+            dense_scores = dict(ranked)
+            hits = self.lexical.search(keyword_query, fetch_k) if self.lexical is not None else []
+            if hits:
+                self.hybrid_searches += 1
+                selected = self._select_hybrid(ranked, hits, max_chunks)
+            else:
+                selected = [chunk_id for chunk_id, _ in self.select(ranked, max_chunks)]
+
+        self.selections += 1
+        self.selected_chunks += len(selected)
+        return [self.document(chunk_id, dense_scores.get(chunk_id)) for chunk_id in selected]
+
+    def expand(self, seed_chunk_ids: List[int], keyword_query: Optional[str] = None,
+               max_chunks: int = MAX_CHUNKS, seed_version: Optional[str] = None) -> Optional[List[Document]]:
+        """
+        New chunks for a follow-up turn: the kNN graph neighbours of the previous
+        turn's chunks, with no FAISS search. Returns None (run retrieve()) when
+        there is no graph or seeds, the seeds belong to another index version, the
+        specific terms of keyword_query match chunks outside the neighbourhood, or
+        the input's embedding is far from the centroid of the seeds (the student
+        changed topic, or the input has no content to expand from).
+        """
+        self._check_index_version()
+        if self.graph is None or not seed_chunk_ids or (seed_version and seed_version != self.index_version):
+            return None
+        candidates = self.graph.expand(seed_chunk_ids, GRAPH_EXPAND_K)
+        if not candidates or not keyword_query:
+            return None
+
+        if self.lexical is not None:
+            specific = [term for term in tokenize(keyword_query) if self.lexical.idf(term) >= LEXICAL_FASTPATH_MIN_IDF]
+            hits = self.lexical.search(" ".join(specific), FETCH_K) if specific else []
+            neighbourhood = {chunk_id for chunk_id, _ in candidates} | set(seed_chunk_ids)
+            if hits and not any(chunk_id in neighbourhood for chunk_id, _, _ in hits):
+                self.graph_fallbacks += 1
+                return None
+
+        # The query vector usually comes from the embedding cache (the intent classifier embedded it)
+        seed_vectors = self._candidate_vectors(list(dict.fromkeys(seed_chunk_ids)))
+        if seed_vectors is not None:
+            centroid = seed_vectors.mean(axis=0)
+            centroid /= max(float(np.linalg.norm(centroid)), 1e-12)
+            query_vector = np.asarray(self.embed_queries([keyword_query])[0], dtype=np.float32)
+            query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+            if float(query_vector @ centroid) < GRAPH_MIN_CENTROID_SIMILARITY:
+                self.graph_fallbacks += 1
+                return None
+
+        relevance = np.asarray([score for _, score in candidates], dtype=np.float32)
+        selected = [candidates[i][0] for i in self._diversify([chunk_id for chunk_id, _ in candidates],
+                                                              relevance, max_chunks)]
+        self.graph_expansions += 1
+        self.selections += 1
+        self.selected_chunks += len(selected)
+        return [self.document(chunk_id) for chunk_id in selected]
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {'index_version': self.index_version}
+        if self.selections:
+            stats['avg_selected_chunks'] = round(self.selected_chunks / self.selections, 2)
+        stats['lexical_index'] = self.lexical is not None
+        stats['lexical_fast_paths'] = self.lexical_fast_paths
+        stats['hybrid_searches'] = self.hybrid_searches
+        stats['multi_query_searches'] = self.multi_query_searches
+        stats['chunk_graph'] = self.graph is not None
+        stats['graph_expansions'] = self.graph_expansions
+        stats['graph_fallbacks'] = self.graph_fallbacks
+        if self.result_cache is not None:
+            stats['result_cache'] = self.result_cache.stats()
+        if self.batcher is not None:
+            stats['batcher'] = self.batcher.stats()
+        return stats
@@ -0,0 +1,101 @@
+"""
+Micro-batching of concurrent retrievals inside one worker.
+
+With gthread workers several /ask requests can be retrieving at the same time.
+Instead of each thread embedding its own query and running its own FAISS
+search, the RetrievalBatcher collects the queries that arrive within a few
+milliseconds, embeds them as one batch, runs one multi-query FAISS search and
+hands every waiting request its own slice of the result.
+"""
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List
+
+RETRIEVAL_BATCHING_ENABLED = os.getenv("CJ_RETRIEVAL_BATCHING", "1").lower() not in ("0", "false", "no")
+BATCH_MAX_DELAY_MS = float(os.getenv("CJ_BATCH_MAX_DELAY_MS", "2"))
+BATCH_MAX_SIZE = int(os.getenv("CJ_BATCH_MAX_SIZE", "16"))
+
+
+class RetrievalBatcher:
+    """Collects dense searches from concurrent threads and runs them as one embed + search"""
+
+    def __init__(self, retriever, max_batch_size: int = BATCH_MAX_SIZE, max_delay_ms: float = BATCH_MAX_DELAY_MS):
+        self.retriever = retriever
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.pending: "queue.Queue[tuple]" = queue.Queue()
+        self.batches = 0
+        self.queries = 0
+        self.largest_batch = 0
+        self._last_batch_size = 0
+        self.thread = threading.Thread(target=self._run, name="retrieval-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, query: str, k: int) -> Future:
+        future = Future()
+        self.pending.put((query, k, future))
+        return future
+
+    def search_many(self, queries: List[str], k: int) -> list:
+        """Several queries of one request, batched together (and with other requests)"""
+        futures = [self.submit(query, k) for query in queries]
+        return [future.result() for future in futures]
+
+    def _collect(self) -> list:
+        """
+        Next batch: the first waiting query plus whatever is already queued. The
+        queue delay is only spent under concurrent load (more than one query queued
+        now or in the previous batch), so a lone request is never held back.
+        """
+        batch = [self.pending.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        if len(batch) == 1 and self._last_batch_size <= 1:
+            return batch
+
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._last_batch_size = len(batch)
+
+            max_k = max(k for _, k, _ in batch)
+            try:
+                results = self.retriever.search_many([query for query, _, _ in batch], max_k)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.queries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, k, future), ranked in zip(batch, results):
+                future.set_result(ranked[:k])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'queries': self.queries,
+            'avg_batch_size': round(self.queries / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'max_batch_size': self.max_batch_size,
+            'max_delay_ms': self.max_delay * 1000
+        }
@@ -0,0 +1,110 @@
+"""
+Versioned cache of retrieval results (normalized query -> ranked chunk ids and scores).
+
+Every entry is tagged with the version of the index that produced it: a content
+hash of index.faiss and its docstore. A rebuilt index has a different version,
+so entries computed against the old one can never be returned for the new one.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from bm25_index import bm25_path, has_bm25_index
+from chunk_graph import graph_path, has_chunk_graph
+from chunk_store import chunk_store_path, has_chunk_store
+from vector_index import index_files as vector_index_files
+
+RESULT_CACHE_ENABLED = os.getenv("CJ_RESULT_CACHE", "1").lower() not in ("0", "false", "no")
+RESULT_CACHE_SIZE = int(os.getenv("CJ_RESULT_CACHE_SIZE", "1024"))
+
+# Ranked (chunk_id, score) pairs
+RankedChunks = Tuple[Tuple[int, float], ...]
+
+
+def index_files(vectorstore_path: str) -> List[str]:
+    """Files whose content defines what a search returns"""
+    files = vector_index_files(vectorstore_path)
+    if has_chunk_store(vectorstore_path):
+        store_path = chunk_store_path(vectorstore_path)
+        files.extend(os.path.join(store_path, name) for name in sorted(os.listdir(store_path)))
+    else:
+        files.append(os.path.join(vectorstore_path, "index.pkl"))
+    if has_bm25_index(vectorstore_path):
+        lexical_path = bm25_path(vectorstore_path)
+        files.extend(os.path.join(lexical_path, name) for name in sorted(os.listdir(lexical_path)))
+    if has_chunk_graph(vectorstore_path):
+        neighbour_path = graph_path(vectorstore_path)
+        files.extend(os.path.join(neighbour_path, name) for name in sorted(os.listdir(neighbour_path)))
+    return [path for path in files if os.path.isfile(path)]
+
+
+def index_signature(vectorstore_path: str) -> Tuple:
+    """Cheap change detector: (name, size, mtime) of every index file"""
+    signature = []
+    for path in index_files(vectorstore_path):
+        stat = os.stat(path)
+        signature.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def index_version(vectorstore_path: str) -> str:
+    """Content hash of the index files (first 16 hex chars of a SHA-256)"""
+    digest = hashlib.sha256()
+    for path in index_files(vectorstore_path):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class RetrievalResultCache:
+    """Thread-safe bounded LRU of ranked results, keyed by (index version, query key)"""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], RankedChunks]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, version: str, key: str) -> Optional[RankedChunks]:
+        with self._lock:
+            ranked = self._entries.get((version, key))
+            if ranked is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((version, key))
+            self.hits += 1
+            return ranked
+
+    def put(self, version: str, key: str, ranked: RankedChunks):
+        with self._lock:
+            self._entries[(version, key)] = ranked
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keep_version: Optional[str] = None):
+        """Drop every entry that was not produced by keep_version"""
+        with self._lock:
+            stale = [entry_key for entry_key in self._entries if entry_key[0] != keep_version]
+            for entry_key in stale:
+                del self._entries[entry_key]
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'invalidations': self.invalidations
+            }
@@ -7,10 +7,12 @@ import os
 os.environ['TOKENIZERS_PARALLELISM'] = 'false'  # Prevent tokenizer warnings
 os.environ['TRANSFORMERS_CACHE'] = '/tmp/transformers'  # Use tmp for cache
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import sys
 import json
+import time
+import threading
 from datetime import datetime
 
 # Add the current directory to sys.path
@@ -20,6 +22,7 @@ sys.path.append(current_dir)
 sys.path.append(parent_dir)
 
 from multi_agent_tutor import create_tutor_system
+from memory_stats import process_memory, format_memory
 
 app = Flask(__name__)
 CORS(app)
@@ -29,28 +32,139 @@ tutor_system = None
 
 from threading import Lock
 tutor_system_lock = Lock()
+warmup_start_lock = Lock()
+warmup_thread = None
+
+# Warm-up configuration. With CJ_WARMUP enabled (default) every worker builds the
+# tutor system in a background thread as soon as it starts, and requests that
+# arrive before it is ready get a 503 with a Retry-After header instead of
+# paying the cold-start cost themselves. A failed warm-up answers 500 with the
+# error and is only retried after a backoff (doubling per failure, capped).
+WARMUP_ENABLED = os.environ.get('CJ_WARMUP', '1').lower() not in ('0', 'false', 'no')
+WARMUP_RETRY_AFTER = int(os.environ.get('CJ_WARMUP_RETRY_AFTER', '10'))
+WARMUP_RETRY_BACKOFF = float(os.environ.get('CJ_WARMUP_RETRY_BACKOFF', '30'))
+WARMUP_RETRY_BACKOFF_MAX = float(os.environ.get('CJ_WARMUP_RETRY_BACKOFF_MAX', '600'))
+
+warmup_state = {
+    'status': 'not_started',  # not_started | warming_up | ready | failed
+    'pid': os.getpid(),
+    'started_at': None,
+    'ready_at': None,
+    'error': None,
+    'failures': 0,
+    'retry_at': None,
+    'timings': {}
+}
+# time.monotonic() after which a failed warm-up may be retried
+warmup_retry_at = 0.0
+
+
+class TutorSystemNotReady(Exception):
+    """Raised when a request arrives before the worker's warm-up has finished"""
+
+
+class TutorSystemFailed(TutorSystemNotReady):
+    """Raised while a failed warm-up waits for its retry backoff"""
+
+
+def warm_up_tutor_system():
+    """
+    Build the tutor system (ChatGroq client, embeddings, FAISS index) and run
+    one dummy embed and search so the worker is fully warm before serving.
+    """
+    global tutor_system, warmup_retry_at
+
+    with tutor_system_lock:
+        if tutor_system is not None:
+            return tutor_system
+
+        warmup_state.update(status='warming_up', pid=os.getpid(), started_at=datetime.now().isoformat(), error=None)
+        print(f"🔥 Warming up CJ-Mentor system in worker {os.getpid()}...")
+        try:
+            start_time = time.time()
+            system = create_tutor_system()
+            timings = {'init_seconds': round(time.time() - start_time, 4)}
+            timings.update(system.warm_up())
+            timings['total_seconds'] = round(time.time() - start_time, 4)
+
+            tutor_system = system
+            warmup_state.update(status='ready', ready_at=datetime.now().isoformat(), timings=timings)
+            print(f"✅ CJ-Mentor system ready in worker {os.getpid()} ({timings['total_seconds']:.2f}s)")
+            print(f"🧮 Worker {os.getpid()} memory: {format_memory(process_memory())}")
+        except Exception as e:
+            failures = warmup_state['failures'] + 1
+            backoff = min(WARMUP_RETRY_BACKOFF * 2 ** (failures - 1), WARMUP_RETRY_BACKOFF_MAX)
+            warmup_retry_at = time.monotonic() + backoff
+            warmup_state.update(status='failed', error=str(e), failures=failures,
+                                retry_at=datetime.fromtimestamp(time.time() + backoff).isoformat())
+            print(f"❌ Failed to warm up CJ-Mentor system (attempt {failures}, retrying in {backoff:.0f}s): {e}")
+            import traceback
+            print(f"📋 Full initialization error: {traceback.format_exc()}")
+            raise e
+    return tutor_system
+
+
+def start_background_warmup():
+    """Start the warm-up in a daemon thread (no-op if it is already running or done)"""
+    global warmup_thread
+
+    with warmup_start_lock:
+        if tutor_system is not None or (warmup_thread is not None and warmup_thread.is_alive()):
+            return warmup_thread
+
+        def warmup_wrapper():
+            try:
+                warm_up_tutor_system()
+            except Exception as e:
+                print(f"❌ Background warm-up thread failed: {e}")
+
+        # Mark the state before the thread runs so concurrent requests see it immediately
+        warmup_state.update(status='warming_up', pid=os.getpid())
+        warmup_thread = threading.Thread(target=warmup_wrapper, name='cj-mentor-warmup', daemon=True)
+        warmup_thread.start()
+    return warmup_thread
+
 
 def get_tutor_system():
     """
-    This function gets the tutor system, initializing it on the first call.
-    It uses a lock to ensure thread-safety during initialization.
+    Return the warmed-up tutor system.
+    While the worker is still warming up this raises TutorSystemNotReady (and
+    kicks off the warm-up if nothing started it yet, e.g. under a plain WSGI
+    server). After a failed warm-up it raises TutorSystemFailed until the retry
+    backoff has passed. With CJ_WARMUP disabled the system is built on the first call.
     """
-    global tutor_system
-
-    if tutor_system is None:
-        with tutor_system_lock:
-            if tutor_system is None:
-                print("🚀 First request received. Initializing CJ-Mentor system now...")
-                try:
-                    tutor_system = create_tutor_system()
-                    print("✅ CJ-Mentor system initialized successfully!")
-                    print(f"📊 Tutor system type: {type(tutor_system)}")
-                except Exception as e:
-                    print(f"❌ Failed to initialize CJ-Mentor system: {e}")
-                    import traceback
-                    print(f"📋 Full initialization error: {traceback.format_exc()}")
-                    raise e
-    return tutor_system
+    if tutor_system is not None:
+        return tutor_system
+
+    if warmup_state['status'] == 'failed' and time.monotonic() < warmup_retry_at:
+        raise TutorSystemFailed(warmup_state['error'])
+
+    if not WARMUP_ENABLED:
+        return warm_up_tutor_system()
+
+    start_background_warmup()
+    raise TutorSystemNotReady(warmup_state['status'])
+
+
+def tutor_not_ready_response():
+    """503 response telling the client when to retry while the worker warms up (500 if it failed)"""
+    if warmup_state['status'] == 'failed':
+        response = jsonify({
+            'error': f"CJ-Mentor failed to start: {warmup_state['error']}",
+            'status': 'failed',
+            'failures': warmup_state['failures'],
+            'retry_at': warmup_state['retry_at']
+        })
+        response.status_code = 500
+        return response
+    response = jsonify({
+        'error': 'CJ-Mentor is starting up. Please try again in a few seconds.',
+        'status': warmup_state['status'],
+        'retry_after': WARMUP_RETRY_AFTER
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(WARMUP_RETRY_AFTER)
+    return response
 
 # Feedback storage
 FEEDBACK_DIR = os.path.join(parent_dir, 'feedback_data')
@@ -84,9 +198,28 @@ def serve_static(filename):
     else:
         return "File not found", 404
 
+def ask_response_payload(response_data, session_id):
+    """Fields of a chat() result returned to the browser by /ask and /ask_stream"""
+    return {
+        'answer': response_data.get('response'),
+        'response': response_data.get('response'),
+        'agent_type': response_data.get('agent_type'),
+        'scaffolding_level': response_data.get('scaffolding_level'),
+        'learning_plan': response_data.get('learning_plan'),
+        'current_plan_step': response_data.get('current_plan_step'),
+        'total_plan_steps': response_data.get('total_plan_steps'),
+        'session_id': session_id
+    }
+
+
+def sse_event(event, data):
+    """One server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @app.route('/ask', methods=['POST'])
 def ask():
-    """Handle chat requests with lazy loading of the tutor system."""
+    """Handle chat requests once the worker's tutor system is warmed up."""
     print("=== ASK ENDPOINT CALLED ===")
     try:
         current_tutor_system = get_tutor_system()
@@ -108,17 +241,10 @@ def ask():
         response_data = current_tutor_system.chat(user_message, session_id)
 
         print(f"✅ Got response: {type(response_data)}")
-        return jsonify({
-            'answer': response_data.get('response'),
-            'response': response_data.get('response'),
-            'agent_type': response_data.get('agent_type'),
-            'scaffolding_level': response_data.get('scaffolding_level'),
-            'learning_plan': response_data.get('learning_plan'),
-            'current_plan_step': response_data.get('current_plan_step'),
-            'total_plan_steps': response_data.get('total_plan_steps'),
-            'session_id': session_id
-        })
+        return jsonify(ask_response_payload(response_data, session_id))
 
+    except TutorSystemNotReady:
+        return tutor_not_ready_response()
     except Exception as e:
         print(f"💥 ERROR in ask endpoint: {str(e)}")
         import traceback
@@ -129,6 +255,48 @@ def ask():
             'response': f'Technical error: {str(e)}'
         }), 500
 
+@app.route('/ask_stream', methods=['POST'])
+def ask_stream():
+    """
+    Same request as /ask, answered as server-sent events: "delta" events carry the
+    tutor's text as the LLM generates it, a final "done" event carries the /ask
+    payload (plan and scaffolding already applied), "error" replaces it when the
+    turn failed. Requests the worker cannot take get the same JSON errors as /ask.
+    """
+    try:
+        current_tutor_system = get_tutor_system()
+    except TutorSystemNotReady:
+        return tutor_not_ready_response()
+    except Exception as e:
+        print(f"💥 ERROR in ask_stream endpoint: {str(e)}")
+        import traceback
+        print(f"📋 Full traceback: {traceback.format_exc()}")
+        return jsonify({
+            'error': 'An error occurred while processing your message.',
+            'answer': f'I apologize, but I encountered a technical issue: {str(e)}. Please try asking your question again.',
+            'response': f'Technical error: {str(e)}'
+        }), 500
+
+    data = request.get_json(silent=True)
+    if not data or ('question' not in data and 'message' not in data):
+        return jsonify({'error': 'Question or message is required'}), 400
+
+    user_message = data.get('question') or data.get('message', '')
+    session_id = data.get('session_id', 'default')
+    print(f"📡 Streaming response - Session: {session_id}")
+
+    def events():
+        for kind, payload in current_tutor_system.stream_chat(user_message, session_id):
+            if kind == 'delta':
+                yield sse_event('delta', {'text': payload})
+            elif kind == 'done':
+                yield sse_event('done', ask_response_payload(payload, session_id))
+            else:
+                yield sse_event('error', {'error': 'An error occurred while processing your message.'})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/chat_multi_agent', methods=['POST'])
 def chat_multi_agent():
     return ask()
@@ -146,6 +314,8 @@ def new_topic():
                 del current_tutor_system.conversations[session_id]
 
         return jsonify({'status': 'success', 'message': 'New topic session started', 'session_id': session_id})
+    except TutorSystemNotReady:
+        return tutor_not_ready_response()
     except Exception as e:
         print(f"Error in new_topic: {str(e)}")
         return jsonify({'error': 'Failed to start new topic'}), 500
@@ -166,6 +336,8 @@ def set_profile():
                 current_tutor_system.conversations[session_id].user_profile = profile_mapping.get(profile, 'general')
 
         return jsonify({'status': 'success', 'profile': profile, 'session_id': session_id})
+    except TutorSystemNotReady:
+        return tutor_not_ready_response()
     except Exception as e:
         print(f"Error in set_profile: {str(e)}")
         return jsonify({'error': 'Failed to set profile'}), 500
@@ -187,17 +359,45 @@ def submit_survey():
         print(f"Error submitting survey: {str(e)}")
         return jsonify({'error': 'Failed to submit survey'}), 500
 
+@app.route('/stats', methods=['GET'])
+def performance_stats():
+    """Retrieval cache counters and memory of this worker"""
+    try:
+        current_tutor_system = get_tutor_system()
+        stats = current_tutor_system.get_performance_stats()
+        stats['memory'] = process_memory()
+        return jsonify(stats)
+    except TutorSystemNotReady:
+        return tutor_not_ready_response()
+    except Exception as e:
+        print(f"Error in stats: {str(e)}")
+        return jsonify({'error': 'Failed to collect stats'}), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Enhanced health check endpoint"""
+    """Enhanced health check endpoint (503 until the worker is warmed up, 500 if the warm-up failed)"""
     print("🏥 Health check requested")
-    status = {'status': 'healthy', 'timestamp': datetime.now().isoformat()}
+    status = {'status': 'healthy', 'timestamp': datetime.now().isoformat(), 'warmup': dict(warmup_state), 'memory': process_memory()}
     try:
         current_tutor_system = get_tutor_system()
         status['tutor_system'] = 'available'
         test_response = current_tutor_system.chat("Hello", "health_check")
         status['tutor_test'] = 'passed'
         status['test_response_type'] = type(test_response).__name__
+    except TutorSystemFailed as e:
+        status['status'] = 'failed'
+        status['tutor_system'] = 'failed'
+        status['tutor_error'] = str(e)
+        print(f"🚨 Health status: {status}")
+        return jsonify(status), 500
+    except TutorSystemNotReady:
+        status['status'] = 'warming_up'
+        status['tutor_system'] = 'warming_up'
+        print(f"🏥 Health status: {status}")
+        response = jsonify(status)
+        response.status_code = 503
+        response.headers['Retry-After'] = str(WARMUP_RETRY_AFTER)
+        return response
     except Exception as e:
         status['tutor_system'] = 'unavailable'
         status['tutor_test'] = 'failed'
@@ -215,4 +415,7 @@ if __name__ == '__main__':
     print(f"💬 Multi-Agent Chat: http://127.0.0.1:{port}/multi_agent_chat.html")
     print(f"🔧 Health Check: http://127.0.0.1:{port}/health")
 
+    if WARMUP_ENABLED:
+        start_background_warmup()
+
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+
+from build_index import EMBEDDINGS_FILE_NAME, EMBEDDING_IDS_FILE_NAME
+from chunk_graph import ChunkGraph, build_chunk_graph, graph_path, has_chunk_graph
+
+VECTORSTORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faiss_index_cybersecurity_navigator")
+
+
+def _write_vectors(path, vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.save(os.path.join(path, EMBEDDINGS_FILE_NAME), vectors)
+    np.save(os.path.join(path, EMBEDDING_IDS_FILE_NAME), np.arange(len(vectors), dtype=np.int64))
+
+
+def test_expand_returns_neighbours_not_seeds(tmp_path):
+    # Two clusters of three chunks each
+    _write_vectors(str(tmp_path), [[1, 0.1, 0], [1, 0.2, 0], [1, 0, 0.1], [0, 1, 0.1], [0, 1, 0.2], [0.1, 1, 0]])
+    build_chunk_graph(str(tmp_path), k=2)
+    graph = ChunkGraph(graph_path(str(tmp_path)))
+
+    expanded = graph.expand([0, 1])
+    assert [chunk_id for chunk_id, _ in expanded][0] == 2
+    assert not {0, 1} & {chunk_id for chunk_id, _ in expanded}
+    assert all(0 < relevance <= 1 for _, relevance in expanded)
+
+
+def test_expand_ignores_unknown_seeds(tmp_path):
+    _write_vectors(str(tmp_path), [[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0]])
+    build_chunk_graph(str(tmp_path), k=1)
+    graph = ChunkGraph(graph_path(str(tmp_path)))
+    assert graph.expand([-1, 99]) == []
+
+
+def test_committed_graph_surfaces_new_chunks():
+    if not has_chunk_graph(VECTORSTORE_PATH):
+        pytest.skip("no kNN graph built next to the navigator index")
+    graph = ChunkGraph(graph_path(VECTORSTORE_PATH))
+    seeds = [78, 748, 246]
+    expanded = [chunk_id for chunk_id, _ in graph.expand(seeds, 8)]
+    assert expanded
+    assert not set(seeds) & set(expanded[:3])
@@ -0,0 +1,60 @@
+import pytest
+
+from chunk_store import ChunkIdMap, ChunkStore, write_chunk_store
+
+CHUNKS = [
+    (0, "Phishing is a social engineering attack.", {"source": "CyberCJ/phishing.html"}),
+    (3, "Ransomware encrypts files — and asks for a ransom.", {"source": "CyberCJ/malware.html"}),
+    (7, "", {"source": "CyberCJ/malware.html"}),
+    (12, "Die Beweiskette (chain of custody) 証拠", {}),
+]
+
+
+def test_round_trip(tmp_path):
+    assert write_chunk_store(str(tmp_path), CHUNKS) == len(CHUNKS)
+    store = ChunkStore(str(tmp_path))
+
+    assert len(store) == len(CHUNKS)
+    for chunk_id, text, metadata in CHUNKS:
+        assert store.text(chunk_id) == text
+        assert store.metadata(chunk_id) == metadata
+        doc = store.search(chunk_id)
+        assert doc.page_content == text
+        assert doc.metadata == {**metadata, "chunk_id": chunk_id}
+
+
+def test_metadata_table_is_shared(tmp_path):
+    write_chunk_store(str(tmp_path), CHUNKS)
+    store = ChunkStore(str(tmp_path))
+    assert len(store.metadata_table) == 3
+
+
+def test_unknown_ids(tmp_path):
+    write_chunk_store(str(tmp_path), CHUNKS)
+    store = ChunkStore(str(tmp_path))
+    with pytest.raises(KeyError):
+        store.row_of(5)
+    with pytest.raises(KeyError):
+        store.row_of(13)
+    assert store.search(5) == "ID 5 not found."
+
+
+def test_ids_must_ascend(tmp_path):
+    with pytest.raises(ValueError):
+        write_chunk_store(str(tmp_path), [(2, "a", {}), (2, "b", {})])
+
+
+def test_chunk_id_map_is_identity(tmp_path):
+    write_chunk_store(str(tmp_path), CHUNKS)
+    id_map = ChunkIdMap(ChunkStore(str(tmp_path)))
+    assert list(id_map) == [0, 3, 7, 12]
+    assert id_map[12] == 12
+    assert len(id_map) == 4
+
+
+def test_empty_store(tmp_path):
+    write_chunk_store(str(tmp_path), [])
+    store = ChunkStore(str(tmp_path))
+    assert len(store) == 0
+    with pytest.raises(KeyError):
+        store.row_of(0)
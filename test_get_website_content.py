@@ -0,0 +1,36 @@
+from get_website_content import plan_boilerplate
+
+PAGES = {
+    "CyberCJ/a.html": ["nav", "footer", "intro a"],
+    "CyberCJ/b.html": ["nav", "footer", "intro b", "shared tip"],
+    "CyberCJ/c.html": ["nav", "intro c", "shared tip"],
+}
+
+
+def test_repeated_blocks_are_kept_by_their_first_page():
+    drops, repeated = plan_boilerplate(PAGES, min_pages=3)
+    assert repeated == 1
+    assert drops["CyberCJ/a.html"] == frozenset()
+    assert drops["CyberCJ/b.html"] == frozenset({"nav"})
+    assert drops["CyberCJ/c.html"] == frozenset({"nav"})
+
+
+def test_min_pages_threshold():
+    drops, repeated = plan_boilerplate(PAGES, min_pages=2)
+    assert repeated == 3
+    assert drops["CyberCJ/a.html"] == frozenset()
+    assert drops["CyberCJ/b.html"] == frozenset({"nav", "footer"})
+    assert drops["CyberCJ/c.html"] == frozenset({"nav", "shared tip"})
+
+
+def test_block_repeated_within_one_page_counts_once():
+    drops, repeated = plan_boilerplate({"a.html": ["nav", "nav"], "b.html": ["body"]}, min_pages=2)
+    assert repeated == 0
+    assert drops == {"a.html": frozenset(), "b.html": frozenset()}
+
+
+def test_disabled():
+    for min_pages in (0, 1, None):
+        drops, repeated = plan_boilerplate(PAGES, min_pages=min_pages)
+        assert repeated == 0
+        assert all(not blocks for blocks in drops.values())
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pytest
+
+import get_website_content
+from ingest import MANIFEST_FILE_NAME, ingest
+
+
+class HashEmbeddings:
+    """Deterministic bag-of-words vectors, so ingestion runs without the MiniLM model"""
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), 32), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % 32] += 1.0
+        return (vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)).tolist()
+
+
+def _write_page(folder, name, topic, sentences=12):
+    body = " ".join(f"Sentence {i} explains how {topic} affects everyday online safety." for i in range(sentences))
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+        f.write(f"<html><body><h1>{topic}</h1><p>{body}</p></body></html>")
+
+
+def _run(tmp_path):
+    summary = ingest(str(tmp_path / "index"), [str(tmp_path / "site" / "CyberCJ")], str(tmp_path / "site"),
+                     HashEmbeddings(), workers=1)
+    with open(tmp_path / "index" / MANIFEST_FILE_NAME, "r", encoding="utf-8") as f:
+        return summary, json.load(f)
+
+
+def _chunk_ids(manifest):
+    return {path: page["chunk_ids"] for path, page in manifest["pages"].items()}
+
+
+def test_chunk_ids_are_never_reused(tmp_path):
+    site = tmp_path / "site" / "CyberCJ"
+    site.mkdir(parents=True)
+    (tmp_path / "index").mkdir()
+    _write_page(str(site), "phishing.html", "phishing")
+    _write_page(str(site), "malware.html", "malware")
+    summary, manifest = _run(tmp_path)
+    assert summary["new_pages"] == 2
+    first_ids = _chunk_ids(manifest)
+    issued = {chunk_id for ids in first_ids.values() for chunk_id in ids}
+    assert manifest["next_chunk_id"] == max(issued) + 1
+
+    # Unchanged pages keep their ids; a changed page gets fresh ones
+    _write_page(str(site), "malware.html", "ransomware", sentences=20)
+    summary, manifest = _run(tmp_path)
+    assert (summary["changed_pages"], summary["unchanged_pages"]) == (1, 1)
+    second_ids = _chunk_ids(manifest)
+    assert second_ids["CyberCJ/phishing.html"] == first_ids["CyberCJ/phishing.html"]
+    assert not set(second_ids["CyberCJ/malware.html"]) & issued
+    issued |= set(second_ids["CyberCJ/malware.html"])
+
+    # Ids of a deleted page are not handed to the next new page
+    os.remove(site / "malware.html")
+    _write_page(str(site), "privacy.html", "privacy")
+    summary, manifest = _run(tmp_path)
+    assert (summary["deleted_pages"], summary["new_pages"]) == (1, 1)
+    third_ids = _chunk_ids(manifest)
+    assert "CyberCJ/malware.html" not in third_ids
+    assert min(third_ids["CyberCJ/privacy.html"]) > max(issued)
+
+    # The persistent embedding store matches the manifest
+    stored_ids = np.load(tmp_path / "index" / "embedding_ids.npy")
+    assert sorted(stored_ids.tolist()) == sorted(chunk_id for ids in third_ids.values() for chunk_id in ids)
+
+
+def test_failed_boilerplate_scan_writes_nothing(tmp_path, monkeypatch):
+    site = tmp_path / "site" / "CyberCJ"
+    site.mkdir(parents=True)
+    (tmp_path / "index").mkdir()
+    _write_page(str(site), "phishing.html", "phishing")
+    _write_page(str(site), "malware.html", "malware")
+    scan = get_website_content.scan_file_blocks
+
+    def flaky_scan(file_path, relative_path):
+        if relative_path.endswith("malware.html"):
+            return relative_path, [], 0, "read error"
+        return scan(file_path, relative_path)
+
+    monkeypatch.setattr(get_website_content, "scan_file_blocks", flaky_scan)
+    with pytest.raises(RuntimeError):
+        _run(tmp_path)
+    assert not os.listdir(tmp_path / "index")
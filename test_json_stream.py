@@ -0,0 +1,59 @@
+import json
+
+from json_stream import JsonFieldStreamer
+
+FIELD = "response_to_student"
+
+
+def _stream(text, chunk_size):
+    streamer = JsonFieldStreamer(FIELD)
+    pieces = [streamer.feed(text[start:start + chunk_size]) for start in range(0, len(text), chunk_size)]
+    return streamer, "".join(pieces)
+
+
+def test_matches_json_decoding_for_any_chunking():
+    value = 'Line one\nA "quoted" word, a tab\there, a backslash \\ and / slash. Café — 🔒 done.'
+    text = json.dumps({"internal_thought": "x", FIELD: value}, ensure_ascii=True)
+    for chunk_size in (1, 2, 3, 5, 7, len(text)):
+        streamer, emitted = _stream(text, chunk_size)
+        assert emitted == value
+        assert streamer.value == value
+        assert streamer.complete
+
+
+def test_surrogate_pair_split_across_chunks():
+    text = '{"' + FIELD + '": "lock \\ud83d\\udd12 icon"}'
+    streamer = JsonFieldStreamer(FIELD)
+    split = text.index("\\udd12") + 3
+    emitted = streamer.feed(text[:split]) + streamer.feed(text[split:])
+    assert emitted == "lock 🔒 icon"
+
+
+def test_text_before_the_object_is_ignored():
+    text = 'Here is my answer:\n```json\n{"' + FIELD + '": "Hi"}\n```'
+    streamer, emitted = _stream(text, 4)
+    assert emitted == "Hi"
+
+
+def test_nested_keys_with_the_same_name_are_ignored():
+    text = json.dumps({"plan_update": {FIELD: "nested", "plan": [FIELD]}, FIELD: "top level"})
+    streamer, emitted = _stream(text, 3)
+    assert emitted == "top level"
+
+
+def test_string_values_that_look_like_keys_are_ignored():
+    text = json.dumps({"internal_thought": FIELD, "note": "a, b: c", FIELD: "real"})
+    streamer, emitted = _stream(text, 2)
+    assert emitted == "real"
+
+
+def test_truncated_output_keeps_the_partial_value():
+    streamer, emitted = _stream('{"' + FIELD + '": "This answer was cut off in the mid', 5)
+    assert emitted == "This answer was cut off in the mid"
+    assert not streamer.complete
+
+
+def test_missing_field():
+    streamer, emitted = _stream(json.dumps({"internal_thought": "only this"}), 4)
+    assert emitted == ""
+    assert streamer.complete
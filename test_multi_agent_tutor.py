@@ -0,0 +1,97 @@
+from multi_agent_tutor import ConversationContext, CyberJusticeMultiAgentTutor, ScaffoldingLevel
+
+PLAN = ["What phishing is", "Spotting a phishing email", "Reporting it"]
+
+
+def _tutor():
+    # The plan bookkeeping needs no LLM, embeddings or index
+    return object.__new__(CyberJusticeMultiAgentTutor)
+
+
+def _context(step=0, plan=PLAN):
+    context = ConversationContext()
+    context.learning_plan = list(plan) if plan else None
+    context.current_plan_step = step
+    context.step_completion_status = [False] * len(plan or [])
+    return context
+
+
+def _turn(tutor, context, plan_update, response="What do you notice?"):
+    tutor._update_context(context, "student input", {
+        "plan_update": plan_update,
+        "new_scaffolding_level": "GUIDED_SUPPORT",
+        "response_to_student": response
+    })
+
+
+def test_delta_to_full_schema():
+    tutor = _tutor()
+    context = _context(step=1)
+    assert tutor._apply_plan_delta(context, {"action": "advance"}) == {"plan": PLAN, "plan_step": 2, "plan_adaptation": ""}
+    assert tutor._apply_plan_delta(context, {"action": "stay", "reason": "struggling"})["plan_step"] == 1
+    assert tutor._apply_plan_delta(context, "advance")["plan_step"] == 2
+    assert tutor._apply_plan_delta(context, {"action": "replace", "plan": ["A", "B"]}) == \
+        {"plan": ["A", "B"], "plan_step": 0, "plan_adaptation": "New plan"}
+    # replace without a plan keeps the current one
+    assert tutor._apply_plan_delta(context, {"action": "replace", "plan": []})["plan_step"] == 1
+
+
+def test_replace_starts_new_plan():
+    tutor = _tutor()
+    context = _context(plan=None)
+    _turn(tutor, context, {"action": "replace", "plan": PLAN, "reason": "Student asked about phishing"})
+    assert context.learning_plan == PLAN
+    assert context.current_plan_step == 0
+    assert context.step_completion_status == [False, False, False]
+    assert context.scaffolding_level == ScaffoldingLevel.GUIDED_SUPPORT
+    assert context.last_question == "What do you notice?"
+
+
+def test_advance_and_stay():
+    tutor = _tutor()
+    context = _context()
+    _turn(tutor, context, {"action": "advance"})
+    assert (context.current_plan_step, context.step_completion_status) == (1, [True, False, False])
+    _turn(tutor, context, {"action": "stay"})
+    assert (context.current_plan_step, context.step_completion_status) == (1, [True, False, False])
+
+
+def test_advance_past_last_step_completes_plan():
+    tutor = _tutor()
+    context = _context(step=2)
+    _turn(tutor, context, {"action": "advance"})
+    assert context.learning_plan is None
+    assert context.current_plan_step == 0
+    assert context.step_completion_status == []
+
+
+def test_advance_without_plan_creates_nothing():
+    tutor = _tutor()
+    context = _context(plan=None)
+    _turn(tutor, context, {"action": "advance", "reason": "no plan yet"})
+    assert context.learning_plan is None
+    assert context.current_plan_step == 0
+
+
+def _streaming_tutor(response_data):
+    tutor = _tutor()
+    tutor.streams = tutor.streams_with_text = 0
+    tutor.stream_total_seconds = tutor.stream_first_token_seconds = 0.0
+
+    def chat(user_input, session_id, user_profile, on_text=None):
+        on_text("Phishing is")
+        return response_data
+
+    tutor.chat = chat
+    return tutor
+
+
+def test_stream_ends_with_done():
+    events = list(_streaming_tutor({"response": "Phishing is a scam."}).stream_chat("phishing?"))
+    assert events == [("delta", "Phishing is"), ("done", {"response": "Phishing is a scam."})]
+
+
+def test_failed_turn_streams_an_error():
+    tutor = _streaming_tutor({"response": "I'm experiencing a brief technical challenge", "error": "rate limited"})
+    assert list(tutor.stream_chat("phishing?")) == [("delta", "Phishing is"), ("error", "rate limited")]
+    assert tutor.streams == 1
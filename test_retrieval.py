@@ -0,0 +1,50 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from retrieval import adaptive_cutoff, build_course_content, l2_to_similarity, mmr_select
+
+
+def _unit(rows):
+    vectors = np.asarray(rows, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_mmr_prefers_diverse_chunks():
+    # 0 and 1 point almost the same way, 2 is a different topic
+    vectors = _unit([[1, 0, 0], [0.95, 0.3, 0], [0, 0, 1]])
+    relevance = np.array([0.9, 0.85, 0.6], dtype=np.float32)
+    assert mmr_select(relevance, vectors, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_mmr_lambda_one_is_plain_ranking():
+    vectors = _unit([[1, 0, 0], [0.95, 0.3, 0], [0, 0, 1]])
+    relevance = np.array([0.9, 0.85, 0.6], dtype=np.float32)
+    assert mmr_select(relevance, vectors, k=3, lambda_mult=1.0) == [0, 1, 2]
+
+
+def test_mmr_skips_near_duplicates():
+    vectors = _unit([[1, 0, 0], [1, 0.001, 0], [0, 1, 0]])
+    relevance = np.array([0.9, 0.89, 0.5], dtype=np.float32)
+    assert mmr_select(relevance, vectors, k=3, lambda_mult=1.0, duplicate_similarity=0.98) == [0, 2]
+
+
+def test_mmr_edge_cases():
+    vectors = _unit([[1, 0], [0, 1]])
+    assert mmr_select(np.zeros(0, dtype=np.float32), np.zeros((0, 2), dtype=np.float32), k=3) == []
+    assert mmr_select(np.array([0.5, 0.7], dtype=np.float32), vectors, k=0) == []
+    assert mmr_select(np.array([0.5, 0.7], dtype=np.float32), vectors, k=5) == [1, 0]
+
+
+def test_adaptive_cutoff():
+    similarities = l2_to_similarity([0.4, 0.6, 1.0, 1.6])  # 0.8, 0.7, 0.5, 0.2
+    assert list(adaptive_cutoff(similarities, min_similarity=0.3, max_gap=0.2)) == [0, 1]
+    # Nothing above the floor: the best hit is still kept
+    assert list(adaptive_cutoff(np.array([0.1, 0.2], dtype=np.float32), min_similarity=0.3)) == [1]
+
+
+def test_course_content_budget():
+    docs = [Document(page_content="alpha beta gamma"), Document(page_content="delta epsilon")]
+    assert build_course_content(docs, char_budget=0) == "alpha beta gamma\n\ndelta epsilon"
+    assert build_course_content(docs, char_budget=20) == "alpha beta gamma"
+    # A best chunk over budget is cut at a word boundary instead of being dropped
+    assert build_course_content(docs, char_budget=12) == "alpha beta"
@@ -0,0 +1,96 @@
+import types
+
+from retrieval import NavigatorRetriever
+from retrieval_cache import RetrievalResultCache, index_signature, index_version
+
+RANKED = ((4, 0.12), (9, 0.3))
+
+
+def _vectorstore(embeddings, index_ids, docstore_ids):
+    return types.SimpleNamespace(embeddings=embeddings, index=types.SimpleNamespace(ntotal=len(index_ids)),
+                                 docstore=types.SimpleNamespace(),
+                                 index_to_docstore_id={chunk_id: str(chunk_id) for chunk_id in docstore_ids})
+
+
+def _write_index(path, content=b"faiss"):
+    (path / "index.faiss").write_bytes(content)
+    (path / "index.pkl").write_bytes(b"docstore")
+
+
+def test_entries_are_keyed_by_version():
+    cache = RetrievalResultCache()
+    cache.put("v1", "5:phishing", RANKED)
+    assert cache.get("v1", "5:phishing") == RANKED
+    assert cache.get("v2", "5:phishing") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = RetrievalResultCache(max_entries=2)
+    cache.put("v1", "a", RANKED)
+    cache.put("v1", "b", RANKED)
+    cache.get("v1", "a")
+    cache.put("v1", "c", RANKED)
+    assert cache.get("v1", "b") is None
+    assert cache.get("v1", "a") == RANKED
+    assert cache.get("v1", "c") == RANKED
+
+
+def test_invalidate_keeps_only_current_version():
+    cache = RetrievalResultCache()
+    cache.put("v1", "a", RANKED)
+    cache.put("v2", "b", RANKED)
+    cache.invalidate(keep_version="v2")
+    assert cache.get("v1", "a") is None
+    assert cache.get("v2", "b") == RANKED
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_index_version_follows_content(tmp_path):
+    _write_index(tmp_path)
+    version, signature = index_version(str(tmp_path)), index_signature(str(tmp_path))
+    _write_index(tmp_path, b"rebuilt")
+    assert index_version(str(tmp_path)) != version
+    assert index_signature(str(tmp_path)) != signature
+
+
+def test_index_rebuild_invalidates_cached_results(tmp_path):
+    _write_index(tmp_path)
+    reloads = []
+
+    def loader(embeddings):
+        reloads.append(embeddings)
+        return _vectorstore(embeddings, [0, 1], [0, 1])
+
+    retriever = NavigatorRetriever(_vectorstore("minilm", [0, 1], [0, 1]), str(tmp_path), loader=loader,
+                                   result_cache=RetrievalResultCache())
+    old_version = retriever.index_version
+    retriever.result_cache.put(old_version, "5:phishing", RANKED)
+
+    _write_index(tmp_path, b"rebuilt")
+    retriever._next_check = 0.0
+    retriever._check_index_version()
+
+    assert reloads == ["minilm"]
+    assert retriever.index_version != old_version
+    assert retriever.result_cache.get(old_version, "5:phishing") is None
+    assert retriever.result_cache.stats()["entries"] == 0
+
+
+def test_mismatched_index_and_docstore_are_not_swapped_in(tmp_path):
+    _write_index(tmp_path)
+    old_store = _vectorstore("minilm", [0, 1], [0, 1])
+    # The new index already has chunk 2, the docstore it is loaded with does not
+    retriever = NavigatorRetriever(old_store, str(tmp_path),
+                                   loader=lambda embeddings: _vectorstore(embeddings, [0, 1, 2], [0, 1]),
+                                   result_cache=RetrievalResultCache())
+    old_version = retriever.index_version
+    retriever.result_cache.put(old_version, "5:phishing", RANKED)
+
+    _write_index(tmp_path, b"half written")
+    retriever._next_check = 0.0
+    retriever._check_index_version()
+
+    assert retriever.vectorstore is old_store
+    assert retriever.index_version == old_version
+    assert retriever.result_cache.get(old_version, "5:phishing") == RANKED
@@ -0,0 +1,68 @@
+"""
+Query encoder factory for the CJ-Mentor retriever.
+
+All code that needs the all-MiniLM-L6-v2 encoder goes through create_embeddings(),
+which returns a LangChain Embeddings object. With CJ_EMBEDDING_SIDECAR=1 the
+workers talk to the shared embedding server (embedding_server.py) instead of
+loading their own copy of the model. CJ_EMBEDDING_BACKEND selects the encoder
+implementation: "torch" (sentence-transformers) or "onnx" (int8 export, see
+onnx_embeddings.py). Unless disabled, the encoder is wrapped in the two-tier
+query embedding cache from embedding_cache.py.
+"""
+
+import os
+from typing import Optional
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+EMBEDDING_SIDECAR_ENABLED = os.getenv("CJ_EMBEDDING_SIDECAR", "0").lower() in ("1", "true", "yes")
+EMBEDDING_SOCKET_PATH = os.getenv("CJ_EMBEDDING_SOCKET", "/tmp/cybercj-embeddings.sock")
+
+# torch | onnx
+EMBEDDING_BACKEND = os.getenv("CJ_EMBEDDING_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("CJ_ONNX_MODEL_DIR", "")
+
+
+def create_embeddings(batch_size: int = 1, use_sidecar: Optional[bool] = None, backend: Optional[str] = None,
+                      use_cache: Optional[bool] = None):
+    """
+    Create the MiniLM query encoder used by the navigator index.
+    batch_size only matters when several texts are embedded in one call.
+    """
+    from embedding_cache import EMBED_CACHE_ENABLED, CachedEmbeddings
+
+    if use_sidecar is None:
+        use_sidecar = EMBEDDING_SIDECAR_ENABLED
+    if use_cache is None:
+        use_cache = EMBED_CACHE_ENABLED
+    backend = (backend or EMBEDDING_BACKEND).lower()
+
+    if use_cache:
+        return CachedEmbeddings(
+            create_embeddings(batch_size, use_sidecar=use_sidecar, backend=backend, use_cache=False),
+            model_key=f"{EMBEDDING_MODEL_NAME}:{backend}"
+        )
+
+    if use_sidecar:
+        from embedding_server import SidecarEmbeddings
+        return SidecarEmbeddings(
+            EMBEDDING_SOCKET_PATH,
+            fallback_factory=lambda: create_embeddings(batch_size, use_sidecar=False, backend=backend, use_cache=False)
+        )
+
+    if backend == "onnx":
+        from onnx_embeddings import OnnxMiniLMEmbeddings, DEFAULT_ONNX_MODEL_DIR, has_onnx_model
+        model_dir = ONNX_MODEL_DIR or DEFAULT_ONNX_MODEL_DIR
+        if has_onnx_model(model_dir):
+            return OnnxMiniLMEmbeddings(model_dir, batch_size=max(batch_size, 1))
+        print(f"⚠️ ONNX model not found in {model_dir}, using the torch encoder "
+              f"(run: python onnx_embeddings.py export)")
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    # Use optimized embeddings with reduced memory usage
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cpu'},  # Force CPU to avoid GPU memory issues
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': batch_size}
+    )
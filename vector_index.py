@@ -0,0 +1,140 @@
+"""
+Loading helpers for the navigator FAISS index.
+
+The default "mmap" mode memory-maps the vectors in index.faiss read-only, so every
+worker (including workers recycled by gunicorn's max_requests) shares a single
+page-cache copy and starts almost instantly. When a chunk_store/ directory exists
+next to the index it replaces the pickled docstore as well (see chunk_store.py).
+"pickle" mode keeps the original FAISS.load_local behaviour, which reads the whole
+index and docstore into private memory.
+
+CJ_INDEX_TYPE selects an ANN variant built by build_index.py (index_hnsw.faiss,
+index_ivfpq.faiss) instead of the exact index.faiss; the search parameters stored
+next to the variant are applied on load and can be overridden per deployment.
+"""
+
+import os
+import pickle
+from typing import List, Optional
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from build_index import apply_search_params, index_file_name, load_index_params, params_file_name
+from chunk_store import ChunkStore, ChunkIdMap, chunk_store_path, has_chunk_store
+
+INDEX_FILE_NAME = "index.faiss"
+DOCSTORE_FILE_NAME = "index.pkl"
+
+# mmap | pickle
+INDEX_LOAD_MODE = os.getenv("CJ_INDEX_LOAD", "mmap").lower()
+# auto (chunk store if present) | chunks | pickle
+DOCSTORE_MODE = os.getenv("CJ_DOCSTORE", "auto").lower()
+# flat | hnsw | ivfpq (variants are built with build_index.py)
+INDEX_TYPE = os.getenv("CJ_INDEX_TYPE", "flat").lower()
+# Override the search parameters stored with the variant
+SEARCH_PARAM_OVERRIDES = {
+    "ef_search": int(os.environ["CJ_HNSW_EF_SEARCH"]) if os.getenv("CJ_HNSW_EF_SEARCH") else None,
+    "nprobe": int(os.environ["CJ_IVF_NPROBE"]) if os.getenv("CJ_IVF_NPROBE") else None,
+}
+
+# IO_FLAG_MMAP_IFC maps flat (IndexFlatCodes) storage; older faiss builds only have IO_FLAG_MMAP
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def read_faiss_index(index_path: str, mmap: bool = True):
+    """
+    Read a FAISS index, memory-mapping its vectors when possible.
+    A memory-mapped index is read-only: never call add()/remove_ids() on it.
+    """
+    if mmap:
+        try:
+            return faiss.read_index(index_path, _MMAP_FLAGS)
+        except RuntimeError as e:
+            print(f"⚠️ Could not memory-map {index_path} ({e}), reading it into memory instead")
+    return faiss.read_index(index_path)
+
+
+_reported_missing_variants = set()
+
+
+def resolve_index_type(vectorstore_path: str, index_type: Optional[str] = None) -> str:
+    """The requested index type, or "flat" if that variant has not been built"""
+    index_type = (index_type or INDEX_TYPE).lower()
+    if index_type != "flat" and not os.path.exists(os.path.join(vectorstore_path, index_file_name(index_type))):
+        if (vectorstore_path, index_type) not in _reported_missing_variants:
+            _reported_missing_variants.add((vectorstore_path, index_type))
+            print(f"⚠️ {index_file_name(index_type)} not found (run build_index.py --type {index_type}), using the flat index")
+        return "flat"
+    return index_type
+
+
+def index_files(vectorstore_path: str, index_type: Optional[str] = None) -> List[str]:
+    """Files of the active index: the index itself and, for variants, its parameter file"""
+    index_type = resolve_index_type(vectorstore_path, index_type)
+    files = [os.path.join(vectorstore_path, index_file_name(index_type))]
+    if index_type != "flat":
+        files.append(os.path.join(vectorstore_path, params_file_name(index_type)))
+    return files
+
+
+def read_navigator_index(vectorstore_path: str, index_type: Optional[str] = None, mmap: bool = True):
+    """Read the active index and apply its search parameters"""
+    index_type = resolve_index_type(vectorstore_path, index_type)
+    index = read_faiss_index(os.path.join(vectorstore_path, index_file_name(index_type)), mmap=mmap)
+    if index_type != "flat":
+        params = dict(load_index_params(vectorstore_path, index_type).get("params", {}))
+        params.update({key: value for key, value in SEARCH_PARAM_OVERRIDES.items() if value is not None and key in params})
+        apply_search_params(index, params)
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            # reconstruct() (used by the MMR stage) needs the id -> list map
+            ivf.make_direct_map()
+    return index
+
+
+def load_pickled_docstore(vectorstore_path: str):
+    """Load the LangChain docstore and index-to-docstore-id mapping from index.pkl"""
+    with open(os.path.join(vectorstore_path, DOCSTORE_FILE_NAME), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return docstore, index_to_docstore_id
+
+
+def load_docstore(vectorstore_path: str, mode: Optional[str] = None):
+    """Load the chunk store if available (or required), else the pickled docstore"""
+    mode = (mode or DOCSTORE_MODE).lower()
+    if mode == "chunks" or (mode == "auto" and has_chunk_store(vectorstore_path)):
+        chunk_store = ChunkStore(chunk_store_path(vectorstore_path))
+        return chunk_store, ChunkIdMap(chunk_store)
+    return load_pickled_docstore(vectorstore_path)
+
+
+def load_vectorstore(vectorstore_path: str, embeddings, mode: Optional[str] = None):
+    """
+    Load the navigator vectorstore.
+
+    mode "mmap" memory-maps index.faiss; "pickle" uses FAISS.load_local. If the
+    memory-mapped load fails for any reason we fall back to FAISS.load_local.
+    """
+    mode = (mode or INDEX_LOAD_MODE).lower()
+
+    if mode == "mmap":
+        try:
+            index = read_navigator_index(vectorstore_path, mmap=True)
+            docstore, index_to_docstore_id = load_docstore(vectorstore_path)
+            print(f"🗺️ Memory-mapped FAISS index ({resolve_index_type(vectorstore_path)}): "
+                  f"{index.ntotal} vectors, docstore: {type(docstore).__name__}")
+            return FAISS(
+                embedding_function=embeddings,
+                index=index,
+                docstore=docstore,
+                index_to_docstore_id=index_to_docstore_id
+            )
+        except Exception as e:
+            print(f"⚠️ Memory-mapped index load failed ({e}), falling back to FAISS.load_local")
+
+    return FAISS.load_local(
+        vectorstore_path,
+        embeddings,
+        allow_dangerous_deserialization=True
+    )